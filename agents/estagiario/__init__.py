@@ -3,4 +3,7 @@
 Mantém a lógica separada do pipeline principal.
 """
 
+import logging as _logging
 
+# Logger compartilhado do estagiário; handler e nível são configurados na aplicação (backend/main.py)
+logger = _logging.getLogger("estagiario")
@@ -7,15 +7,17 @@ Delega ao EstagiarioExecutor (function calling loop + self-critique).
 Interface pública: answer(), answer_with_context().
 """
 
+import logging
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any, Callable
-from datetime import datetime
+from datetime import date
 
 try:
     from backend.utils import get_date_brasil
 except Exception:
-    from datetime import date as _date
-    get_date_brasil = _date.today
+    get_date_brasil = date.today
+
+logger = logging.getLogger("estagiario")
 
 
 @dataclass
@@ -29,7 +31,7 @@ class EstagiarioAgent:
     """Agente de pesquisa sobre notícias — delega ao executor v3."""
 
     def __init__(self) -> None:
-        print("[Estagiario] v3 inicializado")
+        logger.info("v3 inicializado")
 
     def answer_with_context(
         self,
@@ -39,12 +41,11 @@ class EstagiarioAgent:
         on_step: Optional[Callable[[str], None]] = None,
     ) -> AgentAnswer:
         """Responde perguntas mantendo o contexto da conversa anterior."""
-        history_lines: List[str] = []
-        if chat_history and len(chat_history) > 1:
-            for msg in chat_history[:-1]:
-                role = "Usuário" if msg.get("role") == "user" else "Assistente"
-                content = (msg.get("content", "") or "")[:500]
-                history_lines.append(f"{role}: {content}")
+        # Última mensagem é a pergunta atual; cada turno anterior truncado em 500 chars
+        history_lines: List[str] = [
+            f"{'Usuário' if msg.get('role') == 'user' else 'Assistente'}: {(msg.get('content') or '')[:500]}"
+            for msg in (chat_history or [])[:-1]
+        ]
 
         return self.answer(question, date_str, history_lines=history_lines, on_step=on_step)
 
@@ -56,12 +57,12 @@ class EstagiarioAgent:
         on_step: Optional[Callable[[str], None]] = None,
     ) -> AgentAnswer:
         """Responde perguntas via executor v3 (Gemini function calling + self-critique)."""
-        print(f"[Estagiario] === ANSWER v3 === Pergunta: {question}")
+        logger.info("=== ANSWER v3 === Pergunta: %s", question)
 
         target_date = None
         if date_str:
             try:
-                target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+                target_date = date.fromisoformat(date_str)
             except Exception:
                 target_date = get_date_brasil()
         if target_date is None:
@@ -79,10 +80,8 @@ class EstagiarioAgent:
             )
             final = out.get("final") or "Não foi possível gerar uma resposta."
             trace = out.get("trace") or []
-            print(f"[Estagiario] v3 concluído: {len(trace)} steps")
+            logger.info("v3 concluído: %d steps", len(trace))
             return AgentAnswer(True, final, {"react_trace": trace})
         except Exception as e:
-            print(f"[Estagiario] Falha executor v3: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Falha executor v3: %s", e)
             return AgentAnswer(False, f"Erro interno do estagiário: {e}")
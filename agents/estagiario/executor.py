@@ -5,47 +5,117 @@ Arquitetura:
   1. Monta prompt com system instructions + pergunta do usuário.
   2. Loop de function calling (Gemini nativo): generate → dispatch → FunctionResponse → repeat.
   3. Quando o LLM emite texto (sem function_call): extrai resposta final.
-  4. Self-critique: avalia qualidade da resposta (nota 1-5). Se < 4, re-prompta com feedback (max 2 retries).
+  4. Self-critique: avalia qualidade da resposta (nota 1-5). Se < 4, a própria critique devolve a
+     resposta reescrita; re-prompt separado só como fallback (max 2 retries).
 """
 
 from __future__ import annotations
 
 import json
+import logging
 import os
 import re
 import time
-from typing import List, Optional, Callable, Dict, Any
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Callable, Dict, Any, Tuple
 
 try:
     import google.generativeai as genai  # type: ignore
 except Exception:
     genai = None  # type: ignore
 
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
 try:
     from backend.database import SessionLocal
 except Exception:
     SessionLocal = None  # type: ignore
 
+try:
+    from backend.processing import cosine_similarity_bytes
+except Exception:
+    cosine_similarity_bytes = None  # type: ignore
+
+try:
+    from backend.utils import get_date_brasil
+except Exception:
+    from datetime import date as _date
+    get_date_brasil = _date.today
+
 try:
     from .tools.definitions import build_tool_declarations, dispatch_tool
 except Exception:
     build_tool_declarations = None  # type: ignore
     dispatch_tool = None  # type: ignore
 
-from .prompts import ESTAGIARIO_SYSTEM_PROMPT_V3, PROMPT_CRITIQUE_V1
+from .prompts import ESTAGIARIO_SYSTEM_INSTRUCTION_V3, ESTAGIARIO_CONTEXTO_V3, PROMPT_CRITIQUE_V2
+
+logger = logging.getLogger("estagiario")
 
 _MAX_ITERATIONS = 15
 _MAX_TOOL_CALLS = 10
 _MAX_CRITIQUE_RETRIES = 2
 _MAX_OUTPUT_TOKENS = 16384
 _GEMINI_MODEL = "gemini-3-flash-preview"
-_TAG = "[Estagiario]"
+
+# Tools que não tocam o banco: podem rodar em paralelo às demais chamadas do mesmo turno
+_DB_FREE_TOOLS = frozenset({"buscar_na_web"})
+_TOOL_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="estagiario-tool")
+
+# Config de geração do loop de tools e do re-prompt: um objeto só, não um dict novo por chamada
+_GENERATION_CONFIG = {"temperature": 0.3, "max_output_tokens": _MAX_OUTPUT_TOKENS}
+
+# Critique em JSON mode (sem cercas de markdown). Critique + reescrita fundidas numa única
+# chamada, então o orçamento de saída precisa comportar a resposta revisada.
+_CRITIQUE_GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "max_output_tokens": _MAX_OUTPUT_TOKENS,
+    "response_mime_type": "application/json",
+}
+
+# Cache de respostas por pergunta normalizada (evita repetir o loop LLM para a mesma pergunta)
+_ANSWER_CACHE: Dict[tuple, Dict[str, Any]] = {}
+_ANSWER_CACHE_TTL = 600  # 10 minutos (dia corrente: clusters ainda chegando)
+_ANSWER_CACHE_TTL_PASSADO = 6 * 3600  # dia fechado: o acervo praticamente não muda
+_ANSWER_CACHE_MAX = 512
+# Cache semântico: paráfrases da mesma pergunta (mesmo modelo/data/histórico) reaproveitam a resposta.
+# Desligado por padrão (custa uma chamada de embedding por miss); só aceita hit quando
+# entidades e números das duas perguntas coincidem.
+_SEMANTIC_CACHE_ATIVO = os.getenv("ESTAGIARIO_SEMANTIC_CACHE", "0") == "1"
+_SEMANTIC_CACHE: List[Dict[str, Any]] = []
+_SEMANTIC_CACHE_MAX = 256
+_SEMANTIC_CACHE_THRESHOLD = 0.92
+_EMBEDDING_MODEL = "models/gemini-embedding-001"
+# Números (datas, valores, percentuais) e nomes próprios/siglas: o que distingue
+# "recuperação judicial da Americanas" de "...da Light" mesmo com cosseno alto
+_RE_NUMERO = re.compile(r"\d+(?:[.,/]\d+)*")
+_RE_NOME_PROPRIO = re.compile(r"(?<![.?!]\s)(?<!^)\b[A-ZÀ-Ý][\wÀ-ÿ&-]*")
+_RE_PUNCT = re.compile(r"[^\w\s]")
+_RE_SPACES = re.compile(r"\s+")
+# Perguntas voláteis (dependem do "agora"): não usam o cache de respostas.
+# A pergunta já chega normalizada, então basta tokenizar uma vez e cruzar com o frozenset.
+_TERMOS_VOLATEIS = frozenset({
+    "hoje", "agora", "atualmente", "recente", "recentes",
+    "ultimo", "ultima", "ultimos", "ultimas", "último", "última", "últimos", "últimas",
+})
+_FRASES_VOLATEIS = ("neste momento", "tempo real")
+
+# Pré-avaliação barata: respostas que já trazem dados específicos e seção de fontes dispensam a critique LLM
+_CRITIQUE_FAST_MIN_CHARS = 400
+_RE_DADO_ESPECIFICO = re.compile(r"R\$|US\$|\d+(?:[.,]\d+)?\s*%|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b")
+_RE_SECAO_FONTES = re.compile(r"\*\*\s*Fontes?\s*:?\s*\*\*|^#+\s*Fontes?\b", re.IGNORECASE | re.MULTILINE)
 
 _STEP_LABELS = {
     "list_cluster_titles": "Lendo títulos das notícias...",
     "query_clusters": "Buscando clusters com filtros...",
     "get_cluster_details": "Aprofundando notícia...",
     "query_clusters_range": "Buscando notícias em múltiplos dias...",
+    "busca_semantica_clusters": "Buscando notícias por similaridade...",
     "obter_textos_brutos_cluster": "Lendo textos originais...",
     "buscar_na_web": "Pesquisando na web...",
 }
@@ -57,6 +127,21 @@ def _open_db():
     return SessionLocal()
 
 
+@lru_cache(maxsize=1)
+def _main_model(_genai):
+    """Modelo com tools + system_instruction estáticos: construído uma vez por processo."""
+    return _genai.GenerativeModel(
+        _GEMINI_MODEL,
+        tools=[build_tool_declarations()],
+        system_instruction=ESTAGIARIO_SYSTEM_INSTRUCTION_V3,
+    )
+
+
+@lru_cache(maxsize=1)
+def _critic_model(_genai):
+    return _genai.GenerativeModel(_GEMINI_MODEL)
+
+
 def _init_genai():
     if genai is None:
         raise RuntimeError("google-generativeai não instalado.")
@@ -87,19 +172,38 @@ class EstagiarioExecutor:
         if build_tool_declarations is None or dispatch_tool is None:
             return {"final": "Erro: tools do estagiário não carregaram. Verifique os logs do servidor.", "trace": trace}
 
+        cache_key = _answer_cache_key(user_input, chat_history, data_referencia)
+        cacheable = not _pergunta_volatil(cache_key[-1])
+        cached = _ANSWER_CACHE.get(cache_key) if cacheable else None
+        if cached and (time.time() - cached["ts"]) < cached["ttl"]:
+            logger.info("Cache hit (%d chars)", len(cached["final"]))
+            trace.append({"type": "cache_hit"})
+            return {"final": cached["final"], "trace": trace}
+
         try:
             _genai = _init_genai()
         except RuntimeError as e:
             return {"final": f"Erro: {e}", "trace": trace}
 
-        prompt_text = ESTAGIARIO_SYSTEM_PROMPT_V3.format(
+        pergunta_emb = None
+        termos = _termos_chave(user_input)
+        if cacheable and _SEMANTIC_CACHE_ATIVO and termos:
+            pergunta_emb = _embed_pergunta(_genai, cache_key[-1])
+            semantic_hit = _semantic_cache_lookup(cache_key[:-1], termos, pergunta_emb)
+            if semantic_hit:
+                final_cached, sim = semantic_hit
+                logger.info("Cache semântico hit (sim=%.3f, %d chars)", sim, len(final_cached))
+                trace.append({"type": "cache_hit", "semantic": True, "sim": round(sim, 4)})
+                return {"final": final_cached, "trace": trace}
+
+        # Só a parte dinâmica vai no conteúdo; regras + tools formam o prefixo estável (system_instruction)
+        prompt_text = ESTAGIARIO_CONTEXTO_V3.format(
             data_referencia=data_referencia or "hoje",
             chat_history="\n".join(chat_history) if chat_history else "(sem histórico)",
             pergunta=user_input,
         )
 
-        tool_declaration = build_tool_declarations()
-        model = _genai.GenerativeModel(_GEMINI_MODEL, tools=[tool_declaration])
+        model = _main_model(_genai)
 
         db = _open_db()
         try:
@@ -122,8 +226,20 @@ class EstagiarioExecutor:
             _genai, user_input, raw_answer, trace, on_step,
         )
 
+        if cacheable:
+            if len(_ANSWER_CACHE) >= _ANSWER_CACHE_MAX:
+                _ANSWER_CACHE.pop(next(iter(_ANSWER_CACHE)))
+            ttl = _answer_cache_ttl(data_referencia)
+            _ANSWER_CACHE[cache_key] = {
+                "final": final_answer,
+                "ts": time.time(),
+                "ttl": ttl,
+            }
+            if pergunta_emb is not None:
+                _semantic_cache_store(cache_key[:-1], termos, pergunta_emb, final_answer, ttl)
+
         elapsed = time.time() - t0
-        print(f"{_TAG} Concluído em {elapsed:.1f}s, {len(trace)} steps")
+        logger.info("Concluído em %.1fs, %d steps", elapsed, len(trace))
         return {"final": final_answer, "trace": trace}
 
     # ──────────────────────────────────────────────────────────
@@ -139,19 +255,21 @@ class EstagiarioExecutor:
         trace: list,
         on_step: Optional[Callable],
     ) -> Optional[str]:
-        print(f"{_TAG} Enviando ao LLM ({len(prompt_text)} chars, budget={_MAX_TOOL_CALLS})...")
+        logger.info("Enviando ao LLM (%d chars, budget=%d)...", len(prompt_text), _MAX_TOOL_CALLS)
 
         response = model.generate_content(
             prompt_text,
-            generation_config={"temperature": 0.3, "max_output_tokens": _MAX_OUTPUT_TOKENS},
+            generation_config=_GENERATION_CONFIG,
         )
 
         tool_calls_used = 0
+        # Memo por execução: o modelo costuma repetir a mesma tool com os mesmos args entre iterações
+        tool_memo: Dict[tuple, str] = {}
 
         for iteration in range(_MAX_ITERATIONS):
             candidate = response.candidates[0] if response.candidates else None
             if candidate is None:
-                print(f"{_TAG} Sem candidatos na iteração {iteration + 1}.")
+                logger.info("Sem candidatos na iteração %d.", iteration + 1)
                 return None
 
             parts = candidate.content.parts
@@ -160,15 +278,27 @@ class EstagiarioExecutor:
             if not has_fc:
                 text_parts = [p.text for p in parts if hasattr(p, "text") and p.text]
                 final = "\n".join(text_parts).strip()
-                print(f"{_TAG} Resposta recebida ({len(final)} chars, {tool_calls_used} tool calls)")
+                logger.info("Resposta recebida (%d chars, %d tool calls)", len(final), tool_calls_used)
                 trace.append({"type": "answer", "chars": len(final), "tool_calls": tool_calls_used})
                 return final
 
-            function_responses = []
-            for part in parts:
-                if not (hasattr(part, "function_call") and part.function_call.name):
-                    continue
+            fc_parts = [p for p in parts if hasattr(p, "function_call") and p.function_call.name]
+
+            # Chamadas independentes no mesmo turno: as tools sem banco (web) rodam em thread
+            # enquanto as de banco seguem sequenciais na sessão (Session não é thread-safe).
+            prefetch: Dict[int, Any] = {}
+            if len(fc_parts) > 1:
+                for idx, part in enumerate(fc_parts):
+                    fn_name = part.function_call.name
+                    if fn_name not in _DB_FREE_TOOLS or tool_calls_used + idx + 1 > _MAX_TOOL_CALLS:
+                        continue
+                    fn_args = dict(part.function_call.args) if part.function_call.args else {}
+                    if (fn_name, json.dumps(fn_args, sort_keys=True, default=str)) in tool_memo:
+                        continue
+                    prefetch[idx] = _TOOL_POOL.submit(dispatch_tool, None, fn_name, fn_args)
 
+            function_responses = []
+            for idx, part in enumerate(fc_parts):
                 fc = part.function_call
                 fn_name = fc.name
                 fn_args = dict(fc.args) if fc.args else {}
@@ -179,16 +309,29 @@ class EstagiarioExecutor:
                     on_step(label)
 
                 if tool_calls_used > _MAX_TOOL_CALLS:
-                    print(f"{_TAG}   [BUDGET] Limite atingido ({_MAX_TOOL_CALLS}).")
-                    result_data = {"error": "Limite de ferramentas atingido. Redija a resposta final agora."}
+                    logger.info("  [BUDGET] Limite atingido (%d).", _MAX_TOOL_CALLS)
+                    result_json = json.dumps(
+                        {"error": "Limite de ferramentas atingido. Redija a resposta final agora."},
+                        ensure_ascii=False,
+                    )
                 else:
-                    print(f"{_TAG}   [TOOL {tool_calls_used}/{_MAX_TOOL_CALLS}] {fn_name}({_summarize_args(fn_args)})")
-                    try:
-                        result_data = dispatch_tool(db, fn_name, fn_args)
-                    except Exception as e:
-                        result_data = {"error": str(e)}
-                    result_json = json.dumps(result_data, ensure_ascii=False, default=str)
-                    print(f"{_TAG}   [TOOL {tool_calls_used}/{_MAX_TOOL_CALLS}] → {len(result_json)} chars")
+                    if logger.isEnabledFor(logging.INFO):
+                        # _summarize_args monta strings por argumento: só vale a pena se o log vai sair
+                        logger.info("  [TOOL %d/%d] %s(%s)", tool_calls_used, _MAX_TOOL_CALLS, fn_name, _summarize_args(fn_args))
+                    memo_key = (fn_name, json.dumps(fn_args, sort_keys=True, default=str))
+                    result_json = tool_memo.get(memo_key)
+                    if result_json is None:
+                        try:
+                            future = prefetch.get(idx)
+                            result_data = future.result() if future is not None else dispatch_tool(db, fn_name, fn_args)
+                        except Exception as e:
+                            result_data = {"error": str(e)}
+                        result_json = _dumps_tool_result(result_data)
+                        if "error" not in result_data:
+                            tool_memo[memo_key] = result_json
+                        logger.info("  [TOOL %d/%d] → %d chars", tool_calls_used, _MAX_TOOL_CALLS, len(result_json))
+                    else:
+                        logger.info("  [TOOL %d/%d] → memo (%d chars)", tool_calls_used, _MAX_TOOL_CALLS, len(result_json))
 
                 trace.append({
                     "type": "tool_call",
@@ -201,22 +344,22 @@ class EstagiarioExecutor:
                     _genai.protos.Part(
                         function_response=_genai.protos.FunctionResponse(
                             name=fn_name,
-                            response={"result": json.dumps(result_data, ensure_ascii=False, default=str)},
+                            response={"result": result_json},
                         )
                     )
                 )
 
-            print(f"{_TAG}   Reenviando com {len(function_responses)} respostas de tool...")
+            logger.info("  Reenviando com %d respostas de tool...", len(function_responses))
             response = model.generate_content(
                 [
                     _genai.protos.Content(role="user", parts=[_genai.protos.Part(text=prompt_text)]),
                     candidate.content,
                     _genai.protos.Content(role="function", parts=function_responses),
                 ],
-                generation_config={"temperature": 0.3, "max_output_tokens": _MAX_OUTPUT_TOKENS},
+                generation_config=_GENERATION_CONFIG,
             )
 
-        print(f"{_TAG} Limite de iterações atingido ({_MAX_ITERATIONS}).")
+        logger.info("Limite de iterações atingido (%d).", _MAX_ITERATIONS)
         return None
 
     # ──────────────────────────────────────────────────────────
@@ -232,29 +375,34 @@ class EstagiarioExecutor:
         on_step: Optional[Callable],
     ) -> str:
         """Evaluate answer quality. If poor, re-prompt with feedback (max retries)."""
-        model_critic = _genai.GenerativeModel(_GEMINI_MODEL)
         current = resposta
+        if _passes_fast_critique(current):
+            trace.append({"type": "critique", "attempt": 0, "nota": 5, "feedback": "OK (heurística)"})
+            logger.info("Critique dispensada: resposta já cita dados e fontes")
+            return current
+
+        model_critic = _critic_model(_genai)
 
         for attempt in range(_MAX_CRITIQUE_RETRIES):
-            critique_prompt = PROMPT_CRITIQUE_V1.format(
+            critique_prompt = PROMPT_CRITIQUE_V2.format(
                 pergunta=pergunta,
                 resposta=current,
             )
             try:
                 resp = model_critic.generate_content(
                     critique_prompt,
-                    generation_config={"temperature": 0.1, "max_output_tokens": 512},
+                    generation_config=_CRITIQUE_GENERATION_CONFIG,
                 )
                 raw = (resp.text or "").strip()
                 evaluation = _parse_critique(raw)
             except Exception as e:
-                print(f"{_TAG} Critique falhou: {e}")
+                logger.warning("Critique falhou: %s", e)
                 break
 
             nota = evaluation.get("nota", 5)
             feedback = evaluation.get("feedback", "OK")
             trace.append({"type": "critique", "attempt": attempt + 1, "nota": nota, "feedback": feedback})
-            print(f"{_TAG} Critique #{attempt + 1}: nota={nota}, feedback={feedback[:80]}")
+            logger.info("Critique #%d: nota=%s, feedback=%.80s", attempt + 1, nota, feedback)
 
             if nota >= 4:
                 break
@@ -262,6 +410,23 @@ class EstagiarioExecutor:
             if on_step:
                 on_step("Refinando resposta...")
 
+            # Caminho rápido: a própria critique já trouxe a resposta reescrita
+            revisada = (evaluation.get("resposta_revisada") or "").strip()
+            if revisada and len(revisada) > len(current) * 0.5:
+                current = revisada
+                trace.append({"type": "retry", "attempt": attempt + 1, "chars": len(revisada), "fused": True})
+                logger.info("Resposta melhorada na própria critique (%d chars)", len(revisada))
+                if _passes_fast_critique(current):
+                    # Reescrita já atende aos critérios: não gasta outra rodada de critique LLM
+                    break
+                continue
+
+            if not feedback or feedback.strip().upper() == "OK":
+                # Nota baixa sem feedback acionável (ex.: critique truncada): um re-prompt
+                # não teria o que corrigir, então não gasta a chamada LLM.
+                logger.info("Retry dispensado: critique sem feedback acionável")
+                break
+
             retry_prompt = (
                 f"Sua resposta anterior recebeu nota {nota}/5. Feedback: {feedback}\n\n"
                 f"Pergunta original: {pergunta}\n\n"
@@ -272,15 +437,17 @@ class EstagiarioExecutor:
             try:
                 resp2 = model_critic.generate_content(
                     retry_prompt,
-                    generation_config={"temperature": 0.3, "max_output_tokens": _MAX_OUTPUT_TOKENS},
+                    generation_config=_GENERATION_CONFIG,
                 )
                 improved = (resp2.text or "").strip()
                 if improved and len(improved) > len(current) * 0.5:
                     current = improved
                     trace.append({"type": "retry", "attempt": attempt + 1, "chars": len(improved)})
-                    print(f"{_TAG} Resposta melhorada ({len(improved)} chars)")
+                    logger.info("Resposta melhorada (%d chars)", len(improved))
+                    if _passes_fast_critique(current):
+                        break
             except Exception as e:
-                print(f"{_TAG} Retry falhou: {e}")
+                logger.warning("Retry falhou: %s", e)
                 break
 
         return current
@@ -290,24 +457,129 @@ class EstagiarioExecutor:
 # Helpers
 # ══════════════════════════════════════════════════════════════
 
+def _normalize_question(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _RE_SPACES.sub(" ", _RE_PUNCT.sub(" ", (text or "").lower())).strip()
+
+
+def _answer_cache_key(user_input: str, chat_history: List[str], data_referencia: str) -> tuple:
+    # Modelo e histórico entram na chave: a mesma pergunta em outra conversa pode ter outra resposta
+    return (_GEMINI_MODEL, data_referencia or "", tuple(chat_history), _normalize_question(user_input))
+
+
+def _pergunta_volatil(pergunta_norm: str) -> bool:
+    if not _TERMOS_VOLATEIS.isdisjoint(pergunta_norm.split()):
+        return True
+    return any(f in pergunta_norm for f in _FRASES_VOLATEIS)
+
+
+def _answer_cache_ttl(data_referencia: str) -> int:
+    """Anchored (dia passado) vive bem mais que o dia corrente; ISO compara como string."""
+    if data_referencia and data_referencia < get_date_brasil().isoformat():
+        return _ANSWER_CACHE_TTL_PASSADO
+    return _ANSWER_CACHE_TTL
+
+
+def _termos_chave(pergunta: str) -> frozenset:
+    """Números e nomes próprios/siglas da pergunta original (antes de normalizar)."""
+    numeros = _RE_NUMERO.findall(pergunta)
+    nomes = [n.lower() for n in _RE_NOME_PROPRIO.findall(pergunta.strip())]
+    return frozenset(numeros + nomes)
+
+
+def _embed_pergunta(_genai, pergunta_norm: str) -> Optional[bytes]:
+    """Embedding float32 da pergunta (task SEMANTIC_SIMILARITY); reusa o genai já configurado."""
+    try:
+        result = _genai.embed_content(
+            model=_EMBEDDING_MODEL,
+            content=pergunta_norm,
+            task_type="SEMANTIC_SIMILARITY",
+            output_dimensionality=768,
+        )
+        valores = result.get("embedding") if isinstance(result, dict) else getattr(result, "embedding", None)
+        return array("f", valores).tobytes() if valores else None
+    except Exception as e:
+        logger.warning("Embedding da pergunta falhou: %s", e)
+        return None
+
+
+def _semantic_cache_lookup(ctx: tuple, termos: frozenset, emb: Optional[bytes]) -> Optional[Tuple[str, float]]:
+    """Melhor resposta em cache para o mesmo contexto e mesmos termos-chave com similaridade >= limiar."""
+    if emb is None or cosine_similarity_bytes is None:
+        return None
+    agora = time.time()
+    melhor, melhor_sim = None, _SEMANTIC_CACHE_THRESHOLD
+    for entry in _SEMANTIC_CACHE:
+        if entry["ctx"] != ctx or entry["termos"] != termos or agora - entry["ts"] >= entry["ttl"]:
+            continue
+        sim = cosine_similarity_bytes(emb, entry["emb"])
+        if sim >= melhor_sim:
+            melhor, melhor_sim = entry, sim
+    return (melhor["final"], melhor_sim) if melhor else None
+
+
+def _semantic_cache_store(ctx: tuple, termos: frozenset, emb: bytes, final: str, ttl: int) -> None:
+    agora = time.time()
+    _SEMANTIC_CACHE[:] = [e for e in _SEMANTIC_CACHE if agora - e["ts"] < e["ttl"]]
+    if len(_SEMANTIC_CACHE) >= _SEMANTIC_CACHE_MAX:
+        del _SEMANTIC_CACHE[0]
+    _SEMANTIC_CACHE.append({"ctx": ctx, "termos": termos, "emb": emb, "final": final, "ts": agora, "ttl": ttl})
+
+
+def _passes_fast_critique(resposta: str) -> bool:
+    """Cheap pre-check mirroring the critique prompt criteria (specific data + cited sources)."""
+    return (
+        len(resposta) >= _CRITIQUE_FAST_MIN_CHARS
+        and _RE_SECAO_FONTES.search(resposta) is not None
+        and _RE_DADO_ESPECIFICO.search(resposta) is not None
+    )
+
+
 def _parse_critique(raw: str) -> dict:
-    m = re.search(r"\{[^}]*\"nota\"\s*:", raw)
-    if m:
-        brace_start = m.start()
-        depth, end = 0, brace_start
+    # Caminho rápido: resposta em JSON mode já é um objeto JSON válido
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, dict) and "nota" in parsed:
+            return parsed
+    except (json.JSONDecodeError, TypeError):
+        pass
+    # Fallback (texto em volta do JSON): localiza '"nota"' com find, volta até o '{' que o abre
+    # e recorta o objeto numa única varredura que ignora chaves dentro de strings
+    pos = raw.find('"nota"') if isinstance(raw, str) else -1
+    brace_start = raw.rfind("{", 0, pos) if pos != -1 else -1
+    if brace_start != -1:
+        depth, in_str, esc = 0, False, False
         for i in range(brace_start, len(raw)):
-            if raw[i] == '{':
+            ch = raw[i]
+            if in_str:
+                if esc:
+                    esc = False
+                elif ch == "\\":
+                    esc = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
                 depth += 1
-            elif raw[i] == '}':
+            elif ch == "}":
                 depth -= 1
                 if depth == 0:
-                    end = i + 1
-                    break
+                    try:
+                        return json.loads(raw[brace_start:i + 1])
+                    except json.JSONDecodeError:
+                        break
+    return {"nota": 5, "feedback": "OK"}
+
+
+def _dumps_tool_result(data: Any) -> str:
+    """Serializa o resultado de uma tool (listas de clusters aninhadas): orjson quando instalado."""
+    if orjson is not None:
         try:
-            return json.loads(raw[brace_start:end])
-        except json.JSONDecodeError:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except Exception:
             pass
-    return {"nota": 5, "feedback": "OK"}
+    return json.dumps(data, ensure_ascii=False, default=str)
 
 
 def _summarize_args(args: dict) -> str:
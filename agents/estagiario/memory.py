@@ -1,16 +1,15 @@
-from typing import List
+from collections import deque
+from typing import Deque, List
 
 
 class SimpleMemory:
-    """Memória simples em processo para o executor ReAct."""
+    """Memória simples em processo para o executor ReAct (guarda só as últimas 20 linhas)."""
 
     def __init__(self) -> None:
-        self.lines: List[str] = []
+        self.lines: Deque[str] = deque(maxlen=20)
 
     def add(self, role: str, content: str) -> None:
         self.lines.append(f"{role}: {content}")
 
     def dump(self) -> List[str]:
-        return self.lines[-20:]
-
-
+        return list(self.lines)
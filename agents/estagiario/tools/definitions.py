@@ -8,23 +8,38 @@ Cada tool tem: Pydantic input schema, implementação, Gemini FunctionDeclaratio
 from __future__ import annotations
 
 import json
+import re
 import datetime
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Tuple
 
 try:
     from backend.database import SessionLocal
     from backend.crud import (
         get_clusters_for_feed_by_date,
         get_cluster_details_by_id,
+        get_cluster_titles_by_date,
+        get_cluster_embeddings_by_date,
+        get_cluster_summaries_by_ids,
     )
     from backend.utils import get_date_brasil
 except Exception:
     SessionLocal = None  # type: ignore
     get_clusters_for_feed_by_date = None  # type: ignore
+    get_cluster_titles_by_date = None  # type: ignore
     get_cluster_details_by_id = None  # type: ignore
+    get_cluster_embeddings_by_date = None  # type: ignore
+    get_cluster_summaries_by_ids = None  # type: ignore
     get_date_brasil = None  # type: ignore
 
+try:
+    from backend.processing import gerar_embedding_v2
+except Exception:
+    gerar_embedding_v2 = None  # type: ignore
+
 try:
     from agents.resumo_diario.tools.definitions import (
         execute_obter_textos_brutos,
@@ -45,30 +60,34 @@ def _open_db():
 # Tool 1: list_cluster_titles
 # ══════════════════════════════════════════════════════════════
 
+# Teto da listagem: P1/P2 e os mais recentes vêm primeiro, o resto não cabe no contexto do modelo
+_MAX_TITLES = 500
+
+
 def list_cluster_titles(db, data_str: str = "") -> List[Dict[str, Any]]:
     """Lightweight list of all clusters (id, title, tags, priority) for a given date."""
     d = _parse_date(data_str)
-    page, acc = 1, []
-    while True:
-        resp = get_clusters_for_feed_by_date(db, d, page=page, page_size=100, load_full_text=False)
-        for c in resp.get("clusters", []):
-            acc.append({
-                "id": c.get("id"),
-                "titulo": c.get("titulo_final", ""),
-                "prioridade": c.get("prioridade", ""),
-                "tags": c.get("tags") or [],
-                "fontes": [f.get("jornal", "") for f in (c.get("fontes") or [])[:3]],
-            })
-        if not resp.get("paginacao", {}).get("tem_proxima"):
-            break
-        page += 1
-    return acc
+    return get_cluster_titles_by_date(db, d, limite=_MAX_TITLES)
 
 
 # ══════════════════════════════════════════════════════════════
 # Tool 2: query_clusters
 # ══════════════════════════════════════════════════════════════
 
+# O modelo às vezes manda "P1", "p2_estrategico" ou "prioridade p3": uma regex, um lookup
+_RE_PRIORIDADE = re.compile(r"\b(p[123])(?:[_-]\w+)?\b", re.IGNORECASE)
+_PRIORIDADE_MAP = MappingProxyType({
+    "P1": "P1_CRITICO",
+    "P2": "P2_ESTRATEGICO",
+    "P3": "P3_MONITORAMENTO",
+})
+
+
+def _normalize_prioridade(prioridade: str) -> Optional[str]:
+    m = _RE_PRIORIDADE.search(prioridade) if prioridade else None
+    return _PRIORIDADE_MAP.get(m.group(1).upper()) if m else None
+
+
 def query_clusters(
     db,
     data_str: str = "",
@@ -78,35 +97,14 @@ def query_clusters(
 ) -> List[Dict[str, Any]]:
     """Search clusters with filters (priority, keywords). Returns title + resumo."""
     d = _parse_date(data_str)
-    prio = prioridade if prioridade in {"P1_CRITICO", "P2_ESTRATEGICO", "P3_MONITORAMENTO"} else None
-    kws = [k.strip().lower() for k in palavras_chave.split(",") if k.strip()] if palavras_chave else []
-    page, acc = 1, []
-    while len(acc) < limite:
-        resp = get_clusters_for_feed_by_date(
-            db, d, page=page, page_size=min(100, limite - len(acc)),
-            load_full_text=False, priority=prio,
-        )
-        clusters = resp.get("clusters", [])
-        if kws:
-            filtered = []
-            for c in clusters:
-                blob = ((c.get("titulo_final") or "") + " " + (c.get("resumo_final") or "")).lower()
-                if any(k in blob for k in kws):
-                    filtered.append(c)
-            clusters = filtered
-        for c in clusters:
-            acc.append({
-                "id": c.get("id"),
-                "titulo": c.get("titulo_final", ""),
-                "resumo": (c.get("resumo_final") or "")[:600],
-                "prioridade": c.get("prioridade", ""),
-                "tags": c.get("tags") or [],
-                "fontes": [f.get("jornal", "") for f in (c.get("fontes") or [])[:3]],
-            })
-        if not resp.get("paginacao", {}).get("tem_proxima"):
-            break
-        page += 1
-    return acc[:limite]
+    prio = _normalize_prioridade(prioridade)
+    kws = tuple(_split_keywords(palavras_chave))
+    rows = []
+    for c in islice(_iter_matching_clusters(db, d, kws, prio), max(0, limite)):
+        row = _cluster_row(c, 600)
+        row["fontes"] = [f.get("nome", "") for f in (c.get("fontes") or [])[:3]]
+        rows.append(row)
+    return rows
 
 
 # ══════════════════════════════════════════════════════════════
@@ -140,37 +138,80 @@ def query_clusters_range(
     if (d_end - d_start).days > _MAX_RANGE_DAYS:
         d_start = d_end - datetime.timedelta(days=_MAX_RANGE_DAYS)
 
-    kws = [k.strip().lower() for k in palavras_chave.split(",") if k.strip()] if palavras_chave else []
-    acc = []
+    kws = tuple(_split_keywords(palavras_chave))
+    acc: List[Dict[str, Any]] = []
     current = d_start
     while current <= d_end and len(acc) < limite:
-        page = 1
-        while len(acc) < limite:
-            resp = get_clusters_for_feed_by_date(db, current, page=page, page_size=100, load_full_text=False)
-            clusters = resp.get("clusters", [])
-            if kws:
-                clusters = [
-                    c for c in clusters
-                    if any(k in ((c.get("titulo_final") or "") + " " + (c.get("resumo_final") or "")).lower() for k in kws)
-                ]
-            for c in clusters:
-                acc.append({
-                    "id": c.get("id"),
-                    "data": current.isoformat(),
-                    "titulo": c.get("titulo_final", ""),
-                    "resumo": (c.get("resumo_final") or "")[:400],
-                    "prioridade": c.get("prioridade", ""),
-                    "tags": c.get("tags") or [],
-                })
-            if not resp.get("paginacao", {}).get("tem_proxima"):
-                break
-            page += 1
+        data_iso = current.isoformat()  # uma vez por dia, não por cluster
+        acc.extend(
+            _cluster_row(c, 400, data_iso)
+            for c in islice(_iter_matching_clusters(db, current, kws), limite - len(acc))
+        )
         current += datetime.timedelta(days=1)
-    return acc[:limite]
+    return acc
+
+
+# ══════════════════════════════════════════════════════════════
+# Tool 5: busca_semantica_clusters — triagem local por embedding
+# ══════════════════════════════════════════════════════════════
+
+_SEMANTICA_LIMITE_PADRAO = 12
+# gerar_embedding_v2 não embeda textos com menos de 10 caracteres: essas perguntas vão por palavra-chave
+_SEMANTICA_MIN_CHARS = 10
+
+
+def busca_semantica_clusters(
+    db,
+    pergunta: str,
+    data_str: str = "",
+    limite: int = _SEMANTICA_LIMITE_PADRAO,
+) -> Any:
+    """
+    Rank the day's clusters by cosine similarity between the question and the
+    articles' embedding_v2 (score do cluster = melhor artigo). Substitui ler centenas
+    de títulos no contexto do modelo: uma chamada de embedding + um produto matricial.
+    """
+    if len((pergunta or "").strip()) < _SEMANTICA_MIN_CHARS:
+        return query_clusters(db, data_str, palavras_chave=pergunta or "", limite=limite)
+    if gerar_embedding_v2 is None or get_cluster_embeddings_by_date is None:
+        return {"error": "Busca semântica indisponível. Use query_clusters com palavras-chave."}
+    q_bytes = gerar_embedding_v2(pergunta)
+    if not q_bytes:
+        return {"error": "Não foi possível gerar o embedding da pergunta. Use query_clusters com palavras-chave."}
+
+    import numpy as np
+
+    # Só (cluster_id, embedding) dos clusters exibíveis do dia; linhas completas apenas do top-k
+    rows = get_cluster_embeddings_by_date(db, _parse_date(data_str))
+    if not rows:
+        return []
+    q = np.frombuffer(q_bytes, dtype=np.float32)
+    rows = [r for r in rows if len(r.embedding_v2) == q.nbytes]
+    if not rows:
+        return {"error": "Clusters do dia sem embeddings. Use query_clusters com palavras-chave."}
+
+    # embedding_v2 já é gravado normalizado: produto escalar = cosseno
+    matriz = np.frombuffer(b"".join(r.embedding_v2 for r in rows), dtype=np.float32).reshape(len(rows), -1)
+    scores = matriz @ q
+    melhor: Dict[int, float] = {}
+    for cid, score in zip((r.cluster_id for r in rows), scores.tolist()):
+        if score > melhor.get(cid, -1.0):
+            melhor[cid] = score
+
+    ranking = sorted(melhor.items(), key=lambda kv: kv[1], reverse=True)[:max(0, limite)]
+    clusters = get_cluster_summaries_by_ids(db, [cid for cid, _ in ranking])
+    out = []
+    for cid, score in ranking:
+        if cid not in clusters:
+            continue
+        row = _cluster_row(clusters[cid], 600)
+        row["similaridade"] = round(score, 3)
+        out.append(row)
+    return out
 
 
 # ══════════════════════════════════════════════════════════════
-# Tool 5 & 6: reuse from resumo agent (obter_textos_brutos, buscar_na_web)
+# Tool 6 & 7: reuse from resumo agent (obter_textos_brutos, buscar_na_web)
 # ══════════════════════════════════════════════════════════════
 # execute_obter_textos_brutos(db, cluster_id) — imported above
 # execute_buscar_na_web(query)                — imported above
@@ -180,8 +221,9 @@ def query_clusters_range(
 # Gemini FunctionDeclaration schemas
 # ══════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=1)
 def build_tool_declarations():
-    """Build genai.protos.Tool with all estagiario function declarations."""
+    """Build genai.protos.Tool with all estagiario function declarations (static: built once per process)."""
     import google.generativeai as genai  # type: ignore
 
     S = genai.protos.Schema
@@ -236,6 +278,19 @@ def build_tool_declarations():
                 "limite": S(type=T.INTEGER, description="Máximo de resultados (padrão 50)."),
             }, required=["data_inicio", "data_fim"]),
         ),
+        FD(
+            name="busca_semantica_clusters",
+            description=(
+                "Busca por SIGNIFICADO: ranqueia os clusters de uma data pela similaridade com a pergunta "
+                "(embeddings), sem precisar de palavras-chave exatas. Retorna os mais relevantes com titulo + resumo. "
+                "Prefira a list_cluster_titles para perguntas temáticas."
+            ),
+            parameters=S(type=T.OBJECT, properties={
+                "pergunta": S(type=T.STRING, description="Pergunta ou tema a buscar, em linguagem natural."),
+                "data": S(type=T.STRING, description="Data YYYY-MM-DD. Padrão: hoje."),
+                "limite": S(type=T.INTEGER, description="Máximo de resultados (padrão 12)."),
+            }, required=["pergunta"]),
+        ),
         FD(
             name="obter_textos_brutos_cluster",
             description=(
@@ -264,53 +319,118 @@ def build_tool_declarations():
 # Dispatcher — maps tool name → execution function
 # ══════════════════════════════════════════════════════════════
 
+def _dispatch_obter_textos_brutos(db, args: dict) -> Any:
+    if execute_obter_textos_brutos is None:
+        return {"error": "obter_textos_brutos indisponível (import falhou)."}
+    return execute_obter_textos_brutos(db, cluster_id=int(args.get("cluster_id", 0)))
+
+
+def _dispatch_buscar_na_web(db, args: dict) -> Any:
+    if execute_buscar_na_web is None:
+        return {"error": "buscar_na_web indisponível (import falhou)."}
+    return execute_buscar_na_web(query=str(args.get("query", "")))
+
+
+_TOOL_DISPATCH: Dict[str, Callable[[Any, dict], Any]] = {
+    "list_cluster_titles": lambda db, args: list_cluster_titles(db, data_str=args.get("data", "")),
+    "query_clusters": lambda db, args: query_clusters(
+        db,
+        data_str=args.get("data", ""),
+        prioridade=args.get("prioridade", ""),
+        palavras_chave=args.get("palavras_chave", ""),
+        limite=int(args.get("limite", 30)),
+    ),
+    "get_cluster_details": lambda db, args: get_cluster_details(db, cluster_id=int(args.get("cluster_id", 0))),
+    "query_clusters_range": lambda db, args: query_clusters_range(
+        db,
+        data_inicio=args.get("data_inicio", ""),
+        data_fim=args.get("data_fim", ""),
+        palavras_chave=args.get("palavras_chave", ""),
+        limite=int(args.get("limite", 50)),
+    ),
+    "busca_semantica_clusters": lambda db, args: busca_semantica_clusters(
+        db,
+        pergunta=str(args.get("pergunta", "")),
+        data_str=args.get("data", ""),
+        limite=int(args.get("limite", _SEMANTICA_LIMITE_PADRAO)),
+    ),
+    "obter_textos_brutos_cluster": _dispatch_obter_textos_brutos,
+    "buscar_na_web": _dispatch_buscar_na_web,
+}
+
+
 def dispatch_tool(db, tool_name: str, args: dict) -> Any:
     """Execute a tool by name. All tools are read-only."""
-    if tool_name == "list_cluster_titles":
-        return list_cluster_titles(db, data_str=args.get("data", ""))
-
-    if tool_name == "query_clusters":
-        return query_clusters(
-            db,
-            data_str=args.get("data", ""),
-            prioridade=args.get("prioridade", ""),
-            palavras_chave=args.get("palavras_chave", ""),
-            limite=int(args.get("limite", 30)),
-        )
+    handler = _TOOL_DISPATCH.get(tool_name)
+    if handler is None:
+        return {"error": f"Tool '{tool_name}' não reconhecida."}
+    return handler(db, args)
+
 
-    if tool_name == "get_cluster_details":
-        return get_cluster_details(db, cluster_id=int(args.get("cluster_id", 0)))
+# ══════════════════════════════════════════════════════════════
+# Helpers
+# ══════════════════════════════════════════════════════════════
 
-    if tool_name == "query_clusters_range":
-        return query_clusters_range(
-            db,
-            data_inicio=args.get("data_inicio", ""),
-            data_fim=args.get("data_fim", ""),
-            palavras_chave=args.get("palavras_chave", ""),
-            limite=int(args.get("limite", 50)),
+def _split_keywords(palavras_chave: str) -> List[str]:
+    """'a, B ,a' → ['a', 'b']: lowercased uma vez, sem vazios nem repetidos (ordem preservada)."""
+    if not palavras_chave:
+        return []
+    return list(dict.fromkeys(k for k in (p.strip().lower() for p in palavras_chave.split(",")) if k))
+
+
+_FEED_PAGE_SIZE = 100
+
+
+def _feed_page(
+    db, d: datetime.date, page: int, page_size: int,
+    priority: Optional[str] = None, kws: Tuple[str, ...] = (),
+) -> Dict[str, Any]:
+    """
+    get_clusters_for_feed_by_date memoizado na própria sessão (db.info): a sessão vive
+    uma execução do executor, então tools diferentes que leem o mesmo dia/página reusam o resultado.
+    As palavras-chave vão para o SQL (ILIKE em título/resumo) — só os clusters que casam vêm do banco.
+    """
+    cache = db.info.setdefault("estagiario_feed_cache", {})
+    key = (d, page, page_size, priority, kws)
+    resp = cache.get(key)
+    if resp is None:
+        resp = cache[key] = get_clusters_for_feed_by_date(
+            db, d, page=page, page_size=page_size, load_full_text=False,
+            priority=priority, palavras_chave=list(kws) or None,
         )
+    return resp
 
-    if tool_name == "obter_textos_brutos_cluster":
-        if execute_obter_textos_brutos is None:
-            return {"error": "obter_textos_brutos indisponível (import falhou)."}
-        return execute_obter_textos_brutos(db, cluster_id=int(args.get("cluster_id", 0)))
 
-    if tool_name == "buscar_na_web":
-        if execute_buscar_na_web is None:
-            return {"error": "buscar_na_web indisponível (import falhou)."}
-        return execute_buscar_na_web(query=str(args.get("query", "")))
+def _iter_matching_clusters(db, d: datetime.date, kws: Tuple[str, ...] = (), priority: Optional[str] = None):
+    """
+    Percorre as páginas do feed do dia (memoizadas) já filtradas por palavras-chave no banco
+    (todas, se kws vazio). Preguiçoso: consumido via islice, para no limite sem ler páginas além do necessário.
+    """
+    page = 1
+    while True:
+        resp = _feed_page(db, d, page, _FEED_PAGE_SIZE, priority, kws)
+        yield from resp.get("clusters", [])
+        if not resp.get("paginacao", {}).get("tem_proxima"):
+            return
+        page += 1
 
-    return {"error": f"Tool '{tool_name}' não reconhecida."}
 
+def _cluster_row(c: Dict[str, Any], resumo_max: int, data_iso: Optional[str] = None) -> Dict[str, Any]:
+    """Linha compacta de cluster devolvida ao modelo (query_clusters / query_clusters_range)."""
+    row = {"id": c.get("id")}
+    if data_iso is not None:
+        row["data"] = data_iso
+    row["titulo"] = c.get("titulo_final", "")
+    row["resumo"] = (c.get("resumo_final") or "")[:resumo_max]
+    row["prioridade"] = c.get("prioridade", "")
+    row["tags"] = c.get("tags") or []
+    return row
 
-# ══════════════════════════════════════════════════════════════
-# Helpers
-# ══════════════════════════════════════════════════════════════
 
 def _parse_date(s: str) -> datetime.date:
     if s:
         try:
-            return datetime.datetime.strptime(s.strip(), "%Y-%m-%d").date()
+            return datetime.date.fromisoformat(s.strip())
         except ValueError:
             pass
     return get_date_brasil() if get_date_brasil else datetime.date.today()
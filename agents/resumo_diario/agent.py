@@ -16,12 +16,19 @@ Pós-resumo: promover_clusters_pos_resumo() promove P3→P2 para clusters seleci
 
 from __future__ import annotations
 
+import io
 import json
 import os
 import re
 import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Set, Tuple
 
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
 try:
     from backend.database import SessionLocal, ClusterEvento
     from backend.crud import (
@@ -31,7 +38,7 @@ try:
         get_resumo_default,
         update_cluster_priority,
     )
-    from backend.utils import get_date_brasil
+    from backend.utils import get_date_brasil, normalizar_fonte_display
     from backend.prompts import (
         PROMPT_CORRECAO_PYDANTIC_V1,
     )
@@ -44,6 +51,7 @@ except Exception:
     get_resumo_default = None  # type: ignore
     update_cluster_priority = None  # type: ignore
     get_date_brasil = None  # type: ignore
+    normalizar_fonte_display = lambda x: x  # type: ignore
     PROMPT_CORRECAO_PYDANTIC_V1 = ""  # type: ignore
 
 from agents.resumo_diario.tools.definitions import (
@@ -65,6 +73,26 @@ _MAX_OUTPUT_TOKENS_RESUMO = 16384
 # Cache de contexto com invalidacao por updated_at de clusters_eventos
 _CONTEXT_CACHE: Dict[str, Any] = {}
 
+# Conjuntos/regex de validação montados uma vez (usados por cluster na validação e formatação)
+_SECOES_VALIDAS = frozenset({"foco_analista", "distressed", "estrategico", "regulatorio", "internacional"})
+_NOMES_FONTE_VAZIOS = frozenset({"fonte desconhecida", "n/a", ""})
+_FONTES_INVALIDAS = frozenset({
+    '', 'fonte não identificada', 'fonte desconhecida',
+    'não identificada', 'n/a', 'desconhecida',
+    'sem fonte', 'unknown',
+})
+# Instruções de tool / placeholders que o LLM às vezes devolve no lugar do nome da fonte
+_RE_FONTE_PLACEHOLDER = re.compile(r"obter_textos_brutos|não identificada|usar obter|identificar a fonte")
+_PRIO_EMOJI = {"Alta": "🔴", "Media": "🟡", "Baixa": "🔵"}
+
+# Dedup Barretti (Jaccard sobre títulos)
+_RE_NAO_PALAVRA = re.compile(r"[^\w\s]")
+_STOP_TITULO = frozenset({
+    "a", "o", "e", "de", "do", "da", "em", "no", "na", "para", "por",
+    "com", "que", "os", "as", "um", "uma", "ao", "dos", "das", "nos",
+    "nas", "se", "é", "ser", "mais", "sobre", "já", "mas", "não",
+})
+
 # --------------------------------------------------------------------------- #
 # HELPERS
 # --------------------------------------------------------------------------- #
@@ -129,7 +157,7 @@ def _load_yesterday_context(db, target_date: datetime.date) -> str:
 
         linhas = [f"  - {t}" for t in titulos_ontem]
         bloco = (
-            f"\n--- CONTEXTO DE ONTEM ({yesterday.strftime('%d/%m')}) ---\n"
+            f"\n--- CONTEXTO DE ONTEM ({_format_date_label(yesterday.isoformat())}) ---\n"
             f"Estes temas JÁ FORAM cobertos no resumo de ontem:\n"
             + "\n".join(linhas)
             + "\n\nSe algum destes temas REAPARECER hoje SEM fato novo concreto, NÃO o inclua.\n"
@@ -143,12 +171,19 @@ def _load_yesterday_context(db, target_date: datetime.date) -> str:
         return ""
 
 
+def _intervalo_dia(target_date: datetime.date) -> Tuple[datetime.datetime, datetime.datetime]:
+    """[início do dia, início do dia seguinte): filtro por intervalo usa o índice (status, created_at)."""
+    inicio = datetime.datetime.combine(target_date, datetime.time.min)
+    return inicio, inicio + datetime.timedelta(days=1)
+
+
 def _build_tipo_fonte_map(db, target_date: datetime.date) -> Dict[int, str]:
     """Busca tipo_fonte diretamente do ORM (campo não exposto pelo CRUD feed)."""
     try:
-        from sqlalchemy import func
+        inicio, fim = _intervalo_dia(target_date)
         rows = db.query(ClusterEvento.id, ClusterEvento.tipo_fonte).filter(
-            func.date(ClusterEvento.created_at) == target_date,
+            ClusterEvento.created_at >= inicio,
+            ClusterEvento.created_at < fim,
             ClusterEvento.status == 'ativo',
         ).all()
         return {r.id: (r.tipo_fonte or 'nacional') for r in rows}
@@ -165,7 +200,6 @@ def _resolve_fontes_from_artigos(db, cluster_id: int) -> List[str]:
     """
     try:
         from backend.database import ArtigoBruto
-        from backend.utils import normalizar_fonte_display
     except ImportError:
         return []
 
@@ -181,14 +215,14 @@ def _resolve_fontes_from_artigos(db, cluster_id: int) -> List[str]:
         raw_name = ""
         if jornal:
             raw_name = jornal.strip()
-        if not raw_name or raw_name.lower() in ("fonte desconhecida", "n/a", ""):
+        if not raw_name or raw_name.lower() in _NOMES_FONTE_VAZIOS:
             meta = metadados or {}
             raw_name = (
                 meta.get("fonte_original")
                 or meta.get("jornal")
                 or ""
             ).strip()
-        if not raw_name or raw_name.lower() in ("fonte desconhecida", "n/a", ""):
+        if not raw_name or raw_name.lower() in _NOMES_FONTE_VAZIOS:
             meta = metadados or {}
             arq = meta.get("arquivo_origem", "")
             if arq:
@@ -241,8 +275,19 @@ def _build_context_block(db, target_date: datetime.date) -> Tuple[str, List[int]
     tipo_fonte_map = _build_tipo_fonte_map(db, target_date)
     fontes_map: Dict[int, List[str]] = {}  # cluster_id -> [nomes de jornais]
 
-    linhas: List[str] = []
+    # Buffer único: cada fragmento condicional vai direto para o StringIO
+    buf = io.StringIO()
+    w = buf.write
+    # Estatísticas da temperatura acumuladas no mesmo laço (antes: 4 passadas extras na lista)
+    contagem_prio: Dict[str, int] = {}
+    tags_distintas: Set[str] = set()
     for c in clusters_all:
+        prio_raw = c.get("prioridade")
+        contagem_prio[prio_raw] = contagem_prio.get(prio_raw, 0) + 1
+        tag = c.get("tag", "")
+        if tag:
+            tags_distintas.add(tag)
+
         cid = c.get("id")
         if cid is None:
             continue
@@ -250,16 +295,12 @@ def _build_context_block(db, target_date: datetime.date) -> Tuple[str, List[int]
         prio = c.get("prioridade", "P3_MONITORAMENTO")
         titulo = c.get("titulo_final", "Sem título")
         resumo_raw = c.get("resumo_final", "")
-        tag = c.get("tag", "")
         total_artigos = c.get("total_artigos", 0)
 
-        try:
-            from backend.utils import normalizar_fonte_display
-        except ImportError:
-            normalizar_fonte_display = lambda x: x  # type: ignore
-
+        # Normaliza e deduplica numa passada só, com uma única chave minúscula por fonte
         raw_fontes = c.get("fontes", [])
-        nomes_fontes = []
+        seen_fontes = set()
+        nomes_fontes_unique = []
         if isinstance(raw_fontes, list):
             for f in raw_fontes:
                 raw_name = ""
@@ -268,15 +309,12 @@ def _build_context_block(db, target_date: datetime.date) -> Tuple[str, List[int]
                 elif isinstance(f, str):
                     raw_name = f.strip()
                 clean = normalizar_fonte_display(raw_name)
-                if clean:
-                    nomes_fontes.append(clean)
-
-        seen_fontes = set()
-        nomes_fontes_unique = []
-        for fn in nomes_fontes:
-            if fn.lower() not in seen_fontes:
-                seen_fontes.add(fn.lower())
-                nomes_fontes_unique.append(fn)
+                if not clean:
+                    continue
+                chave = clean.lower()
+                if chave not in seen_fontes:
+                    seen_fontes.add(chave)
+                    nomes_fontes_unique.append(clean)
 
         # Fallback: se nenhuma fonte foi resolvida via CRUD, busca direto dos artigos
         if not nomes_fontes_unique:
@@ -292,23 +330,19 @@ def _build_context_block(db, target_date: datetime.date) -> Tuple[str, List[int]
 
         tipo_fonte = tipo_fonte_map.get(cid, "")
 
-        fontes_ctx = f"(Fontes: {fontes_label})" if fontes_label else "(Use obter_textos_brutos_cluster para identificar a fonte)"
-        linhas.append(
-            f"[ID={cid}] [{prio}] [{tag}] [{tipo_fonte}] "
-            f"{fontes_ctx}\n"
-            f"  Título: {titulo}\n"
-            f"  Resumo: {resumo}\n"
-        )
+        if buf.tell():
+            w("\n")
+        w(f"[ID={cid}] [{prio}] [{tag}] [{tipo_fonte}] ")
+        if fontes_label:
+            w(f"(Fontes: {fontes_label})")
+        else:
+            w("(Use obter_textos_brutos_cluster para identificar a fonte)")
+        w(f"\n  Título: {titulo}\n  Resumo: {resumo}\n")
 
     # Calculo de temperatura cruzada (volume x diversidade de tags)
-    p1_count = sum(1 for c in clusters_all if c.get("prioridade") == "P1_CRITICO")
-    p2_count = sum(1 for c in clusters_all if c.get("prioridade") == "P2_ESTRATEGICO")
-    p3_count = sum(1 for c in clusters_all if c.get("prioridade") == "P3_MONITORAMENTO")
-    tags_distintas = set()
-    for c in clusters_all:
-        tag_val = c.get("tag", "")
-        if tag_val:
-            tags_distintas.add(tag_val)
+    p1_count = contagem_prio.get("P1_CRITICO", 0)
+    p2_count = contagem_prio.get("P2_ESTRATEGICO", 0)
+    p3_count = contagem_prio.get("P3_MONITORAMENTO", 0)
     n_tags = len(tags_distintas)
     total = len(clusters_all)
 
@@ -335,7 +369,7 @@ def _build_context_block(db, target_date: datetime.date) -> Tuple[str, List[int]
 
     yesterday_ctx = _load_yesterday_context(db, target_date)
 
-    contexto = header_temperatura + yesterday_ctx + "\n".join(linhas)
+    contexto = header_temperatura + yesterday_ctx + buf.getvalue()
     print(f"[ResumoDiario] Contexto montado: {len(contexto)} chars, {len(avaliados_ids)} clusters, temperatura={temperatura}")
     return contexto, avaliados_ids, fontes_map
 
@@ -344,24 +378,83 @@ def _build_context_block(db, target_date: datetime.date) -> Tuple[str, List[int]
 # ETAPA 2: INTERAÇÃO COM O LLM (Gemini + Function Calling)
 # --------------------------------------------------------------------------- #
 
+_RE_CERCA_JSON = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def _loads_json(text: str) -> Any:
+    """orjson quando instalado (parser em C); json da stdlib como fallback. Levanta ValueError."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _dumps_json(data: Any) -> str:
+    """Serialização de resultados de tools: orjson quando instalado, json da stdlib como fallback."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except Exception:
+            pass
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
 def _extract_json_from_text(text: str) -> Optional[dict]:
     """Extrai o primeiro objeto JSON válido de uma string (com fallbacks)."""
-    text = text.strip()
-    if text.startswith("```"):
-        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text, flags=re.IGNORECASE).strip()
+    # sub incondicional: sem cerca não há match e o custo é desprezível
+    text = _RE_CERCA_JSON.sub("", text.strip()).strip()
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return _loads_json(text)
+    except ValueError:
         pass
-    match = re.search(r"\{[\s\S]*\}", text)
-    if match:
+    # Fallback: do primeiro '{' ao último '}' (mesmo recorte da antiga regex gulosa, sem regex)
+    inicio, fim = text.find("{"), text.rfind("}")
+    if inicio != -1 and fim > inicio:
         try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
+            return _loads_json(text[inicio:fim + 1])
+        except ValueError:
             pass
     return None
 
 
+@lru_cache(maxsize=1)
+def _tool_declaration_resumo():
+    """Tools do resumo (textos brutos + busca web): schemas estáticos, montados uma vez por processo."""
+    import google.generativeai as genai  # type: ignore
+
+    return genai.protos.Tool(
+        function_declarations=[
+            genai.protos.FunctionDeclaration(
+                name=TOOL_OBTER_TEXTOS_BRUTOS_SCHEMA["name"],
+                description=TOOL_OBTER_TEXTOS_BRUTOS_SCHEMA["description"],
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={
+                        "cluster_id": genai.protos.Schema(
+                            type=genai.protos.Type.INTEGER,
+                            description=TOOL_OBTER_TEXTOS_BRUTOS_SCHEMA["parameters"]["properties"]["cluster_id"]["description"],
+                        )
+                    },
+                    required=["cluster_id"],
+                ),
+            ),
+            genai.protos.FunctionDeclaration(
+                name=TOOL_BUSCAR_NA_WEB_SCHEMA["name"],
+                description=TOOL_BUSCAR_NA_WEB_SCHEMA["description"],
+                parameters=genai.protos.Schema(
+                    type=genai.protos.Type.OBJECT,
+                    properties={
+                        "query": genai.protos.Schema(
+                            type=genai.protos.Type.STRING,
+                            description=TOOL_BUSCAR_NA_WEB_SCHEMA["parameters"]["properties"]["query"]["description"],
+                        )
+                    },
+                    required=["query"],
+                ),
+            ),
+        ]
+    )
+
+
 def _run_llm_with_tools(
     db,
     prompt_text: str,
@@ -385,39 +478,7 @@ def _run_llm_with_tools(
 
     # Se budget=0, nao registra tools (chamada direta — mais barata e rapida)
     if tool_call_budget > 0:
-        tool_declaration = genai.protos.Tool(
-            function_declarations=[
-                genai.protos.FunctionDeclaration(
-                    name=TOOL_OBTER_TEXTOS_BRUTOS_SCHEMA["name"],
-                    description=TOOL_OBTER_TEXTOS_BRUTOS_SCHEMA["description"],
-                    parameters=genai.protos.Schema(
-                        type=genai.protos.Type.OBJECT,
-                        properties={
-                            "cluster_id": genai.protos.Schema(
-                                type=genai.protos.Type.INTEGER,
-                                description=TOOL_OBTER_TEXTOS_BRUTOS_SCHEMA["parameters"]["properties"]["cluster_id"]["description"],
-                            )
-                        },
-                        required=["cluster_id"],
-                    ),
-                ),
-                genai.protos.FunctionDeclaration(
-                    name=TOOL_BUSCAR_NA_WEB_SCHEMA["name"],
-                    description=TOOL_BUSCAR_NA_WEB_SCHEMA["description"],
-                    parameters=genai.protos.Schema(
-                        type=genai.protos.Type.OBJECT,
-                        properties={
-                            "query": genai.protos.Schema(
-                                type=genai.protos.Type.STRING,
-                                description=TOOL_BUSCAR_NA_WEB_SCHEMA["parameters"]["properties"]["query"]["description"],
-                            )
-                        },
-                        required=["query"],
-                    ),
-                ),
-            ]
-        )
-        model = genai.GenerativeModel("gemini-3-flash-preview", tools=[tool_declaration])
+        model = genai.GenerativeModel("gemini-3-flash-preview", tools=[_tool_declaration_resumo()])
     else:
         model = genai.GenerativeModel("gemini-3-flash-preview")
 
@@ -477,7 +538,7 @@ def _run_llm_with_tools(
                     genai.protos.Part(
                         function_response=genai.protos.FunctionResponse(
                             name=fn_name,
-                            response={"result": json.dumps(result_data, ensure_ascii=False, default=str)},
+                            response={"result": _dumps_json(result_data)},
                         )
                     )
                 )
@@ -497,7 +558,7 @@ def _run_llm_with_tools(
                     genai.protos.Part(
                         function_response=genai.protos.FunctionResponse(
                             name=fn_name,
-                            response={"result": json.dumps(result_data, ensure_ascii=False, default=str)},
+                            response={"result": _dumps_json(result_data)},
                         )
                     )
                 )
@@ -542,9 +603,8 @@ def _validate_and_fix(raw_json_str: str, persona_name: str = "") -> ResumoDiario
     if data is None:
         raise ValueError(f"{tag} Impossível extrair JSON: {raw_json_str[:500]}")
 
-    _SECOES_VALIDAS_PYDANTIC = {"foco_analista", "distressed", "estrategico", "regulatorio", "internacional"}
     for cs in data.get("clusters_selecionados", []):
-        if isinstance(cs, dict) and cs.get("secao") not in _SECOES_VALIDAS_PYDANTIC:
+        if isinstance(cs, dict) and cs.get("secao") not in _SECOES_VALIDAS:
             cs["secao"] = "distressed"
 
     try:
@@ -604,26 +664,29 @@ def gerar_resumo_diario(
     """
     if target_date is None:
         target_date = get_date_brasil()
+    data_iso = target_date.isoformat()
 
     if prompt_template is None:
         try:
             from backend.prompts import PROMPT_RESUMO_UNIFICADO_V1
             prompt_template = PROMPT_RESUMO_UNIFICADO_V1
         except ImportError:
-            return {"ok": False, "data": target_date.isoformat(), "error": "PROMPT_RESUMO_UNIFICADO_V1 não encontrado."}
+            return {"ok": False, "data": data_iso, "error": "PROMPT_RESUMO_UNIFICADO_V1 não encontrado."}
 
-    print(f"[ResumoDiario] {target_date.isoformat()} — Construindo contexto...")
+    print(f"[ResumoDiario] {data_iso} — Construindo contexto...")
 
     # 1. Montar contexto (com cache por updated_at)
     db_ctx = _open_db()
     fontes_map: Dict[int, List[str]] = {}
     try:
         from sqlalchemy import func as sqla_func
+        inicio, fim = _intervalo_dia(target_date)
         max_updated = db_ctx.query(sqla_func.max(ClusterEvento.updated_at)).filter(
-            sqla_func.date(ClusterEvento.created_at) == target_date,
+            ClusterEvento.created_at >= inicio,
+            ClusterEvento.created_at < fim,
             ClusterEvento.status == 'ativo',
         ).scalar()
-        cache_key = f"{target_date.isoformat()}_{max_updated.isoformat() if max_updated else 'empty'}"
+        cache_key = f"{data_iso}_{max_updated.isoformat() if max_updated else 'empty'}"
 
         cached = _CONTEXT_CACHE.get(cache_key)
         if cached:
@@ -641,7 +704,7 @@ def gerar_resumo_diario(
     if not avaliados_ids:
         return {
             "ok": False,
-            "data": target_date.isoformat(),
+            "data": data_iso,
             "error": "Nenhum cluster encontrado para esta data.",
         }
 
@@ -664,7 +727,7 @@ def gerar_resumo_diario(
     if not raw_response:
         return {
             "ok": False,
-            "data": target_date.isoformat(),
+            "data": data_iso,
             "error": "LLM não retornou resposta.",
         }
 
@@ -674,7 +737,7 @@ def gerar_resumo_diario(
     except Exception as e:
         return {
             "ok": False,
-            "data": target_date.isoformat(),
+            "data": data_iso,
             "error": f"Validação Pydantic falhou: {e}",
         }
 
@@ -702,7 +765,7 @@ def gerar_resumo_diario(
 
     return {
         "ok": True,
-        "data": target_date.isoformat(),
+        "data": data_iso,
         "contract_dict": contract.model_dump(),
         "clusters_avaliados_ids": avaliados_ids,
         "todos_clusters_escolhidos_ids": sorted(set(escolhidos)),
@@ -821,18 +884,22 @@ def gerar_resumo_para_usuario(
     """
     if target_date is None:
         target_date = get_date_brasil()
+    data_iso = target_date.isoformat()
 
     print(f"\n[UserResumo] Gerando resumo para user_id={user_id}, data={target_date}")
 
-    # 1. Contexto compartilhado (cache por updated_at)
+    # 1. Contexto compartilhado (cache por updated_at) + 2. preferências: mesma sessão,
+    # uma única retirada do pool para as duas leituras curtas antes da chamada LLM
     db_ctx = _open_db()
     try:
         from sqlalchemy import func as sqla_func
+        inicio, fim = _intervalo_dia(target_date)
         max_updated = db_ctx.query(sqla_func.max(ClusterEvento.updated_at)).filter(
-            sqla_func.date(ClusterEvento.created_at) == target_date,
+            ClusterEvento.created_at >= inicio,
+            ClusterEvento.created_at < fim,
             ClusterEvento.status == 'ativo',
         ).scalar()
-        cache_key = f"{target_date.isoformat()}_{max_updated.isoformat() if max_updated else 'empty'}"
+        cache_key = f"{data_iso}_{max_updated.isoformat() if max_updated else 'empty'}"
 
         cached = _CONTEXT_CACHE.get(cache_key)
         if cached:
@@ -842,16 +909,12 @@ def gerar_resumo_para_usuario(
             contexto, avaliados_ids, fontes_map = _build_context_block(db_ctx, target_date)
             _CONTEXT_CACHE.clear()
             _CONTEXT_CACHE[cache_key] = (contexto, avaliados_ids, fontes_map)
-    finally:
-        db_ctx.close()
 
-    if not avaliados_ids:
-        return {"ok": False, "data": target_date.isoformat(), "error": "Nenhum cluster encontrado."}
+        if not avaliados_ids:
+            return {"ok": False, "data": data_iso, "error": "Nenhum cluster encontrado."}
 
-    # 2. Preferencias do usuario (extraidas do banco)
-    db_prefs = _open_db()
-    try:
-        prefs = get_preferencias_usuario(db_prefs, user_id) if get_preferencias_usuario else None
+        # 2. Preferencias do usuario (extraidas do banco)
+        prefs = get_preferencias_usuario(db_ctx, user_id) if get_preferencias_usuario else None
         tags_interesse = (prefs.tags_interesse or []) if prefs else []
         tags_ignoradas = (prefs.tags_ignoradas or []) if prefs else []
         tipo_fonte = (prefs.tipo_fonte_preferido) if prefs else None
@@ -860,7 +923,7 @@ def gerar_resumo_para_usuario(
 
         instrucao = ""
         if template_id and get_template_resumo:
-            tpl = get_template_resumo(db_prefs, template_id)
+            tpl = get_template_resumo(db_ctx, template_id)
             if tpl:
                 instrucao = tpl.system_prompt or ""
 
@@ -872,7 +935,7 @@ def gerar_resumo_para_usuario(
         empresas_radar = config_extra.get("empresas_radar", "")
         teses_juridicas = config_extra.get("teses_juridicas", "")
     finally:
-        db_prefs.close()
+        db_ctx.close()
 
     # 3. UMA chamada LLM — chassis PROMPT_MASTER_V2 + slots personalizáveis
     prompt_final = _build_user_prompt(
@@ -892,20 +955,20 @@ def gerar_resumo_para_usuario(
         db_llm.close()
 
     if not raw_response:
-        return {"ok": False, "data": target_date.isoformat(), "error": "LLM não retornou resposta."}
+        return {"ok": False, "data": data_iso, "error": "LLM não retornou resposta."}
 
     # 4. Validacao Pydantic
     try:
         contract = _validate_and_fix(raw_response, persona_name=f"user_{user_id}")
     except Exception as e:
-        return {"ok": False, "data": target_date.isoformat(), "error": str(e)}
+        return {"ok": False, "data": data_iso, "error": str(e)}
 
     escolhidos = [cs.cluster_id for cs in contract.clusters_selecionados]
     print(f"[UserResumo] Concluido: {len(escolhidos)} itens selecionados")
 
     return {
         "ok": True,
-        "data": target_date.isoformat(),
+        "data": data_iso,
         "contract_dict": contract.model_dump(),
         "clusters_avaliados_ids": avaliados_ids,
         "todos_clusters_escolhidos_ids": escolhidos,
@@ -1000,17 +1063,13 @@ def _dedup_barretti_noticias(
     if len(noticias) <= 1:
         return noticias, fontes_map
 
-    _STOP = {
-        "a", "o", "e", "de", "do", "da", "em", "no", "na", "para", "por",
-        "com", "que", "os", "as", "um", "uma", "ao", "dos", "das", "nos",
-        "nas", "se", "é", "ser", "mais", "sobre", "já", "mas", "não",
-    }
+    def _words(title: str) -> frozenset:
+        return frozenset(_RE_NAO_PALAVRA.sub("", title.lower()).split()) - _STOP_TITULO
 
-    def _words(title: str) -> set:
-        return set(re.sub(r"[^\w\s]", "", title.lower()).split()) - _STOP
+    # Conjuntos de palavras calculados uma vez por título (não a cada par do loop O(n²))
+    palavras = [_words(n.get("titulo", "")) for n in noticias]
 
-    def _similarity(t1: str, t2: str) -> float:
-        w1, w2 = _words(t1), _words(t2)
+    def _similarity(w1: frozenset, w2: frozenset) -> float:
         if not w1 or not w2:
             return 0.0
         inter = w1 & w2
@@ -1034,7 +1093,7 @@ def _dedup_barretti_noticias(
 
     for i in range(len(noticias)):
         for j in range(i + 1, len(noticias)):
-            if _similarity(noticias[i].get("titulo", ""), noticias[j].get("titulo", "")) >= _THRESHOLD:
+            if _similarity(palavras[i], palavras[j]) >= _THRESHOLD:
                 _union(i, j)
 
     groups: Dict[int, List[int]] = {}
@@ -1102,23 +1161,26 @@ def gerar_resumo_barretti(
     """
     if target_date is None:
         target_date = get_date_brasil()
+    data_iso = target_date.isoformat()
 
     try:
         from backend.prompts import PROMPT_BARRETTI_V1
     except ImportError:
-        return {"ok": False, "data": target_date.isoformat(), "error": "PROMPT_BARRETTI_V1 não encontrado."}
+        return {"ok": False, "data": data_iso, "error": "PROMPT_BARRETTI_V1 não encontrado."}
 
-    print(f"\n[Barretti] {target_date.isoformat()} — Construindo contexto...")
+    print(f"\n[Barretti] {data_iso} — Construindo contexto...")
 
     db_ctx = _open_db()
     fontes_map: Dict[int, List[str]] = {}
     try:
         from sqlalchemy import func as sqla_func
+        inicio, fim = _intervalo_dia(target_date)
         max_updated = db_ctx.query(sqla_func.max(ClusterEvento.updated_at)).filter(
-            sqla_func.date(ClusterEvento.created_at) == target_date,
+            ClusterEvento.created_at >= inicio,
+            ClusterEvento.created_at < fim,
             ClusterEvento.status == 'ativo',
         ).scalar()
-        cache_key = f"{target_date.isoformat()}_{max_updated.isoformat() if max_updated else 'empty'}"
+        cache_key = f"{data_iso}_{max_updated.isoformat() if max_updated else 'empty'}"
 
         cached = _CONTEXT_CACHE.get(cache_key)
         if cached:
@@ -1135,7 +1197,7 @@ def gerar_resumo_barretti(
             pass
 
     if not avaliados_ids:
-        return {"ok": False, "data": target_date.isoformat(), "error": "Nenhum cluster encontrado."}
+        return {"ok": False, "data": data_iso, "error": "Nenhum cluster encontrado."}
 
     print(f"[Barretti] {len(avaliados_ids)} clusters, {len(contexto)} chars de contexto")
 
@@ -1159,12 +1221,12 @@ def gerar_resumo_barretti(
             pass
 
     if not raw_response:
-        return {"ok": False, "data": target_date.isoformat(), "error": "LLM não retornou resposta."}
+        return {"ok": False, "data": data_iso, "error": "LLM não retornou resposta."}
 
     try:
         contract = _validate_and_fix_barretti(raw_response)
     except Exception as e:
-        return {"ok": False, "data": target_date.isoformat(), "error": f"Validação Pydantic falhou: {e}"}
+        return {"ok": False, "data": data_iso, "error": f"Validação Pydantic falhou: {e}"}
 
     contract_dict = contract.model_dump()
     noticias_raw = contract_dict.get("noticias", [])
@@ -1183,7 +1245,7 @@ def gerar_resumo_barretti(
 
     return {
         "ok": True,
-        "data": target_date.isoformat(),
+        "data": data_iso,
         "contract_dict": contract_dict,
         "clusters_avaliados_ids": avaliados_ids,
         "todos_clusters_escolhidos_ids": sorted(set(escolhidos)),
@@ -1204,11 +1266,7 @@ def formatar_barretti(resultado: Dict[str, Any]) -> str:
     if not contract_dict:
         return f"*Briefing Capital Solutions — {data_str}*\n\n_(Nenhum evento relevante identificado hoje.)_"
 
-    date_label = data_str
-    if data_str and "-" in data_str:
-        parts = data_str.split("-")
-        if len(parts) == 3:
-            date_label = f"{parts[2]}/{parts[1]}"
+    date_label = _format_date_label(data_str)
 
     lines: List[str] = []
 
@@ -1222,8 +1280,6 @@ def formatar_barretti(resultado: Dict[str, Any]) -> str:
             lines.append(f"  {i}. {tema}")
         lines.append("")
 
-    _PRIO_EMOJI = {"Alta": "🔴", "Media": "🟡", "Baixa": "🔵"}
-
     noticias = contract_dict.get("noticias", [])
     for i, n in enumerate(noticias, 1):
         prioridade = n.get("prioridade", "Media")
@@ -1283,6 +1339,16 @@ def formatar_barretti(resultado: Dict[str, Any]) -> str:
 # FORMATADOR WHATSAPP — Mensagem seccionada por persona
 # --------------------------------------------------------------------------- #
 
+@lru_cache(maxsize=64)
+def _format_date_label(data_str: str) -> str:
+    """'YYYY-MM-DD' → 'DD/MM' para cabeçalhos; devolve a string original se não for ISO."""
+    if data_str and "-" in data_str:
+        parts = data_str.split("-")
+        if len(parts) == 3:
+            return f"{parts[2]}/{parts[1]}"
+    return data_str
+
+
 def _format_fontes_label(fontes_list: List[str], max_fontes: int = 3) -> str:
     """Formata lista de fontes para exibição humana (sem IDs, com nomes reais)."""
     if not fontes_list:
@@ -1292,11 +1358,13 @@ def _format_fontes_label(fontes_list: List[str], max_fontes: int = 3) -> str:
     unique = []
     for f in fontes_list:
         fl = f.strip()
-        if fl and fl.lower() not in seen:
-            seen.add(fl.lower())
+        chave = fl.lower()
+        if fl and chave not in seen:
+            seen.add(chave)
             unique.append(fl)
-    display = unique[:max_fontes]
-    return ", ".join(display)
+            if len(unique) == max_fontes:
+                break
+    return ", ".join(unique)
 
 
 def formatar_whatsapp(
@@ -1331,7 +1399,6 @@ def formatar_whatsapp(
     tldr = contract_dict.get("tldr_executivo", "")
     clusters = contract_dict.get("clusters_selecionados", [])
 
-    _SECOES_VALIDAS = {"foco_analista", "distressed", "estrategico", "regulatorio", "internacional"}
     por_secao: Dict[str, List[Dict]] = {}
     for cs in clusters:
         secao = cs.get("secao", "distressed")
@@ -1339,16 +1406,9 @@ def formatar_whatsapp(
             secao = "distressed"
         por_secao.setdefault(secao, []).append(cs)
 
-    date_label = data_str
-    if data_str and "-" in data_str:
-        parts = data_str.split("-")
-        if len(parts) == 3:
-            date_label = f"{parts[2]}/{parts[1]}"
+    date_label = _format_date_label(data_str)
 
-    header = f"*Resumo do dia {date_label} — Special Situations*\n"
-    if tldr:
-        header += f"\n_{tldr}_\n"
-    header += "\n"
+    header = f"*Resumo do dia {date_label} — Special Situations*\n" + (f"\n_{tldr}_\n" if tldr else "") + "\n"
 
     sections: List[str] = []
     vistos: set = set()
@@ -1359,7 +1419,7 @@ def formatar_whatsapp(
             continue
 
         config = SECOES_RESUMO.get(secao_key, {"emoji": "📋", "titulo": secao_key.upper()})
-        section = f"{config['emoji']} *{config['titulo']}*\n\n"
+        parts: List[str] = [f"{config['emoji']} *{config['titulo']}*\n\n"]
 
         for cs in items:
             cid = cs.get("cluster_id")
@@ -1368,34 +1428,21 @@ def formatar_whatsapp(
             if cid is not None:
                 vistos.add(cid)
 
-            section += f"*{cs.get('titulo_whatsapp', '')}*\n"
-            section += f"• {cs.get('bullet_impacto', '')}\n"
+            parts.append(f"*{cs.get('titulo_whatsapp', '')}*\n• {cs.get('bullet_impacto', '')}\n")
 
             real_fontes = fontes_map.get(cid, []) if cid else []
             fontes_str = _format_fontes_label(real_fontes)
             if not fontes_str:
                 fp = cs.get('fonte_principal', '') or ''
                 fp_lower = fp.lower()
-                _FONTES_INVALIDAS = (
-                    '', 'fonte não identificada', 'fonte desconhecida',
-                    'não identificada', 'n/a', 'desconhecida',
-                    'sem fonte', 'unknown',
-                )
-                is_invalid = (
-                    fp_lower in _FONTES_INVALIDAS
-                    or 'obter_textos_brutos' in fp_lower
-                    or 'não identificada' in fp_lower
-                    or 'usar obter' in fp_lower
-                    or 'identificar a fonte' in fp_lower
-                )
+                is_invalid = fp_lower in _FONTES_INVALIDAS or _RE_FONTE_PLACEHOLDER.search(fp_lower) is not None
                 if not is_invalid and fp.strip():
                     fontes_str = fp.strip()
-            if fontes_str:
-                section += f"_Fontes: {fontes_str}_\n"
-            section += "\n"
+            parts.append(f"_Fontes: {fontes_str}_\n\n" if fontes_str else "\n")
 
-        if "•" in section:
-            sections.append(section.strip())
+        # Só o cabeçalho = nenhum item novo na seção (todos já vistos)
+        if len(parts) > 1:
+            sections.append("".join(parts).strip())
 
     if not sections:
         return [header + "(Nenhum evento relevante identificado hoje.)"]
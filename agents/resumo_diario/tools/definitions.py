@@ -9,6 +9,8 @@ Contém:
 """
 
 import os
+import threading
+import time
 from pydantic import BaseModel, Field, conlist
 from typing import Dict, Any, List, Literal, Optional
 
@@ -152,10 +154,24 @@ TOOL_BUSCAR_NA_WEB_SCHEMA = {
 }
 
 
+# Cache de buscas web: personas do resumo e o estagiário repetem as mesmas consultas no mesmo dia
+_BUSCA_WEB_CACHE: Dict[str, Dict[str, Any]] = {}
+_BUSCA_WEB_CACHE_TTL = 1800  # 30 min
+_BUSCA_WEB_CACHE_MAX = 256
+# Também chamado das threads de tools do estagiário (_TOOL_POOL)
+_BUSCA_WEB_CACHE_LOCK = threading.Lock()
+
+
+def _copia_busca(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """Cópia rasa por resultado: quem chama pode mexer na resposta sem alterar o cache."""
+    return {**resultado, "results": [dict(r) for r in resultado.get("results", [])]}
+
+
 def execute_buscar_na_web(query: str) -> Dict[str, Any]:
     """
     Executa busca na web via Tivaly API.
     Placeholder: retorna erro amigável até que a TIVALY_API_KEY seja configurada.
+    Respostas OK ficam em cache por query normalizada (_BUSCA_WEB_CACHE_TTL).
     """
     api_key = os.getenv("TIVALY_API_KEY")
     if not api_key:
@@ -165,6 +181,14 @@ def execute_buscar_na_web(query: str) -> Dict[str, Any]:
             "results": []
         }
 
+    chave = " ".join((query or "").lower().split())
+    agora = time.time()
+    with _BUSCA_WEB_CACHE_LOCK:
+        hit = _BUSCA_WEB_CACHE.get(chave)
+    if hit and agora - hit["ts"] < _BUSCA_WEB_CACHE_TTL:
+        print(f"[BuscaWeb] cache hit: {chave[:60]}")
+        return _copia_busca(hit["valor"])
+
     try:
         import requests
         resp = requests.post(
@@ -182,7 +206,15 @@ def execute_buscar_na_web(query: str) -> Dict[str, Any]:
                     "snippet": r.get("snippet", "")[:500],
                     "url": r.get("url", ""),
                 })
-            return {"status": "ok", "results": results}
+            resultado = {"status": "ok", "results": results}
+            with _BUSCA_WEB_CACHE_LOCK:
+                # Poda na escrita: expiradas saem; acima do teto, sai a mais antiga
+                for k in [k for k, v in _BUSCA_WEB_CACHE.items() if agora - v["ts"] >= _BUSCA_WEB_CACHE_TTL]:
+                    del _BUSCA_WEB_CACHE[k]
+                while len(_BUSCA_WEB_CACHE) >= _BUSCA_WEB_CACHE_MAX:
+                    _BUSCA_WEB_CACHE.pop(next(iter(_BUSCA_WEB_CACHE)))
+                _BUSCA_WEB_CACHE[chave] = {"valor": resultado, "ts": agora}
+            return _copia_busca(resultado)
         else:
             return {"status": "error", "message": f"Tivaly API status {resp.status_code}", "results": []}
     except Exception as e:
@@ -0,0 +1,55 @@
+"""
+Kernels de similaridade para o fallback da busca vetorial (sem pgvector).
+
+Com numba, o produto escalar roda direto sobre a matriz int8 do cache
+(dequantizacao fundida no loop, prange sobre as linhas), sem materializar a copia
+float32 (N, d) que o matmul do numpy precisa. Sem numba, cai no matmul do numpy.
+O kernel so e compilado na primeira busca (nada roda na importacao).
+"""
+
+import logging
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# None = ainda nao tentou compilar; False = numba indisponivel/falhou (usa numpy)
+_KERNEL: Optional[Any] = None
+
+
+def _compilar_kernel() -> Any:
+    global _KERNEL
+    try:
+        from numba import njit, prange
+    except ImportError:
+        _KERNEL = False
+        return _KERNEL
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_scores_jit(mat, q, scale):
+        n, d = mat.shape
+        out = np.empty(n, np.float32)
+        for i in prange(n):
+            s = np.float32(0.0)
+            for k in range(d):
+                s += np.float32(mat[i, k]) * q[k]
+            out[i] = s / scale
+        return out
+
+    _KERNEL = _int8_scores_jit
+    return _KERNEL
+
+
+def int8_scores(mat: np.ndarray, q: np.ndarray, scale: float) -> np.ndarray:
+    """Similaridade de cosseno entre linhas int8 quantizadas (x scale) e a query float32 normalizada."""
+    global _KERNEL
+    q = np.ascontiguousarray(q, dtype=np.float32)
+    kernel = _compilar_kernel() if _KERNEL is None else _KERNEL
+    if kernel:
+        try:
+            return kernel(np.ascontiguousarray(mat), q, np.float32(scale))
+        except Exception as e:
+            logger.warning("Kernel numba falhou, usando numpy: %s", e)
+            _KERNEL = False
+    return (mat @ q) / scale
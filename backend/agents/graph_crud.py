@@ -4,12 +4,15 @@ Handles Entity Resolution, edge creation, and graph queries.
 """
 
 import re
+import time
 import uuid
+from itertools import chain
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text, and_, or_, desc
+from sqlalchemy import event, func, inspect, text, and_, or_, desc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 try:
     from ..database import GraphEntity, GraphEdge, ArtigoBruto, ClusterEvento, SessionLocal
@@ -71,32 +74,34 @@ KNOWN_ALIASES = {
 }
 
 
+# Tabela de acentos e regexes compiladas uma vez (a normalização roda em toda resolução de entidade)
+_ACCENT_TABLE = str.maketrans({
+    'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
+    'é': 'e', 'ê': 'e', 'è': 'e',
+    'í': 'i', 'î': 'i',
+    'ó': 'o', 'ô': 'o', 'õ': 'o',
+    'ú': 'u', 'û': 'u', 'ü': 'u',
+    'ç': 'c',
+})
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_WS_RE = re.compile(r'\s+')
+
+
 def _normalize_name(name: str) -> str:
     """Normaliza um nome para comparacao (lowercase, sem acentos, sem pontuacao extra)."""
-    name = name.strip().lower()
-    # Remove acentos simples
-    replacements = {
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
-        'é': 'e', 'ê': 'e', 'è': 'e',
-        'í': 'i', 'î': 'i',
-        'ó': 'o', 'ô': 'o', 'õ': 'o',
-        'ú': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c',
-    }
-    for old, new in replacements.items():
-        name = name.replace(old, new)
-    # Remove pontuacao
-    name = re.sub(r'[^\w\s]', '', name)
-    # Remove espacos extras
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
+    name = name.strip().lower().translate(_ACCENT_TABLE)
+    return _WS_RE.sub(' ', _PUNCT_RE.sub('', name)).strip()
+
+
+# Aliases indexados pela mesma normalização aplicada à consulta
+_NORMALIZED_ALIASES = {_normalize_name(k): v for k, v in KNOWN_ALIASES.items()}
 
 
 def resolve_canonical_name(name: str) -> str:
     """Resolve o nome canonico de uma entidade usando aliases conhecidos."""
-    normalized = _normalize_name(name)
-    if normalized in KNOWN_ALIASES:
-        return KNOWN_ALIASES[normalized]
+    canonical = _NORMALIZED_ALIASES.get(_normalize_name(name))
+    if canonical is not None:
+        return canonical
     # Se nao encontrar alias, retorna o nome com primeira letra maiuscula
     return name.strip().title()
 
@@ -144,24 +149,34 @@ def find_entity_by_name(
         return entity
     
     # 3. Busca fuzzy com trigram (se disponivel)
+    return _find_entity_fuzzy(db, canonical, entity_type, similarity_threshold)
+
+
+def _find_entity_fuzzy(
+    db: Session,
+    canonical: str,
+    entity_type: Optional[str] = None,
+    similarity_threshold: float = 0.6
+) -> Optional[GraphEntity]:
+    """
+    Busca fuzzy com trigram. O operador % usa o indice GIN idx_graph_entity_trgm para
+    gerar a lista curta de candidatos; similarity() so filtra/ordena essa lista (sem seq scan).
+    Roda num savepoint: sem pg_trgm a falha nao aborta a transacao do chamador.
+    """
     try:
-        query = db.query(GraphEntity).filter(
-            func.similarity(GraphEntity.canonical_name, canonical) > similarity_threshold
-        )
-        if entity_type:
-            query = query.filter(GraphEntity.entity_type == entity_type)
-        
-        entity = query.order_by(
-            func.similarity(GraphEntity.canonical_name, canonical).desc()
-        ).first()
-        
-        if entity:
-            return entity
+        with db.begin_nested():
+            similarity = func.similarity(GraphEntity.canonical_name, canonical)
+            query = db.query(GraphEntity).filter(
+                GraphEntity.canonical_name.op('%')(canonical),
+                similarity > similarity_threshold,
+            )
+            if entity_type:
+                query = query.filter(GraphEntity.entity_type == entity_type)
+            
+            return query.order_by(similarity.desc()).limit(1).first()
     except Exception:
         # Trigram nao disponivel, ignora
-        pass
-    
-    return None
+        return None
 
 
 def get_or_create_entity(
@@ -290,35 +305,169 @@ def link_artigo_to_entities(
     
     Returns:
         Lista de edges criadas
+
+    Resolve todas as entidades com um SELECT em lote, insere as faltantes com
+    um unico INSERT ... ON CONFLICT DO NOTHING e cria as arestas com outro
+    INSERT em lote, com um unico commit no final (antes: ~4 round-trips por
+    entidade via get_or_create_entity + create_edge).
     """
-    edges = []
+    # 1. Normaliza entrada e deduplica por (canonical, tipo); mantem o 1o nome visto
+    wanted: Dict[Tuple[str, str], Tuple[str, str, str]] = {}
+    edge_data: Dict[Tuple[str, str], Dict[str, Any]] = {}
     for ent_data in entities:
-        name = ent_data.get("name", "").strip()
+        name = (ent_data.get("name") or "").strip()
         if not name or len(name) < 2:
             continue
-        
+
         entity_type = ent_data.get("type", "ORG").upper()
         if entity_type not in ("PERSON", "ORG", "GOV", "EVENT", "CONCEPT"):
             entity_type = "ORG"
-        
-        # Get or create entity
-        entity = get_or_create_entity(db, name, entity_type)
-        
-        # Create edge
-        edge = create_edge(
-            db=db,
-            artigo_id=artigo_id,
-            entity_id=entity.id,
-            relation_type=ent_data.get("role", "MENTIONED"),
-            sentiment_score=ent_data.get("sentiment"),
-            context_snippet=ent_data.get("context"),
-            confidence=ent_data.get("confidence", 1.0)
-        )
-        
-        if edge:
-            edges.append(edge)
-    
-    return edges
+
+        canonical = resolve_canonical_name(name)
+        key = (canonical.lower(), entity_type)
+        wanted.setdefault(key, (name, entity_type, canonical))
+
+        context = ent_data.get("context")
+        new_edge = {
+            "relation_type": (ent_data.get("role") or "MENTIONED").upper(),
+            "sentiment_score": ent_data.get("sentiment"),
+            "context_snippet": context[:500] if context else None,
+            "confidence": ent_data.get("confidence", 1.0),
+        }
+        prev = edge_data.get(key)
+        if prev is None:
+            edge_data[key] = new_edge
+        else:
+            # Mesma entidade citada duas vezes: mantem os melhores dados (como create_edge)
+            if prev["sentiment_score"] is None:
+                prev["sentiment_score"] = new_edge["sentiment_score"]
+            if not prev["context_snippet"]:
+                prev["context_snippet"] = new_edge["context_snippet"]
+            if (new_edge["confidence"] or 0) > (prev["confidence"] or 0):
+                prev["confidence"] = new_edge["confidence"]
+
+    if not wanted:
+        return []
+
+    try:
+        # 2. Um SELECT para todas as entidades ja existentes (canonical ou nome original)
+        lowers = list({k[0] for k in wanted} | {n.lower() for n, _, _ in wanted.values()})
+        types = list({k[1] for k in wanted})
+        candidates = db.query(GraphEntity).filter(
+            GraphEntity.entity_type.in_(types),
+            or_(
+                func.lower(GraphEntity.canonical_name).in_(lowers),
+                func.lower(GraphEntity.name).in_(lowers),
+            ),
+        ).all()
+        by_canonical = {(e.canonical_name.lower(), e.entity_type): e for e in candidates}
+        by_name = {(e.name.lower(), e.entity_type): e for e in candidates}
+
+        resolved: Dict[Tuple[str, str], GraphEntity] = {}
+        missing: List[Tuple[str, str]] = []
+        for key, (name, entity_type, canonical) in wanted.items():
+            entity = by_canonical.get(key) or by_name.get((name.lower(), entity_type))
+            if entity is None:
+                # Fuzzy (trigram) so para o que nao bateu exato; as buscas exatas ja foram feitas acima
+                entity = _find_entity_fuzzy(db, canonical, entity_type)
+            if entity is not None:
+                resolved[key] = entity
+            else:
+                missing.append(key)
+
+        # 3. Um INSERT em lote para as entidades novas
+        if missing:
+            rows = []
+            for key in missing:
+                name, entity_type, canonical = wanted[key]
+                rows.append({
+                    "id": uuid.uuid4(),
+                    "name": name,
+                    "canonical_name": canonical,
+                    "entity_type": entity_type,
+                    "aliases": [name] if name.lower() != canonical.lower() else [],
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow(),
+                })
+            db.execute(
+                pg_insert(GraphEntity.__table__)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["canonical_name", "entity_type"])
+            )
+            # Rebusca (inclui as criadas em paralelo por outro worker)
+            for e in db.query(GraphEntity).filter(
+                GraphEntity.entity_type.in_(types),
+                func.lower(GraphEntity.canonical_name).in_([k[0] for k in missing]),
+            ).all():
+                key = (e.canonical_name.lower(), e.entity_type)
+                if key in wanted and key not in resolved:
+                    resolved[key] = e
+
+        # Atualiza aliases das existentes (flush no commit final)
+        now = datetime.utcnow()
+        for key, entity in resolved.items():
+            name = wanted[key][0]
+            if _normalize_name(name) != _normalize_name(entity.canonical_name):
+                aliases = list(entity.aliases or [])
+                if name not in aliases:
+                    aliases.append(name)
+                    entity.aliases = aliases
+                    entity.updated_at = now
+
+        # 4. Arestas: atualiza as existentes e insere as novas em lote
+        entity_by_id = {}
+        for key, entity in resolved.items():
+            data = edge_data[key]
+            prev = entity_by_id.get(entity.id)
+            if prev is None:
+                entity_by_id[entity.id] = data
+            elif (data["confidence"] or 0) > (prev["confidence"] or 0):
+                entity_by_id[entity.id] = data
+
+        if not entity_by_id:
+            db.commit()
+            return []
+
+        existing_edges = db.query(GraphEdge).filter(
+            GraphEdge.artigo_id == artigo_id,
+            GraphEdge.entity_id.in_(list(entity_by_id)),
+        ).all()
+        for edge in existing_edges:
+            data = entity_by_id[edge.entity_id]
+            if data["sentiment_score"] is not None and edge.sentiment_score is None:
+                edge.sentiment_score = data["sentiment_score"]
+            if data["context_snippet"] and not edge.context_snippet:
+                edge.context_snippet = data["context_snippet"]
+            if (data["confidence"] or 0) > (edge.confidence or 0):
+                edge.confidence = data["confidence"]
+
+        already = {edge.entity_id for edge in existing_edges}
+        edge_rows = [
+            {"artigo_id": artigo_id, "entity_id": entity_id, "created_at": now, **data}
+            for entity_id, data in entity_by_id.items()
+            if entity_id not in already
+        ]
+        if edge_rows:
+            db.execute(
+                pg_insert(GraphEdge.__table__)
+                .values(edge_rows)
+                .on_conflict_do_nothing(index_elements=["artigo_id", "entity_id"])
+            )
+        db.commit()
+
+        # INSERT via Core nao passa pelo after_flush: invalida o contexto do cluster do artigo
+        if edge_rows and _CLUSTER_CONTEXT_CACHE:
+            cluster_id = db.query(ArtigoBruto.cluster_id).filter(ArtigoBruto.id == artigo_id).scalar()
+            if cluster_id is not None:
+                invalidate_cluster_context(cluster_id)
+
+        return db.query(GraphEdge).filter(
+            GraphEdge.artigo_id == artigo_id,
+            GraphEdge.entity_id.in_(list(entity_by_id)),
+        ).all()
+    except Exception:
+        db.rollback()
+        raise
 
 
 # ==============================================================================
@@ -445,29 +594,85 @@ def get_historical_context_for_entities(
     if not entity_names:
         return ""
     
-    context_parts = []
-    seen_clusters = set()
+    names = [n.strip() for n in entity_names[:5] if n and n.strip()]  # Limita a 5 entidades para performance
+    if not names:
+        return ""
     
-    for name in entity_names[:5]:  # Limita a 5 entidades para performance
-        entity = find_entity_by_name(db, name)
-        if not entity:
-            continue
-        
-        history = get_entity_history(db, entity.id, days=days, limit=max_results)
-        
-        for item in history:
-            cluster_id = item["cluster_id"]
-            if cluster_id in seen_clusters:
-                continue
-            seen_clusters.add(cluster_id)
-            
-            resumo = item.get("resumo") or item.get("titulo", "")
-            if resumo:
-                data_str = item.get("data", "data desconhecida")
-                prioridade = item.get("prioridade", "")
-                context_parts.append(
-                    f"[{data_str}] ({prioridade}) {resumo[:300]}"
-                )
+    # 1. Resolve todas as entidades num unico SELECT (canonical ou nome original);
+    #    so o que nao bater exato cai na busca fuzzy de find_entity_by_name
+    canonicals = {name: resolve_canonical_name(name).lower() for name in names}
+    lowers = list(set(canonicals.values()) | {name.lower() for name in names})
+    candidates = db.execute(
+        text("""
+            SELECT id, lower(canonical_name) AS canonical, lower(name) AS name
+            FROM graph_entities
+            WHERE lower(canonical_name) = ANY(:lowers) OR lower(name) = ANY(:lowers)
+        """),
+        {"lowers": lowers},
+    ).mappings().all()
+    by_canonical: Dict[str, Any] = {}
+    by_name: Dict[str, Any] = {}
+    for row in candidates:
+        by_canonical.setdefault(row["canonical"], row["id"])
+        by_name.setdefault(row["name"], row["id"])
+    
+    entity_ids: List[Any] = []
+    for name in names:
+        entity_id = by_canonical.get(canonicals[name]) or by_name.get(name.lower())
+        if entity_id is None:
+            entity = find_entity_by_name(db, name)
+            entity_id = entity.id if entity else None
+        if entity_id is not None and entity_id not in entity_ids:
+            entity_ids.append(entity_id)
+    if not entity_ids:
+        return ""
+    
+    # 2. Historico de todas as entidades numa unica query: ate max_results clusters
+    #    por entidade (ROW_NUMBER por entity_id), mesma semantica de get_entity_history.
+    #    O dedup de clusters entre entidades e feito no proprio SQL (DISTINCT ON),
+    #    e o resultado sai ordenado por recencia ja limitado aos 10 do contexto.
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    rows = db.execute(
+        text("""
+            SELECT cluster_id, titulo, resumo, prioridade, created_at
+            FROM (
+                SELECT DISTINCT ON (ranked.cluster_id)
+                       ranked.cluster_id, ranked.titulo, ranked.resumo,
+                       ranked.prioridade, ranked.created_at
+                FROM (
+                    SELECT h.*,
+                           ROW_NUMBER() OVER (PARTITION BY h.entity_id ORDER BY h.created_at DESC) AS rn
+                    FROM (
+                        SELECT DISTINCT ge.entity_id, c.id AS cluster_id,
+                               c.titulo_cluster AS titulo, c.resumo_cluster AS resumo,
+                               c.prioridade, c.created_at,
+                               ge.relation_type, ge.sentiment_score
+                        FROM graph_edges ge
+                        JOIN artigos_brutos a ON a.id = ge.artigo_id
+                        JOIN clusters_eventos c ON c.id = a.cluster_id
+                        WHERE ge.entity_id = ANY(CAST(:ids AS uuid[]))
+                          AND c.created_at >= :cutoff
+                          AND c.status = 'ativo'
+                    ) h
+                ) ranked
+                WHERE ranked.rn <= :limit
+                ORDER BY ranked.cluster_id, ranked.created_at DESC
+            ) dedup
+            WHERE COALESCE(NULLIF(resumo, ''), titulo, '') <> ''
+            ORDER BY created_at DESC
+            LIMIT 10
+        """),
+        {"ids": [str(e) for e in entity_ids], "cutoff": cutoff, "limit": max_results},
+    ).mappings().all()
+    
+    context_parts = []
+    for item in rows:
+        resumo = item["resumo"] or item["titulo"] or ""
+        data_str = item["created_at"].isoformat() if item["created_at"] else "data desconhecida"
+        prioridade = item["prioridade"] or ""
+        context_parts.append(
+            f"[{data_str}] ({prioridade}) {resumo[:300]}"
+        )
     
     if not context_parts:
         return ""
@@ -475,7 +680,96 @@ def get_historical_context_for_entities(
     header = "=== CONTEXTO HISTORICO RECUPERADO ===\n"
     header += "Os seguintes eventos recentes envolvem as mesmas entidades:\n\n"
     
-    return header + "\n\n".join(context_parts[:10])
+    return header + "\n\n".join(context_parts)
+
+
+# pgvector e opcional (no Heroku embedding_v2 e BYTEA). Quando a migracao cria
+# artigos_brutos.embedding_vec (vector(768) + indice HNSW), a busca vetorial usa o indice ANN.
+_EMBEDDING_VEC_DISPONIVEL: Optional[bool] = None
+
+
+def _embedding_vec_disponivel(db: Session) -> bool:
+    """Verifica uma vez por processo se a coluna embedding_vec (pgvector) existe."""
+    global _EMBEDDING_VEC_DISPONIVEL
+    if _EMBEDDING_VEC_DISPONIVEL is None:
+        try:
+            # Savepoint: a sessao pode ser a do pipeline (state["db_session"]); nao desfaz o trabalho do chamador
+            with db.begin_nested():
+                _EMBEDDING_VEC_DISPONIVEL = db.execute(text("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'artigos_brutos' AND column_name = 'embedding_vec'
+                """)).first() is not None
+        except Exception:
+            _EMBEDDING_VEC_DISPONIVEL = False
+    return _EMBEDDING_VEC_DISPONIVEL
+
+
+def _vector_literal(embedding_bytes: bytes) -> str:
+    """BYTEA float32 -> literal textual do pgvector ('[0.1,0.2,...]')."""
+    import numpy as np
+    return "[" + ",".join(f"{x:.7g}" for x in np.frombuffer(embedding_bytes, dtype=np.float32).tolist()) + "]"
+
+
+def save_embedding_vec(db: Session, artigo_id: int, embedding_bytes: bytes) -> bool:
+    """
+    Espelha embedding_v2 na coluna pgvector embedding_vec (se existir).
+    Nao faz commit: roda na mesma transacao que grava embedding_v2.
+    """
+    if not embedding_bytes or not _embedding_vec_disponivel(db):
+        return False
+    try:
+        # Savepoint: uma falha aqui nao pode abortar a gravacao de embedding_v2
+        with db.begin_nested():
+            db.execute(
+                text("UPDATE artigos_brutos SET embedding_vec = CAST(:q AS vector) WHERE id = :id"),
+                {"q": _vector_literal(embedding_bytes), "id": artigo_id},
+            )
+        return True
+    except Exception as e:
+        print(f"[VectorSearch] embedding_vec nao gravado para artigo={artigo_id}: {e}")
+        return False
+
+
+# Cache em memoria de embedding_v2 por artigo: o vetor e gravado uma vez e nao muda,
+# entao so artigos novos precisam trazer o BYTEA do banco (~3 KB cada, ate 2000 por busca).
+# Guardado normalizado e quantizado em int8 (escala 127): 768 B por artigo em vez de 3 KB,
+# erro de cosseno ~1e-3, irrelevante para o limiar de 0.7.
+_EMBEDDING_CACHE: Dict[int, bytes] = {}
+_EMBEDDING_CACHE_MAX = 20000
+_INT8_SCALE = 127.0
+
+
+def _quantize_embedding(embedding_bytes: bytes) -> bytes:
+    """float32 (BYTEA) -> int8 L2-normalizado * 127."""
+    import numpy as np
+    v = np.frombuffer(embedding_bytes, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    if norm > 0:
+        v = v / norm
+    return np.clip(np.rint(v * _INT8_SCALE), -127, 127).astype(np.int8).tobytes()
+
+
+def _load_article_embeddings(db: Session, artigo_ids: List[int]) -> Dict[int, bytes]:
+    """Retorna {artigo_id: embedding int8 quantizado}, buscando no banco apenas os ids fora do cache."""
+    encontrados = {}
+    faltantes = []
+    for aid in artigo_ids:
+        emb = _EMBEDDING_CACHE.get(aid)
+        if emb is None:
+            faltantes.append(aid)
+        else:
+            encontrados[aid] = emb
+    if faltantes:
+        for aid, emb in (
+            db.query(ArtigoBruto.id, ArtigoBruto.embedding_v2)
+            .filter(ArtigoBruto.id.in_(faltantes), ArtigoBruto.embedding_v2.isnot(None))
+            .all()
+        ):
+            emb = encontrados[aid] = _quantize_embedding(bytes(emb))
+            while len(_EMBEDDING_CACHE) >= _EMBEDDING_CACHE_MAX:
+                _EMBEDDING_CACHE.pop(next(iter(_EMBEDDING_CACHE)), None)
+            _EMBEDDING_CACHE[aid] = emb
+    return encontrados
 
 
 def get_similar_articles_by_embedding(
@@ -488,8 +782,8 @@ def get_similar_articles_by_embedding(
 ) -> List[Dict[str, Any]]:
     """
     Busca vetorial: encontra artigos semanticamente similares via embedding_v2.
-    Como pgvector nao esta disponivel, carrega embeddings recentes e calcula
-    similaridade cosseno em Python.
+    Com pgvector (coluna embedding_vec + indice HNSW) o k-NN roda no banco; sem
+    ele, carrega embeddings recentes e calcula similaridade cosseno em Python.
     
     Args:
         db: Sessao do banco
@@ -506,7 +800,57 @@ def get_similar_articles_by_embedding(
     
     cutoff = datetime.utcnow() - timedelta(days=days)
     
-    # Carrega artigos recentes que tem embedding_v2
+    if _embedding_vec_disponivel(db):
+        try:
+            # SET LOCAL vale so para esta transacao. O HNSW filtra (cutoff/status) depois de
+            # achar os vizinhos: com iterative_scan (pgvector >= 0.8) o indice continua varrendo
+            # ate completar o LIMIT; em versoes antigas o SET falha e fica so o ef_search.
+            try:
+                with db.begin_nested():
+                    db.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            except Exception:
+                pass
+            with db.begin_nested():
+                db.execute(text("SET LOCAL hnsw.ef_search = 100"))
+                rows = db.execute(
+                    text("""
+                        SELECT id, titulo_extraido, tag, prioridade, cluster_id,
+                               1 - (embedding_vec <=> CAST(:q AS vector)) AS similarity
+                        FROM artigos_brutos
+                        WHERE embedding_vec IS NOT NULL
+                          AND created_at >= :cutoff
+                          AND status IN ('processado', 'pronto_agrupar')
+                          AND id <> :exclude_id
+                        ORDER BY embedding_vec <=> CAST(:q AS vector)
+                        LIMIT :top_k
+                    """),
+                    {
+                        "q": _vector_literal(embedding_bytes),
+                        "cutoff": cutoff,
+                        "exclude_id": exclude_artigo_id or -1,
+                        "top_k": top_k,
+                    },
+                ).fetchall()
+            # Menos que top_k linhas: os filtros podaram os vizinhos do indice
+            # (ou ha artigos sem embedding_vec); a varredura completa abaixo nao perde nada
+            if len(rows) >= top_k:
+                return [
+                    {
+                        "artigo_id": r[0],
+                        "titulo": r[1] or "",
+                        "tag": r[2],
+                        "prioridade": r[3],
+                        "cluster_id": r[4],
+                        "similarity": round(float(r[5]), 4),
+                    }
+                    for r in rows
+                    if r[5] is not None and r[5] >= similarity_threshold
+                ]
+        except Exception as e:
+            print(f"[VectorSearch] pgvector falhou, usando busca em Python: {e}")
+    
+    # Carrega metadados dos artigos recentes que tem embedding_v2 (sem o BYTEA:
+    # os vetores vem do cache em memoria e so os que faltam sao buscados no banco)
     query = (
         db.query(
             ArtigoBruto.id,
@@ -514,7 +858,6 @@ def get_similar_articles_by_embedding(
             ArtigoBruto.tag,
             ArtigoBruto.prioridade,
             ArtigoBruto.cluster_id,
-            ArtigoBruto.embedding_v2,
         )
         .filter(
             ArtigoBruto.embedding_v2.isnot(None),
@@ -542,35 +885,44 @@ def get_similar_articles_by_embedding(
     except Exception:
         return []
     
-    # Calcula similaridade com cada artigo
-    results = []
-    for artigo in artigos:
-        try:
-            other_emb = np.frombuffer(artigo.embedding_v2, dtype=np.float32)
-            if len(other_emb) != len(current_emb):
-                continue
-            norm_other = np.linalg.norm(other_emb)
-            if norm_other == 0:
-                continue
-            other_emb = other_emb / norm_other
-            
-            similarity = float(np.dot(current_emb, other_emb))
-            
-            if similarity >= similarity_threshold:
-                results.append({
-                    "artigo_id": artigo.id,
-                    "titulo": artigo.titulo_extraido or "",
-                    "tag": artigo.tag,
-                    "prioridade": artigo.prioridade,
-                    "cluster_id": artigo.cluster_id,
-                    "similarity": round(similarity, 4),
-                })
-        except Exception:
-            continue
+    embeddings = _load_article_embeddings(db, [a.id for a in artigos])
+    
+    try:
+        from ._ann_kernels import int8_scores
+    except ImportError:
+        from backend.agents._ann_kernels import int8_scores
+    
+    # Empilha os embeddings int8 numa matriz (N, d) e calcula todas as similaridades numa
+    # passada (kernel numba se instalado, senao matmul); ja estao normalizados, so falta desfazer a escala
+    dim = current_emb.size
+    artigos = [a for a in artigos if len(embeddings.get(a.id) or b"") == dim]
+    if not artigos:
+        return []
+    matriz = np.frombuffer(
+        b"".join(embeddings[a.id] for a in artigos), dtype=np.int8
+    ).reshape(len(artigos), dim)
+    sims = int8_scores(matriz, current_emb, _INT8_SCALE)
+    
+    # Top-k via argpartition; so os sobreviventes sao ordenados
+    if len(sims) > top_k:
+        idx = np.argpartition(-sims, top_k)[:top_k]
+    else:
+        idx = np.arange(len(sims))
+    idx = idx[sims[idx] >= similarity_threshold]
+    idx = idx[np.argsort(-sims[idx], kind="stable")]
     
-    # Ordena por similaridade e retorna top_k
-    results.sort(key=lambda x: x["similarity"], reverse=True)
-    return results[:top_k]
+    results = []
+    for i in idx.tolist():
+        artigo = artigos[i]
+        results.append({
+            "artigo_id": artigo.id,
+            "titulo": artigo.titulo_extraido or "",
+            "tag": artigo.tag,
+            "prioridade": artigo.prioridade,
+            "cluster_id": artigo.cluster_id,
+            "similarity": round(float(sims[i]), 4),
+        })
+    return results
 
 
 def get_vector_context_for_article(
@@ -621,6 +973,39 @@ def get_vector_context_for_article(
     return "\n\n".join(parts[:5])
 
 
+# Cache TTL do contexto por cluster: Expandir, Chat e briefing pedem o mesmo cluster
+# varias vezes seguidas. Invalidado no flush de ClusterEvento/ArtigoBruto do cluster.
+_CLUSTER_CONTEXT_CACHE: Dict[tuple, Dict[str, Any]] = {}
+_CLUSTER_CONTEXT_TTL = 300  # 5 minutos
+_CLUSTER_CONTEXT_MAX = 256
+
+
+def invalidate_cluster_context(cluster_id: Optional[int] = None) -> None:
+    """Remove do cache o contexto de um cluster (ou de todos, se cluster_id=None)."""
+    if cluster_id is None:
+        _CLUSTER_CONTEXT_CACHE.clear()
+        return
+    for key in [k for k in _CLUSTER_CONTEXT_CACHE if k[0] == cluster_id]:
+        _CLUSTER_CONTEXT_CACHE.pop(key, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_contexto_no_flush(session, flush_context):
+    # Em after_flush, new/dirty/deleted ainda refletem o que acabou de ser gravado
+    if not _CLUSTER_CONTEXT_CACHE:
+        return
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, ClusterEvento):
+            invalidate_cluster_context(obj.id)
+        elif isinstance(obj, ArtigoBruto):
+            if obj.cluster_id is not None:
+                invalidate_cluster_context(obj.cluster_id)
+            # Artigo movido/mergeado: o cluster de origem tambem muda de contexto
+            for anterior in inspect(obj).attrs.cluster_id.history.deleted:
+                if anterior is not None:
+                    invalidate_cluster_context(anterior)
+
+
 def get_context_for_cluster(
     db: Session,
     cluster_id: int,
@@ -635,56 +1020,80 @@ def get_context_for_cluster(
     2. Busca contexto historico no grafo (ultimos N dias)
     3. Busca artigos semanticamente similares (via embedding_v2)
     4. Combina tudo num texto unico
+    
+    Resultado cacheado por (cluster_id, days_graph, days_vector) por 5 minutos.
     """
+    key = (cluster_id, days_graph, days_vector)
+    cached = _CLUSTER_CONTEXT_CACHE.get(key)
+    if cached and (time.time() - cached["ts"]) < _CLUSTER_CONTEXT_TTL:
+        return cached["valor"]
+    
+    contexto, ok = _build_context_for_cluster(db, cluster_id, days_graph, days_vector)
+    if ok:
+        while len(_CLUSTER_CONTEXT_CACHE) >= _CLUSTER_CONTEXT_MAX:
+            _CLUSTER_CONTEXT_CACHE.pop(next(iter(_CLUSTER_CONTEXT_CACHE)), None)
+        _CLUSTER_CONTEXT_CACHE[key] = {"valor": contexto, "ts": time.time()}
+    return contexto
+
+
+def _build_context_for_cluster(
+    db: Session,
+    cluster_id: int,
+    days_graph: int,
+    days_vector: int,
+) -> Tuple[str, bool]:
+    """Monta o contexto do cluster. Retorna (texto, ok); ok=False quando houve erro (nao cachear)."""
     parts = []
     
     try:
-        # 1. Buscar artigos do cluster
-        artigos = (
-            db.query(ArtigoBruto)
-            .filter(ArtigoBruto.cluster_id == cluster_id)
-            .all()
-        )
-        if not artigos:
-            return ""
-        
-        artigo_ids = [a.id for a in artigos]
-        
-        # 2. Buscar entidades conectadas ao cluster
-        edges = (
-            db.query(GraphEdge)
-            .filter(GraphEdge.artigo_id.in_(artigo_ids))
-            .all()
-        )
+        # 1+2. Artigos do cluster, entidades conectadas e um embedding representativo
+        #      numa unica query (antes: artigos completos + edges + entidades em 3 queries ORM)
+        row = db.execute(
+            text("""
+                WITH arts AS (
+                    SELECT id, embedding_v2 FROM artigos_brutos WHERE cluster_id = :cluster_id
+                ),
+                emb AS (
+                    SELECT id, embedding_v2 FROM arts
+                    WHERE embedding_v2 IS NOT NULL
+                    ORDER BY id
+                    LIMIT 1
+                )
+                SELECT
+                    EXISTS (SELECT 1 FROM arts) AS tem_artigos,
+                    ARRAY(
+                        SELECT DISTINCT e.canonical_name
+                        FROM graph_edges ge
+                        JOIN graph_entities e ON e.id = ge.entity_id
+                        WHERE ge.artigo_id IN (SELECT id FROM arts)
+                    ) AS entity_names,
+                    (SELECT id FROM emb) AS emb_artigo_id,
+                    (SELECT embedding_v2 FROM emb) AS embedding_v2
+            """),
+            {"cluster_id": cluster_id},
+        ).mappings().first()
+        if not row or not row["tem_artigos"]:
+            return "", True
         
-        entity_ids = list(set(e.entity_id for e in edges))
+        entity_names = list(row["entity_names"] or [])
         
-        if entity_ids:
-            entities = (
-                db.query(GraphEntity)
-                .filter(GraphEntity.id.in_(entity_ids))
-                .all()
+        # 3. Contexto temporal do grafo
+        if entity_names:
+            contexto_grafo = get_historical_context_for_entities(
+                db=db,
+                entity_names=entity_names[:5],  # Top 5
+                days=days_graph,
+                max_results=5,
             )
-            entity_names = [e.canonical_name for e in entities]
-            
-            # 3. Contexto temporal do grafo
-            if entity_names:
-                contexto_grafo = get_historical_context_for_entities(
-                    db=db,
-                    entity_names=entity_names[:5],  # Top 5
-                    days=days_graph,
-                    max_results=5,
-                )
-                if contexto_grafo:
-                    parts.append(f"=== HISTORICO NO GRAFO (entidades relacionadas, {days_graph} dias) ===\n{contexto_grafo}")
+            if contexto_grafo:
+                parts.append(f"=== HISTORICO NO GRAFO (entidades relacionadas, {days_graph} dias) ===\n{contexto_grafo}")
         
-        # 4. Busca vetorial (pega embedding do primeiro artigo com embedding_v2)
-        artigo_com_emb = next((a for a in artigos if a.embedding_v2 is not None), None)
-        if artigo_com_emb:
+        # 4. Busca vetorial (embedding do primeiro artigo com embedding_v2)
+        if row["embedding_v2"] is not None:
             contexto_vetorial = get_vector_context_for_article(
                 db=db,
-                embedding_bytes=artigo_com_emb.embedding_v2,
-                artigo_id=artigo_com_emb.id,
+                embedding_bytes=bytes(row["embedding_v2"]),
+                artigo_id=row["emb_artigo_id"],
                 days=days_vector,
                 max_results=5,
             )
@@ -700,8 +1109,9 @@ def get_context_for_cluster(
         except Exception:
             pass
         parts.append(f"[Contexto indisponivel: {str(e)[:100]}]")
+        return "\n\n".join(parts), False
     
-    return "\n\n".join(parts) if parts else ""
+    return ("\n\n".join(parts) if parts else ""), True
 
 
 def get_cluster_graph_data(
@@ -721,151 +1131,142 @@ def get_cluster_graph_data(
     edges_list = []
     seen_nodes = set()
     
-    # 1. Artigos do cluster central
-    artigos = (
-        db.query(ArtigoBruto)
-        .filter(ArtigoBruto.cluster_id == cluster_id)
-        .all()
-    )
-    if not artigos:
+    # 1+2. Cluster central (titulo, prioridade, n de artigos) e suas entidades agregadas
+    #      (mencoes + primeira relacao) numa unica query
+    rows = db.execute(
+        text("""
+            WITH arts AS (
+                SELECT id FROM artigos_brutos WHERE cluster_id = :cluster_id
+            ),
+            ents AS (
+                SELECT ge.entity_id, e.canonical_name, e.entity_type,
+                       COUNT(*) AS mentions,
+                       (array_agg(ge.relation_type ORDER BY ge.id))[1] AS relation
+                FROM graph_edges ge
+                JOIN graph_entities e ON e.id = ge.entity_id
+                WHERE ge.artigo_id IN (SELECT id FROM arts)
+                GROUP BY ge.entity_id, e.canonical_name, e.entity_type
+            )
+            SELECT h.n_artigos, h.titulo, h.prioridade,
+                   ents.entity_id, ents.canonical_name, ents.entity_type, ents.mentions, ents.relation
+            FROM (
+                SELECT (SELECT COUNT(*) FROM arts) AS n_artigos,
+                       c.titulo_cluster AS titulo, c.prioridade
+                FROM (SELECT 1) AS um
+                LEFT JOIN clusters_eventos c ON c.id = :cluster_id
+            ) h
+            LEFT JOIN ents ON TRUE
+            ORDER BY ents.mentions DESC NULLS LAST
+        """),
+        {"cluster_id": cluster_id},
+    ).mappings().all()
+    
+    header = rows[0] if rows else None
+    if not header or not header["n_artigos"]:
         return {"center_cluster_id": cluster_id, "nodes": [], "edges": [], "stats": {"total_entities": 0, "depth": 0}}
     
-    artigo_ids = [a.id for a in artigos]
-    
     # Node do cluster central
-    cluster = db.query(ClusterEvento).filter(ClusterEvento.id == cluster_id).first()
-    center_label = cluster.titulo_cluster[:60] if cluster and cluster.titulo_cluster else f"Cluster {cluster_id}"
+    center_label = header["titulo"][:60] if header["titulo"] else f"Cluster {cluster_id}"
     center_node_id = f"c_{cluster_id}"
     nodes.append({
         "id": center_node_id,
         "label": center_label,
         "type": "cluster",
-        "subtype": cluster.prioridade if cluster else "P3",
-        "size": len(artigos),
+        "subtype": header["prioridade"] or "P3",
+        "size": header["n_artigos"],
     })
     seen_nodes.add(center_node_id)
     
-    # 2. Entidades conectadas ao cluster
-    graph_edges = (
-        db.query(GraphEdge)
-        .filter(GraphEdge.artigo_id.in_(artigo_ids))
-        .all()
-    )
-    
-    entity_ids = list(set(e.entity_id for e in graph_edges))
-    if not entity_ids:
+    entity_rows = [r for r in rows if r["entity_id"] is not None]
+    if not entity_rows:
         return {"center_cluster_id": cluster_id, "nodes": nodes, "edges": [], "stats": {"total_entities": 0, "depth": 0}}
     
-    entities = (
-        db.query(GraphEntity)
-        .filter(GraphEntity.id.in_(entity_ids))
-        .all()
-    )
-    entity_map = {e.id: e for e in entities}
-    
-    # Conta mencoes por entidade para sizing
-    entity_mention_count = {}
-    for edge in graph_edges:
-        entity_mention_count[edge.entity_id] = entity_mention_count.get(edge.entity_id, 0) + 1
-    
-    # Adiciona nodes de entidades (limitado)
-    sorted_entities = sorted(entity_ids, key=lambda eid: entity_mention_count.get(eid, 0), reverse=True)
-    
-    for eid in sorted_entities[:max_entity_nodes]:
-        ent = entity_map.get(eid)
-        if not ent:
-            continue
-        node_id = f"e_{eid}"
+    # Adiciona nodes de entidades (limitado; ja vem ordenado por mencoes)
+    selected = entity_rows[:max_entity_nodes]
+    for ent in selected:
+        node_id = f"e_{ent['entity_id']}"
+        mentions = ent["mentions"] or 1
         if node_id not in seen_nodes:
             nodes.append({
                 "id": node_id,
-                "label": ent.canonical_name,
+                "label": ent["canonical_name"],
                 "type": "entity",
-                "subtype": ent.entity_type,
-                "size": entity_mention_count.get(eid, 1),
+                "subtype": ent["entity_type"],
+                "size": mentions,
             })
             seen_nodes.add(node_id)
         
         # Edge entidade -> cluster central
-        rel = "MENTIONED"
-        for ge in graph_edges:
-            if ge.entity_id == eid:
-                rel = ge.relation_type
-                break
         edges_list.append({
             "source": node_id,
             "target": center_node_id,
-            "relation": rel,
-            "weight": entity_mention_count.get(eid, 1),
+            "relation": ent["relation"] or "MENTIONED",
+            "weight": mentions,
         })
     
-    # 3. N1: Outros clusters que compartilham entidades (ultimos N dias)
+    # 3. N1: Outros clusters que compartilham entidades (ultimos N dias), ja com
+    #    titulo/prioridade dos clusters ativos (antes: um .first() por cluster)
     cutoff = datetime.utcnow() - timedelta(days=days)
-    selected_entity_ids = sorted_entities[:max_entity_nodes]
-    
-    related_edges = (
-        db.query(GraphEdge.entity_id, ArtigoBruto.cluster_id)
-        .join(ArtigoBruto, GraphEdge.artigo_id == ArtigoBruto.id)
-        .filter(
-            GraphEdge.entity_id.in_(selected_entity_ids),
-            ArtigoBruto.cluster_id.isnot(None),
-            ArtigoBruto.cluster_id != cluster_id,
-            ArtigoBruto.created_at >= cutoff,
-        )
-        .all()
-    )
-    
-    # Agrupa: entity_id -> set(cluster_ids)
-    entity_to_clusters = {}
-    for eid, cid in related_edges:
-        if cid:
-            entity_to_clusters.setdefault(eid, set()).add(cid)
+    related = db.execute(
+        text("""
+            SELECT DISTINCT ge.entity_id, a.cluster_id,
+                   c.id IS NOT NULL AS ativo, c.titulo_cluster AS titulo, c.prioridade
+            FROM graph_edges ge
+            JOIN artigos_brutos a ON a.id = ge.artigo_id
+            LEFT JOIN clusters_eventos c ON c.id = a.cluster_id AND c.status = 'ativo'
+            WHERE ge.entity_id = ANY(CAST(:ids AS uuid[]))
+              AND a.cluster_id IS NOT NULL
+              AND a.cluster_id <> :cluster_id
+              AND a.created_at >= :cutoff
+        """),
+        {"ids": [str(ent["entity_id"]) for ent in selected], "cluster_id": cluster_id, "cutoff": cutoff},
+    ).mappings().all()
+    
+    # Agrupa: cluster_id -> entidades compartilhadas (e metadados do cluster).
+    # O DISTINCT ja garante um par (entidade, cluster) por linha: a contagem e so len().
+    cluster_to_entities: Dict[int, List[str]] = {}
+    cluster_meta: Dict[int, Any] = {}
+    for r in related:
+        cid = r["cluster_id"]
+        cluster_to_entities.setdefault(cid, []).append(r["entity_id"])
+        cluster_meta[cid] = r
     
     # Seleciona clusters mais conectados
-    cluster_count = {}
-    for eid, cids in entity_to_clusters.items():
-        for cid in cids:
-            cluster_count[cid] = cluster_count.get(cid, 0) + 1
-    
-    top_clusters = sorted(cluster_count.keys(), key=lambda c: cluster_count[c], reverse=True)[:max_cluster_nodes]
+    top_clusters = sorted(cluster_to_entities, key=lambda c: len(cluster_to_entities[c]), reverse=True)[:max_cluster_nodes]
     
     for cid in top_clusters:
-        related_cluster = db.query(ClusterEvento).filter(
-            ClusterEvento.id == cid,
-            ClusterEvento.status == 'ativo',
-        ).first()
-        if not related_cluster:
+        meta = cluster_meta[cid]
+        if not meta["ativo"]:
             continue
         
         node_id = f"c_{cid}"
         if node_id not in seen_nodes:
             nodes.append({
                 "id": node_id,
-                "label": (related_cluster.titulo_cluster or "")[:60],
+                "label": (meta["titulo"] or "")[:60],
                 "type": "cluster",
-                "subtype": related_cluster.prioridade or "P3",
-                "size": cluster_count[cid],
+                "subtype": meta["prioridade"] or "P3",
+                "size": len(cluster_to_entities[cid]),
             })
             seen_nodes.add(node_id)
         
         # Edges: entidades compartilhadas -> cluster relacionado
-        for eid, cids in entity_to_clusters.items():
-            if cid in cids:
-                ent_node_id = f"e_{eid}"
-                if ent_node_id in seen_nodes:
-                    edges_list.append({
-                        "source": ent_node_id,
-                        "target": node_id,
-                        "relation": "SHARED",
-                        "weight": 1,
-                    })
+        for eid in cluster_to_entities[cid]:
+            ent_node_id = f"e_{eid}"
+            if ent_node_id in seen_nodes:
+                edges_list.append({
+                    "source": ent_node_id,
+                    "target": node_id,
+                    "relation": "SHARED",
+                    "weight": 1,
+                })
     
     return {
         "center_cluster_id": cluster_id,
         "nodes": nodes,
         "edges": edges_list,
         "stats": {
-            "total_entities": len(entity_ids),
+            "total_entities": len(entity_rows),
             "depth": 1 if top_clusters else 0,
         },
     }
@@ -873,30 +1274,26 @@ def get_cluster_graph_data(
 
 def get_entity_stats(db: Session) -> Dict[str, Any]:
     """Retorna estatisticas do grafo de conhecimento."""
-    total_entities = db.query(func.count(GraphEntity.id)).scalar() or 0
-    total_edges = db.query(func.count(GraphEdge.id)).scalar() or 0
-    
-    entities_by_type = dict(
-        db.query(
-            GraphEntity.entity_type,
-            func.count(GraphEntity.id)
-        )
-        .group_by(GraphEntity.entity_type)
-        .all()
-    )
-    
-    edges_by_relation = dict(
-        db.query(
-            GraphEdge.relation_type,
-            func.count(GraphEdge.id)
-        )
-        .group_by(GraphEdge.relation_type)
-        .all()
-    )
+    # Uma unica ida ao banco: as quatro agregacoes como triplas (kind, key, value)
+    rows = db.execute(text("""
+        SELECT 'entity_type' AS kind, entity_type AS key, COUNT(*) AS value
+        FROM graph_entities GROUP BY entity_type
+        UNION ALL
+        SELECT 'relation_type', relation_type, COUNT(*)
+        FROM graph_edges GROUP BY relation_type
+    """)).all()
+    
+    entities_by_type: Dict[str, int] = {}
+    edges_by_relation: Dict[str, int] = {}
+    for kind, key, value in rows:
+        if kind == "entity_type":
+            entities_by_type[key] = value
+        else:
+            edges_by_relation[key] = value
     
     return {
-        "total_entities": total_entities,
-        "total_edges": total_edges,
+        "total_entities": sum(entities_by_type.values()),
+        "total_edges": sum(edges_by_relation.values()),
         "entities_by_type": entities_by_type,
         "edges_by_relation": edges_by_relation,
     }
@@ -33,6 +33,7 @@ try:
         link_artigo_to_entities,
         get_historical_context_for_entities,
         get_vector_context_for_article,
+        save_embedding_vec,
     )
     from ..processing import gerar_embedding_v2
 except ImportError:
@@ -52,6 +53,7 @@ except ImportError:
         link_artigo_to_entities,
         get_historical_context_for_entities,
         get_vector_context_for_article,
+        save_embedding_vec,
     )
     from backend.processing import gerar_embedding_v2
 
@@ -78,6 +80,7 @@ class FeedState(TypedDict, total=False):
     # Entidades extraidas
     entities_raw: list        # Lista de dicts { name, type, role, sentiment, context }
     entities_resolved: list   # Lista de entity_ids apos resolucao
+    entities_pre_extraidas: bool  # entities_raw veio do NER em lote (mesmo se vazio)
 
     # Contexto historico (Graph-RAG)
     contexto_historico: str   # Texto formatado com fatos passados
@@ -93,6 +96,29 @@ class FeedState(TypedDict, total=False):
     # Controle
     error: str
     processing_log: list
+    db_session: Any           # Session compartilhada pelo run (aberta/fechada pelo workflow)
+
+
+def _abrir_sessao(state: FeedState):
+    """Reusa a sessao do run (state["db_session"]) ou abre uma propria. Retorna (db, propria)."""
+    db = state.get("db_session")
+    if db is not None:
+        return db, False
+    return SessionLocal(), True
+
+
+def _liberar_sessao(db, propria: bool) -> None:
+    """
+    Fecha a sessao propria; na compartilhada encerra a transacao para devolver a conexao
+    ao pool (o proximo no faz chamadas LLM e nao pode deixar a conexao "idle in transaction").
+    """
+    if propria:
+        db.close()
+        return
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
 
 
 # ==============================================================================
@@ -113,14 +139,14 @@ NOISE_PATTERNS = [
 
 COMPILED_NOISE = [re.compile(p, re.IGNORECASE) for p in NOISE_PATTERNS]
 
+# Todos os padroes fundidos numa unica alternancia: uma varredura do texto em vez de oito
+_NOISE_RE = re.compile("|".join(f"(?:{p})" for p in NOISE_PATTERNS), re.IGNORECASE)
+
 
 def _is_noise(text: str) -> bool:
     """Verifica se o texto contem padroes de ruido obvio."""
-    text_lower = text[:2000].lower()  # Verifica apenas os primeiros 2000 chars
-    for pattern in COMPILED_NOISE:
-        if pattern.search(text_lower):
-            return True
-    return False
+    # Verifica apenas os primeiros 2000 chars (IGNORECASE dispensa o lower())
+    return _NOISE_RE.search(text[:2000]) is not None
 
 
 # ==============================================================================
@@ -161,10 +187,60 @@ Responda APENAS com JSON valido no formato:
 ```"""
 
 
+# Variante em lote: varios artigos numa unica chamada (amortiza latencia por requisicao)
+PROMPT_ENTITY_EXTRACTION_LOTE = """Voce e um especialista em NER (Named Entity Recognition) para o mercado financeiro brasileiro.
+
+Para CADA artigo abaixo (delimitados por <artigo id="...">), extraia TODAS as entidades relevantes (pessoas, empresas, orgaos governamentais, eventos e conceitos).
+
+REGRAS:
+1. Extraia apenas entidades CONCRETAS e NOMEADAS (nao adjetivos ou descricoes genericas)
+2. Para cada entidade, indique:
+   - name: Nome como aparece no texto
+   - type: PERSON | ORG | GOV | EVENT | CONCEPT
+   - role: PROTAGONIST (principal no evento) | TARGET (alvo/afetado) | MENTIONED (citado)
+   - sentiment: float de -1.0 (negativo) a 1.0 (positivo) baseado no contexto
+   - context: Trecho curto (max 100 chars) que justifica a entidade
+3. Limite: maximo 15 entidades por artigo
+4. Ignore entidades genericas como "governo", "mercado", "analistas"
+5. Devolva um item em "results" para CADA artigo, com o mesmo id
+
+ARTIGOS:
+{artigos}
+
+Responda APENAS com JSON valido no formato:
+```json
+{{
+  "results": [
+    {{
+      "artigo_id": 123,
+      "entities": [
+        {{
+          "name": "nome da entidade",
+          "type": "PERSON|ORG|GOV|EVENT|CONCEPT",
+          "role": "PROTAGONIST|TARGET|MENTIONED",
+          "sentiment": 0.0,
+          "context": "trecho curto do texto"
+        }}
+      ]
+    }}
+  ]
+}}
+```"""
+
+
 # ==============================================================================
 # NODE 1: GATEKEEPER (Filtro de Relevancia)
 # ==============================================================================
 
+def motivo_rejeicao_gatekeeper(titulo: str, texto: str) -> str:
+    """Filtros rapidos do gatekeeper. Retorna o motivo da rejeicao ou "" se aprovado."""
+    if _is_noise(f"{titulo} {texto[:3000]}"):
+        return "Regex noise filter"
+    if len(texto.strip()) < 50:
+        return "Texto muito curto"
+    return ""
+
+
 def gatekeeper_node(state: FeedState) -> FeedState:
     """
     No 1 do pipeline: Filtro de relevancia.
@@ -179,24 +255,17 @@ def gatekeeper_node(state: FeedState) -> FeedState:
     texto = state.get("texto_raw", "")
     titulo = state.get("titulo", "")
     
-    # 1. Hard filter (Regex - Zero tokens)
-    texto_completo = f"{titulo} {texto[:3000]}"
-    if _is_noise(texto_completo):
-        log.append(f"[Gatekeeper] Rejeitado por regex: ruido detectado")
-        return {
-            **state,
-            "is_relevant": False,
-            "rejection_reason": "Regex noise filter",
-            "processing_log": log,
-        }
-    
-    # 2. Verificacoes basicas de qualidade
-    if len(texto.strip()) < 50:
-        log.append(f"[Gatekeeper] Rejeitado: texto muito curto ({len(texto)} chars)")
+    # 1. Hard filter (Regex - Zero tokens) + 2. Verificacoes basicas de qualidade
+    motivo = motivo_rejeicao_gatekeeper(titulo, texto)
+    if motivo:
+        if motivo == "Regex noise filter":
+            log.append(f"[Gatekeeper] Rejeitado por regex: ruido detectado")
+        else:
+            log.append(f"[Gatekeeper] Rejeitado: texto muito curto ({len(texto)} chars)")
         return {
             **state,
             "is_relevant": False,
-            "rejection_reason": "Texto muito curto",
+            "rejection_reason": motivo,
             "processing_log": log,
         }
     
@@ -223,6 +292,12 @@ def entity_extraction_node(state: FeedState) -> FeedState:
     texto = state.get("texto_raw", "")
     titulo = state.get("titulo", "")
     
+    # Entidades ja extraidas em lote (extract_entities_batch): nao repete a chamada LLM,
+    # inclusive quando o lote nao achou nenhuma entidade
+    if state.get("entities_pre_extraidas"):
+        log.append(f"[EntityExtraction] {len(state.get('entities_raw', []))} entidades extraidas (lote)")
+        return {**state, "processing_log": log}
+    
     texto_para_ner = f"Titulo: {titulo}\n\n{texto[:4000]}"
     
     try:
@@ -244,18 +319,7 @@ def entity_extraction_node(state: FeedState) -> FeedState:
         resultado = extrair_json_da_resposta(response.text)
         
         if resultado and isinstance(resultado, dict):
-            entities = resultado.get("entities", [])
-            # Validacao basica
-            valid_entities = []
-            for e in entities:
-                if isinstance(e, dict) and e.get("name") and len(e["name"].strip()) >= 2:
-                    valid_entities.append({
-                        "name": e["name"].strip(),
-                        "type": e.get("type", "ORG").upper(),
-                        "role": e.get("role", "MENTIONED").upper(),
-                        "sentiment": float(e.get("sentiment", 0.0)),
-                        "context": str(e.get("context", ""))[:200],
-                    })
+            valid_entities = _validar_entidades(resultado.get("entities", []))
             
             log.append(f"[EntityExtraction] {len(valid_entities)} entidades extraidas")
             return {**state, "entities_raw": valid_entities, "processing_log": log}
@@ -268,6 +332,72 @@ def entity_extraction_node(state: FeedState) -> FeedState:
         return {**state, "entities_raw": [], "processing_log": log}
 
 
+def _validar_entidades(entities: Any) -> List[Dict[str, Any]]:
+    """Validacao basica das entidades devolvidas pelo LLM."""
+    valid_entities = []
+    for e in entities or []:
+        if isinstance(e, dict) and e.get("name") and len(e["name"].strip()) >= 2:
+            valid_entities.append({
+                "name": e["name"].strip(),
+                "type": e.get("type", "ORG").upper(),
+                "role": e.get("role", "MENTIONED").upper(),
+                "sentiment": float(e.get("sentiment", 0.0)),
+                "context": str(e.get("context", ""))[:200],
+            })
+    return valid_entities
+
+
+def extract_entities_batch(states: List[FeedState]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Extrai entidades de varios artigos numa unica chamada Gemini.
+    Retorna {artigo_id: entidades}; artigos ausentes/erro ficam de fora e o
+    entity_extraction_node faz a chamada individual como fallback.
+    """
+    states = [st for st in states if st.get("artigo_id")]
+    if not states:
+        return {}
+    
+    blocos = []
+    for st in states:
+        titulo = st.get("titulo", "")
+        texto = st.get("texto_raw", "")
+        blocos.append(f'<artigo id="{st["artigo_id"]}">\nTitulo: {titulo}\n\n{texto[:2500]}\n</artigo>')
+    
+    try:
+        model = get_gemini_model()
+        if not model:
+            return {}
+        
+        response = model.generate_content(
+            PROMPT_ENTITY_EXTRACTION_LOTE.format(artigos="\n\n".join(blocos)),
+            generation_config={
+                'temperature': 0.2,
+                'max_output_tokens': min(65536, 2048 * len(states)),
+            }
+        )
+        
+        resultado = extrair_json_da_resposta(response.text)
+        if not (resultado and isinstance(resultado, dict)):
+            return {}
+        
+        ids_validos = {st["artigo_id"] for st in states}
+        por_artigo: Dict[int, List[Dict[str, Any]]] = {}
+        for item in resultado.get("results", []):
+            if not isinstance(item, dict):
+                continue
+            try:
+                artigo_id = int(item.get("artigo_id"))
+            except (TypeError, ValueError):
+                continue
+            if artigo_id in ids_validos:
+                por_artigo[artigo_id] = _validar_entidades(item.get("entities", []))
+        return por_artigo
+    
+    except Exception as e:
+        print(f"[EntityExtraction] Lote falhou ({len(states)} artigos): {str(e)[:200]}")
+        return {}
+
+
 # ==============================================================================
 # NODE 3: ENTITY RESOLUTION (Normalizacao e Persistencia no Grafo)
 # ==============================================================================
@@ -286,7 +416,7 @@ def entity_resolution_node(state: FeedState) -> FeedState:
         return {**state, "entities_resolved": [], "processing_log": log}
     
     try:
-        db = SessionLocal()
+        db, propria = _abrir_sessao(state)
         try:
             edges = link_artigo_to_entities(db, artigo_id, entities_raw)
             entity_ids = [str(e.entity_id) for e in edges]
@@ -300,7 +430,7 @@ def entity_resolution_node(state: FeedState) -> FeedState:
                 "processing_log": log,
             }
         finally:
-            db.close()
+            _liberar_sessao(db, propria)
     
     except Exception as e:
         log.append(f"[EntityResolution] Erro: {str(e)[:200]}")
@@ -330,7 +460,7 @@ def historian_node(state: FeedState) -> FeedState:
     embedding_bytes = None
     
     try:
-        db = SessionLocal()
+        db, propria = _abrir_sessao(state)
         try:
             # ---------------------------------------------------------------
             # ETAPA A: Gerar e salvar embedding_v2 (Gemini 768d)
@@ -341,6 +471,7 @@ def historian_node(state: FeedState) -> FeedState:
                     artigo = db.query(ArtigoBruto).filter(ArtigoBruto.id == artigo_id).first()
                     if artigo:
                         artigo.embedding_v2 = embedding_bytes
+                        save_embedding_vec(db, artigo_id, embedding_bytes)
                         db.commit()
                         log.append(f"[Historian] Embedding v2 gerado e salvo ({len(embedding_bytes)} bytes)")
                 else:
@@ -399,8 +530,12 @@ def historian_node(state: FeedState) -> FeedState:
                 "embedding_v2": embedding_bytes,
                 "processing_log": log,
             }
+        except Exception:
+            # Sessao compartilhada segue para os proximos nos: nao deixa transacao abortada
+            db.rollback()
+            raise
         finally:
-            db.close()
+            _liberar_sessao(db, propria)
     
     except Exception as e:
         log.append(f"[Historian] Erro: {str(e)[:200]}")
@@ -21,7 +21,7 @@ import json
 import time
 import urllib.request
 import urllib.parse
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
@@ -69,18 +69,20 @@ class TelegramBroadcaster:
         Retorna lista de dicts simplificados para o LLM.
         """
         from backend.database import SessionLocal, ClusterEvento
-        from sqlalchemy import func
 
         db = SessionLocal()
         try:
             from backend.utils import get_date_brasil_str
             hoje = day_str or get_date_brasil_str()
+            inicio = datetime.strptime(hoje, "%Y-%m-%d")
+            fim = inicio + timedelta(days=1)
 
             clusters = (
                 db.query(ClusterEvento)
                 .filter(
                     ClusterEvento.status == 'ativo',
-                    func.date(ClusterEvento.created_at) == hoje,
+                    ClusterEvento.created_at >= inicio,
+                    ClusterEvento.created_at < fim,
                     ClusterEvento.prioridade.in_(['P1_CRITICO', 'P2_ESTRATEGICO']),
                     ClusterEvento.tag != 'IRRELEVANTE',
                 )
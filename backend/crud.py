@@ -3,28 +3,56 @@ Operações CRUD (Create, Read, Update, Delete) para o BTG AlphaFeed.
 Funções para interagir com o banco de dados PostgreSQL.
 """
 
+import re
+import time
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
+from urllib.parse import urlparse
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func, text
+from sqlalchemy import and_, desc, func, or_, select, text
 
 try:
     from .database import (ArtigoBruto, ClusterEvento, SinteseExecutiva, LogProcessamento,
-                           ConfiguracaoColeta, EstagiarioChatSession, EstagiarioChatMessage,
+                           ConfiguracaoColeta, EstagiarioChatSession, EstagiarioChatMessage, FeedbackNoticia,
                            PromptTag, PromptPrioridadeItem, PromptTemplate,
                            Usuario, PreferenciaUsuario, TemplateResumoUsuario, ResumoUsuario)
     from .models import ArtigoBrutoCreate, ClusterEventoCreate
     from .utils import get_date_brasil
 except ImportError:
     from backend.database import (ArtigoBruto, ClusterEvento, SinteseExecutiva, LogProcessamento,
-                                  ConfiguracaoColeta, EstagiarioChatSession, EstagiarioChatMessage,
+                                  ConfiguracaoColeta, EstagiarioChatSession, EstagiarioChatMessage, FeedbackNoticia,
                                   PromptTag, PromptPrioridadeItem, PromptTemplate,
                                   Usuario, PreferenciaUsuario, TemplateResumoUsuario, ResumoUsuario)
     from backend.models import ArtigoBrutoCreate, ClusterEventoCreate
     from backend.utils import get_date_brasil
 
 
+# Regex pré-compiladas para canonização de nomes de fonte (executadas por linha)
+_RE_NUMERO_5_DIGITOS = re.compile(r"\b\d{5,}\b")
+# Datas dd.mm.yyyy, números longos e dias/meses (FR/PT) numa única alternação: uma varredura por nome
+_RE_SUFIXOS_DATA = re.compile(
+    r"\b(?:"
+    r"\d{1,2}[\./-]\d{1,2}[\./-]\d{2,4}"
+    r"|\d{4,}"
+    r"|lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|janvier|février|fevrier|mars|avril|mai|juin|juillet|août|aout|septembre|octobre|novembre|décembre|decembre"
+    r"|segunda|terca|terça|quarta|quinta|sexta|sábado|sabado|domingo|janeiro|fevereiro|março|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro"
+    r")\b",
+    re.IGNORECASE,
+)
+_RE_ESPACOS_MULTIPLOS = re.compile(r"\s{2,}")
+_NOMES_FONTE_LIXO = frozenset({"n/a", "na", "nd", "?", "-", "ela", "ines", "ines249"})
+
+
+def _day_range(target_date) -> tuple:
+    """
+    Intervalo semiaberto [início do dia, início do dia seguinte) para filtros por data.
+    Diferente de func.date(coluna) == data, permite ao planner usar o índice B-tree da coluna.
+    """
+    inicio = datetime.combine(target_date, datetime.min.time())
+    return inicio, inicio + timedelta(days=1)
+
+
 # ==============================================================================
 # OPERAÇÕES CRUD - ARTIGOS BRUTOS
 # ==============================================================================
@@ -221,7 +249,6 @@ def list_sourcers_by_date_and_tipo(db: Session, target_date, tipo_fonte: str) ->
                 return m_f2
         if url:
             try:
-                from urllib.parse import urlparse
                 netloc = urlparse(url).netloc
                 return netloc.lower() if netloc else None
             except Exception:
@@ -232,15 +259,10 @@ def list_sourcers_by_date_and_tipo(db: Session, target_date, tipo_fonte: str) ->
         if not nome_raw:
             return None
         s = ' '.join(str(nome_raw).replace('‐', '-').replace('–', '-').split()).strip()
-        import re
         # remove datas e sufixos (números longos, datas dd.mm.yyyy, mês por extenso)
-        s = re.sub(r"\b\d{4,}\b", "", s)
-        s = re.sub(r"\b\d{1,2}[\./-]\d{1,2}[\./-]\d{2,4}\b", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"\b(lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|janvier|février|fevrier|mars|avril|mai|juin|juillet|août|aout|septembre|octobre|novembre|décembre|decembre)\b", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"\b(segunda|terca|terça|quarta|quinta|sexta|sábado|sabado|domingo|janeiro|fevereiro|março|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)\b", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"\s{2,}", " ", s).strip()
-        lixo = {"n/a", "na", "nd", "?", "-", "ela", "ines", "ines249"}
-        if s.lower() in lixo or len(s) < 3:
+        s = _RE_SUFIXOS_DATA.sub("", s)
+        s = _RE_ESPACOS_MULTIPLOS.sub(" ", s).strip()
+        if s.lower() in _NOMES_FONTE_LIXO or len(s) < 3:
             return None
         up = s.upper()
         if "GLOBO" in up:
@@ -306,7 +328,6 @@ def list_raw_articles_by_source_date_tipo(db: Session, source: str, target_date,
                 return m_f
         if url:
             try:
-                from urllib.parse import urlparse
                 netloc = urlparse(url).netloc
                 return netloc.lower() if netloc else None
             except Exception:
@@ -318,10 +339,8 @@ def list_raw_articles_by_source_date_tipo(db: Session, source: str, target_date,
         if not nome_raw:
             return None
         s = ' '.join(str(nome_raw).replace('‐', '-').replace('–', '-').split()).strip()
-        import re
-        s = re.sub(r"\b\d{5,}\b", "", s).strip()
-        lixo = {"n/a", "na", "nd", "?", "-", "ela", "ines", "ines249"}
-        if s.lower() in lixo or len(s) < 3:
+        s = _RE_NUMERO_5_DIGITOS.sub("", s).strip()
+        if s.lower() in _NOMES_FONTE_LIXO or len(s) < 3:
             return None
         up = s.upper()
         if "GLOBO" in up:
@@ -370,18 +389,20 @@ def get_textos_brutos_por_cluster_id(db: Session, cluster_id: int) -> List[Dict[
     Busca os textos brutos originais e metadados essenciais de todos os artigos
     associados a um determinado ID de cluster. Não retorna resumos processados.
     """
-    artigos = db.query(ArtigoBruto).filter(ArtigoBruto.cluster_id == cluster_id).all()
-    if not artigos:
-        return []
-    textos_brutos: List[Dict[str, Any]] = []
-    for artigo in artigos:
-        textos_brutos.append({
-            "id": artigo.id,
-            "titulo": (artigo.titulo_extraido or "Sem título"),
-            "fonte": (artigo.jornal or "Fonte desconhecida"),
-            "texto_bruto": (artigo.texto_bruto or artigo.texto_processado or "")
-        })
-    return textos_brutos
+    # Projeta só as colunas usadas (evita carregar embeddings/metadados) e monta os dicts numa única passada
+    rows = db.query(
+        ArtigoBruto.id, ArtigoBruto.titulo_extraido, ArtigoBruto.jornal,
+        ArtigoBruto.texto_bruto, ArtigoBruto.texto_processado
+    ).filter(ArtigoBruto.cluster_id == cluster_id)
+    return [
+        {
+            "id": artigo_id,
+            "titulo": (titulo or "Sem título"),
+            "fonte": (jornal or "Fonte desconhecida"),
+            "texto_bruto": (texto_bruto or texto_processado or "")
+        }
+        for artigo_id, titulo, jornal, texto_bruto, texto_processado in rows
+    ]
 
 
 # ==============================================================================
@@ -390,10 +411,11 @@ def get_textos_brutos_por_cluster_id(db: Session, cluster_id: int) -> List[Dict[
 
 def get_active_clusters_today(db: Session) -> List[ClusterEvento]:
     """Busca clusters ativos criados hoje para clusterização."""
-    hoje = datetime.utcnow().date()
+    inicio, fim = _day_range(datetime.utcnow().date())
     return db.query(ClusterEvento).filter(
         ClusterEvento.status == 'ativo',
-        func.date(ClusterEvento.created_at) == hoje
+        ClusterEvento.created_at >= inicio,
+        ClusterEvento.created_at < fim,
     ).all()
 
 
@@ -412,12 +434,13 @@ def create_cluster(db: Session, cluster_data: ClusterEventoCreate) -> ClusterEve
         return value_str[:max_len]
 
     # Verifica se já existe um cluster com o mesmo título e tag hoje
-    hoje = datetime.utcnow().date()
+    inicio, fim = _day_range(datetime.utcnow().date())
     cluster_existente = db.query(ClusterEvento).filter(
         ClusterEvento.titulo_cluster == _truncate(cluster_data.titulo_cluster, 500),
         ClusterEvento.tag == _truncate(cluster_data.tag, 50),
         ClusterEvento.status == 'ativo',
-        func.date(ClusterEvento.created_at) == hoje
+        ClusterEvento.created_at >= inicio,
+        ClusterEvento.created_at < fim,
     ).first()
     
     if cluster_existente:
@@ -614,21 +637,22 @@ def get_metricas_today(db: Session) -> Dict[str, int]:
     Retorna estatísticas de artigos coletados, eventos únicos, etc.
     """
     hoje = get_date_brasil()
+    inicio, fim = _day_range(hoje)
     
     # Artigos coletados hoje
     artigos_coletados = db.query(ArtigoBruto).filter(
-        func.date(ArtigoBruto.created_at) == hoje
+        ArtigoBruto.created_at >= inicio, ArtigoBruto.created_at < fim
     ).count()
     
     # Clusters ativos hoje
     clusters_ativos = db.query(ClusterEvento).filter(
-        func.date(ClusterEvento.created_at) == hoje,
+        ClusterEvento.created_at >= inicio, ClusterEvento.created_at < fim,
         ClusterEvento.status == 'ativo'
     ).count()
     
     # Fontes diferentes hoje (count distinct)
     fontes_diferentes = db.query(ArtigoBruto.jornal).filter(
-        func.date(ArtigoBruto.created_at) == hoje,
+        ArtigoBruto.created_at >= inicio, ArtigoBruto.created_at < fim,
         ArtigoBruto.jornal.isnot(None)
     ).distinct().count()
     
@@ -643,27 +667,29 @@ def get_metricas_by_date(db: Session, target_date: datetime.date) -> Dict[str, i
     """
     Busca métricas de uma data específica (otimizada com índices).
     """
+    inicio, fim = _day_range(target_date)
+
     # Artigos coletados na data (usando índice)
     artigos_coletados = db.query(ArtigoBruto).filter(
-        func.date(ArtigoBruto.created_at) == target_date
+        ArtigoBruto.created_at >= inicio, ArtigoBruto.created_at < fim
     ).count()
     
     # Clusters criados na data específica (usando índices compostos) - exclui IRRELEVANTE
     clusters_ativos = db.query(ClusterEvento).filter(
-        func.date(ClusterEvento.created_at) == target_date,
+        ClusterEvento.created_at >= inicio, ClusterEvento.created_at < fim,
         ClusterEvento.status == 'ativo',
         ClusterEvento.prioridade != 'IRRELEVANTE'
     ).count()
     
     # Fontes diferentes na data específica (count distinct)
     fontes_diferentes = db.query(ArtigoBruto.jornal).filter(
-        func.date(ArtigoBruto.created_at) == target_date,
+        ArtigoBruto.created_at >= inicio, ArtigoBruto.created_at < fim,
         ArtigoBruto.jornal.isnot(None)
     ).distinct().count()
     
     # Total de clusters exibíveis no front (exclui IRRELEVANTE)
     clusters_exibiveis = db.query(ClusterEvento).filter(
-        func.date(ClusterEvento.created_at) == target_date,
+        ClusterEvento.created_at >= inicio, ClusterEvento.created_at < fim,
         ClusterEvento.status == 'ativo',
         ClusterEvento.prioridade != 'IRRELEVANTE',
         ClusterEvento.tag != 'IRRELEVANTE'
@@ -679,10 +705,6 @@ def get_metricas_by_date(db: Session, target_date: datetime.date) -> Dict[str, i
 
 # ===================== FEEDBACK =====================
 def create_feedback(db: Session, artigo_id: int, feedback: str, metadados: dict = None) -> int:
-    try:
-        from .database import FeedbackNoticia
-    except ImportError:
-        from backend.database import FeedbackNoticia
     novo = FeedbackNoticia(
         artigo_id=artigo_id,
         feedback=feedback,
@@ -696,10 +718,6 @@ def create_feedback(db: Session, artigo_id: int, feedback: str, metadados: dict
 
 
 def list_feedback(db: Session, processed: Optional[bool] = None, limit: int = 100):
-    try:
-        from .database import FeedbackNoticia
-    except ImportError:
-        from backend.database import FeedbackNoticia
     q = db.query(FeedbackNoticia).order_by(FeedbackNoticia.created_at.desc())
     if processed is not None:
         q = q.filter(FeedbackNoticia.processed == processed)
@@ -707,10 +725,6 @@ def list_feedback(db: Session, processed: Optional[bool] = None, limit: int = 10
 
 
 def mark_feedback_processed(db: Session, feedback_id: int) -> bool:
-    try:
-        from .database import FeedbackNoticia
-    except ImportError:
-        from backend.database import FeedbackNoticia
     fb = db.query(FeedbackNoticia).filter(FeedbackNoticia.id == feedback_id).first()
     if not fb:
         return False
@@ -847,7 +861,12 @@ def get_sintese_by_date(db: Session, target_date: datetime.date) -> Optional[Sin
     ).first()
 
 
-def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page: int = 1, page_size: int = 20, load_full_text: bool = False, priority: Optional[str] = None, tipo_fonte: Optional[str] = None) -> Dict[str, Any]:
+def _padrao_ilike(palavra: str) -> str:
+    """'50%' → '%50\\%%': escapa os curingas do LIKE para a palavra casar literalmente como substring."""
+    return "%" + palavra.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page: int = 1, page_size: int = 20, load_full_text: bool = False, priority: Optional[str] = None, tipo_fonte: Optional[str] = None, palavras_chave: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Busca clusters para o feed de uma data específica com paginação e carregamento lazy.
     Retorna lista formatada para o frontend com opção de carregar texto completo sob demanda.
@@ -859,13 +878,15 @@ def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page:
         page_size: Tamanho da página
         load_full_text: Se True, carrega texto completo. Se False, apenas título e resumo
         priority: Filtro opcional por prioridade (P1_CRITICO, P2_ESTRATEGICO, P3_MONITORAMENTO)
+        palavras_chave: Filtro opcional; mantém só clusters cujo título ou resumo contém alguma das palavras (ILIKE)
     """
     # Calcula offset para paginação
     offset = (page - 1) * page_size
     
     # Busca clusters criados na data específica com paginação (exclui IRRELEVANTE)
+    inicio, fim = _day_range(target_date)
     clusters_query = db.query(ClusterEvento).filter(
-        func.date(ClusterEvento.created_at) == target_date,
+        ClusterEvento.created_at >= inicio, ClusterEvento.created_at < fim,
         ClusterEvento.status == 'ativo',
         ClusterEvento.prioridade != 'IRRELEVANTE',
         ClusterEvento.tag != 'IRRELEVANTE'
@@ -891,6 +912,16 @@ def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page:
             clusters_query = clusters_query.filter(ClusterEvento.tipo_fonte == 'brasil_fisico')
         elif tipo_fonte == 'brasil_online':
             clusters_query = clusters_query.filter(ClusterEvento.tipo_fonte == 'brasil_online')
+
+    # Filtro por palavras-chave no banco: só os clusters que casam atravessam a rede
+    if palavras_chave:
+        padroes = [_padrao_ilike(k) for k in palavras_chave if k]
+        if padroes:
+            clusters_query = clusters_query.filter(or_(*(
+                coluna.ilike(padrao, escape='\\')
+                for padrao in padroes
+                for coluna in (ClusterEvento.titulo_cluster, ClusterEvento.resumo_cluster)
+            )))
     
     # Ordena por prioridade (P1 primeiro) e depois por data
     clusters_query = clusters_query.order_by(
@@ -905,12 +936,55 @@ def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page:
     clusters = clusters_query.offset(offset).limit(page_size).all()
     
     resultado = []
+
+    # Busca os artigos de todos os clusters da página numa única query (evita N+1)
+    artigos_por_cluster: Dict[int, List[ArtigoBruto]] = {c.id: [] for c in clusters}
+    if artigos_por_cluster:
+        for artigo in db.query(ArtigoBruto).filter(
+            ArtigoBruto.cluster_id.in_(list(artigos_por_cluster))
+        ).all():
+            artigos_por_cluster[artigo.cluster_id].append(artigo)
+
+    # Feedback agregado (likes/dislikes e último) da página inteira em duas queries (antes: 2 por cluster)
+    feedback_por_cluster: Dict[int, Dict[str, Any]] = {
+        cid: {"likes": 0, "dislikes": 0, "last": None} for cid in artigos_por_cluster
+    }
+    if feedback_por_cluster:
+        ids_pagina = list(feedback_por_cluster)
+        try:
+            # Likes e dislikes por cluster via COUNT(...) FILTER (WHERE ...) + GROUP BY
+            for cluster_id, likes, dislikes in db.query(
+                ArtigoBruto.cluster_id,
+                func.count(FeedbackNoticia.id).filter(FeedbackNoticia.feedback == 'like'),
+                func.count(FeedbackNoticia.id).filter(FeedbackNoticia.feedback == 'dislike'),
+            ).select_from(FeedbackNoticia).join(
+                ArtigoBruto, FeedbackNoticia.artigo_id == ArtigoBruto.id
+            ).filter(
+                ArtigoBruto.cluster_id.in_(ids_pagina),
+                FeedbackNoticia.feedback.in_(('like', 'dislike'))
+            ).group_by(ArtigoBruto.cluster_id):
+                info = feedback_por_cluster[cluster_id]
+                info["likes"] = int(likes or 0)
+                info["dislikes"] = int(dislikes or 0)
+
+            # Mais recente primeiro: o primeiro visto de cada cluster é o último feedback
+            for cluster_id, feedback in db.query(
+                ArtigoBruto.cluster_id, FeedbackNoticia.feedback
+            ).select_from(FeedbackNoticia).join(
+                ArtigoBruto, FeedbackNoticia.artigo_id == ArtigoBruto.id
+            ).filter(
+                ArtigoBruto.cluster_id.in_(ids_pagina)
+            ).order_by(FeedbackNoticia.created_at.desc()):
+                info = feedback_por_cluster[cluster_id]
+                if info["last"] is None:
+                    info["last"] = feedback
+        except Exception:
+            feedback_por_cluster = {
+                cid: {"likes": 0, "dislikes": 0, "last": None} for cid in artigos_por_cluster
+            }
     
     for cluster in clusters:
-        # Busca todos os artigos do cluster
-        artigos = db.query(ArtigoBruto).filter(
-            ArtigoBruto.cluster_id == cluster.id
-        ).all()
+        artigos = artigos_por_cluster[cluster.id]
         
         # Formata fontes para o frontend (sempre carrega)
         fontes = []
@@ -931,40 +1005,7 @@ def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page:
         # Formata tags
         tags = [cluster.tag] if cluster.tag else []
         
-        # Calcula feedback agregado do cluster (likes/dislikes e último feedback)
-        try:
-            try:
-                from .database import FeedbackNoticia as _Feedback
-            except ImportError:
-                from backend.database import FeedbackNoticia as _Feedback
-
-            likes = db.query(func.count(_Feedback.id)).join(
-                ArtigoBruto, _Feedback.artigo_id == ArtigoBruto.id
-            ).filter(
-                ArtigoBruto.cluster_id == cluster.id,
-                _Feedback.feedback == 'like'
-            ).scalar() or 0
-
-            dislikes = db.query(func.count(_Feedback.id)).join(
-                ArtigoBruto, _Feedback.artigo_id == ArtigoBruto.id
-            ).filter(
-                ArtigoBruto.cluster_id == cluster.id,
-                _Feedback.feedback == 'dislike'
-            ).scalar() or 0
-
-            ultimo = db.query(_Feedback).join(
-                ArtigoBruto, _Feedback.artigo_id == ArtigoBruto.id
-            ).filter(
-                ArtigoBruto.cluster_id == cluster.id
-            ).order_by(_Feedback.created_at.desc()).first()
-
-            feedback_info = {
-                "likes": int(likes),
-                "dislikes": int(dislikes),
-                "last": (ultimo.feedback if ultimo else None)
-            }
-        except Exception:
-            feedback_info = {"likes": 0, "dislikes": 0, "last": None}
+        feedback_info = feedback_por_cluster[cluster.id]
 
         # Cria item do feed
         item = {
@@ -1010,6 +1051,86 @@ def get_clusters_for_feed_by_date(db: Session, target_date: datetime.date, page:
     }
 
 
+def get_cluster_titles_by_date(db: Session, target_date: datetime.date, max_fontes: int = 3, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Listagem leve dos clusters exibíveis de uma data (id, título, prioridade, tags, fontes).
+    Projeta só as colunas necessárias, sem paginação, feedback ou texto — usada pelo Estagiário.
+    limite: teto opcional aplicado no SQL (após ordenar por prioridade e recência).
+    """
+    inicio, fim = _day_range(target_date)
+    query = db.query(
+        ClusterEvento.id, ClusterEvento.titulo_cluster, ClusterEvento.prioridade, ClusterEvento.tag
+    ).filter(
+        ClusterEvento.created_at >= inicio, ClusterEvento.created_at < fim,
+        ClusterEvento.status == 'ativo',
+        ClusterEvento.prioridade != 'IRRELEVANTE',
+        ClusterEvento.tag != 'IRRELEVANTE'
+    ).order_by(
+        text("CASE WHEN prioridade = 'P1_CRITICO' THEN 1 WHEN prioridade = 'P2_ESTRATEGICO' THEN 2 ELSE 3 END"),
+        ClusterEvento.created_at.desc()
+    )
+    if limite:
+        query = query.limit(limite)
+    rows = query.all()
+
+    fontes_por_cluster: Dict[int, List[str]] = {r.id: [] for r in rows}
+    if fontes_por_cluster:
+        for cluster_id, jornal in db.query(ArtigoBruto.cluster_id, ArtigoBruto.jornal).filter(
+            ArtigoBruto.cluster_id.in_(list(fontes_por_cluster))
+        ).order_by(ArtigoBruto.id):
+            fontes = fontes_por_cluster[cluster_id]
+            if len(fontes) < max_fontes:
+                fontes.append(jornal or "")
+
+    return [
+        {
+            "id": r.id,
+            "titulo": r.titulo_cluster or "",
+            "prioridade": r.prioridade or "",
+            "tags": [r.tag] if r.tag else [],
+            "fontes": fontes_por_cluster[r.id],
+        }
+        for r in rows
+    ]
+
+
+def get_cluster_embeddings_by_date(db: Session, target_date: datetime.date) -> List[tuple]:
+    """
+    (cluster_id, embedding_v2) dos artigos dos clusters exibíveis de uma data (mesmos filtros
+    de get_cluster_titles_by_date). Só as duas colunas: usada na triagem semântica do Estagiário.
+    """
+    inicio, fim = _day_range(target_date)
+    return db.query(ArtigoBruto.cluster_id, ArtigoBruto.embedding_v2).join(
+        ClusterEvento, ClusterEvento.id == ArtigoBruto.cluster_id
+    ).filter(
+        ClusterEvento.created_at >= inicio, ClusterEvento.created_at < fim,
+        ClusterEvento.status == 'ativo',
+        ClusterEvento.prioridade != 'IRRELEVANTE',
+        ClusterEvento.tag != 'IRRELEVANTE',
+        ArtigoBruto.embedding_v2.isnot(None),
+    ).all()
+
+
+def get_cluster_summaries_by_ids(db: Session, cluster_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Título, resumo, prioridade e tags de clusters específicos (sem artigos nem feedback)."""
+    if not cluster_ids:
+        return {}
+    rows = db.query(
+        ClusterEvento.id, ClusterEvento.titulo_cluster, ClusterEvento.resumo_cluster,
+        ClusterEvento.prioridade, ClusterEvento.tag,
+    ).filter(ClusterEvento.id.in_(cluster_ids)).all()
+    return {
+        r.id: {
+            "id": r.id,
+            "titulo_final": r.titulo_cluster or "",
+            "resumo_final": r.resumo_cluster or "",
+            "prioridade": r.prioridade or "",
+            "tags": [r.tag] if r.tag else [],
+        }
+        for r in rows
+    }
+
+
 # ===================== CRUD Estagiário =====================
 def create_estagiario_session(db: Session, data_referencia: datetime.date) -> int:
     s = EstagiarioChatSession(data_referencia=datetime.combine(data_referencia, datetime.min.time()))
@@ -1028,11 +1149,17 @@ def add_estagiario_message(db: Session, session_id: int, role: str, content: str
 
 
 def list_estagiario_messages(db: Session, session_id: int, limit: int = 100) -> List[Dict[str, Any]]:
-    q = db.query(EstagiarioChatMessage).filter(EstagiarioChatMessage.session_id == session_id).order_by(EstagiarioChatMessage.timestamp.asc())
-    return [
-        {"id": msg.id, "role": msg.role, "content": msg.content, "timestamp": msg.timestamp.isoformat()}
-        for msg in q.limit(limit).all()
-    ]
+    # Colunas projetadas + .mappings(): linhas dict-like, sem hidratar entidades ORM
+    rows = db.execute(
+        select(
+            EstagiarioChatMessage.id, EstagiarioChatMessage.role,
+            EstagiarioChatMessage.content, EstagiarioChatMessage.timestamp,
+        )
+        .where(EstagiarioChatMessage.session_id == session_id)
+        .order_by(EstagiarioChatMessage.timestamp.asc())
+        .limit(limit)
+    ).mappings()
+    return [{**row, "timestamp": row["timestamp"].isoformat()} for row in rows]
 
 
 def get_cluster_details_by_id(db: Session, cluster_id: int) -> Optional[Dict[str, Any]]:
@@ -1469,34 +1596,27 @@ def get_cluster_counts_by_date_and_tipo_fonte(db: Session, target_date: datetime
     Retorna a contagem de clusters exibíveis (status ativo, não irrelevantes) por tipo_fonte
     para uma data específica.
     """
+    inicio, fim = _day_range(target_date)
     filtros_base = [
-        func.date(ClusterEvento.created_at) == target_date,
+        ClusterEvento.created_at >= inicio,
+        ClusterEvento.created_at < fim,
         ClusterEvento.status == 'ativo',
         ClusterEvento.prioridade != 'IRRELEVANTE',
         ClusterEvento.tag != 'IRRELEVANTE',
     ]
 
-    # Novas categorias
-    brasil_fisico = db.query(func.count(ClusterEvento.id)).filter(
-        *filtros_base,
-        ClusterEvento.tipo_fonte == 'brasil_fisico'
-    ).scalar() or 0
-
-    brasil_online = db.query(func.count(ClusterEvento.id)).filter(
+    # Uma única ida ao banco: contagem agrupada por tipo_fonte (antes, um COUNT por categoria)
+    rows = db.query(ClusterEvento.tipo_fonte, func.count(ClusterEvento.id)).filter(
         *filtros_base,
-        ClusterEvento.tipo_fonte == 'brasil_online'
-    ).scalar() or 0
+        ClusterEvento.tipo_fonte.in_(('brasil_fisico', 'brasil_online', 'nacional', 'internacional')),
+    ).group_by(ClusterEvento.tipo_fonte).all()
+    por_tipo = {tipo: total for tipo, total in rows}
 
+    brasil_fisico = por_tipo.get('brasil_fisico', 0)
+    brasil_online = por_tipo.get('brasil_online', 0)
     # Legado 'nacional' (itens antigos)
-    nacional_legado = db.query(func.count(ClusterEvento.id)).filter(
-        *filtros_base,
-        ClusterEvento.tipo_fonte == 'nacional'
-    ).scalar() or 0
-
-    internacional = db.query(func.count(ClusterEvento.id)).filter(
-        *filtros_base,
-        ClusterEvento.tipo_fonte == 'internacional'
-    ).scalar() or 0
+    nacional_legado = por_tipo.get('nacional', 0)
+    internacional = por_tipo.get('internacional', 0)
 
     # Aba antiga 'nacional' (compat) = físico + online atuais + legado
     nacional_total = (brasil_fisico + brasil_online + nacional_legado)
@@ -1548,6 +1668,7 @@ def create_prompt_tag(db: Session, nome: str, descricao: str, exemplos: Optional
     row = PromptTag(nome=nome, descricao=descricao, exemplos=exemplos or [], ordem=ordem, tipo_fonte=tipo_fonte)
     db.add(row)
     db.commit()
+    invalidar_cache_prompts_compilados()
     db.refresh(row)
     return row.id
 
@@ -1560,6 +1681,7 @@ def update_prompt_tag(db: Session, tag_id: int, **kwargs) -> bool:
         if hasattr(row, k) and v is not None:
             setattr(row, k, v)
     db.commit()
+    invalidar_cache_prompts_compilados()
     return True
 
 
@@ -1569,6 +1691,7 @@ def delete_prompt_tag(db: Session, tag_id: int) -> bool:
         return False
     db.delete(row)
     db.commit()
+    invalidar_cache_prompts_compilados()
     return True
 
 
@@ -1598,6 +1721,7 @@ def create_prompt_prioridade_item(db: Session, nivel: str, texto: str, ordem: in
     row = PromptPrioridadeItem(nivel=nivel_up, texto=texto, ordem=ordem, tipo_fonte=tipo_fonte)
     db.add(row)
     db.commit()
+    invalidar_cache_prompts_compilados()
     db.refresh(row)
     return row.id
 
@@ -1614,6 +1738,7 @@ def update_prompt_prioridade_item(db: Session, item_id: int, **kwargs) -> bool:
     if row.nivel not in ("P1", "P2", "P3"):
         row.nivel = "P3"
     db.commit()
+    invalidar_cache_prompts_compilados()
     return True
 
 
@@ -1623,6 +1748,7 @@ def delete_prompt_prioridade_item(db: Session, item_id: int) -> bool:
         return False
     db.delete(row)
     db.commit()
+    invalidar_cache_prompts_compilados()
     return True
 
 
@@ -1667,12 +1793,27 @@ def delete_prompt_template(db: Session, template_id: int) -> bool:
     return True
 
 
+# Cache do catálogo compilado (tags + prioridades): muda raramente, invalidado nas escritas
+_PROMPTS_COMPILADOS_CACHE: Dict[str, Any] = {}
+_PROMPTS_COMPILADOS_CACHE_TTL = 300  # 5 minutos
+
+
+def invalidar_cache_prompts_compilados() -> None:
+    _PROMPTS_COMPILADOS_CACHE.clear()
+
+
 def get_prompts_compilados(db: Session) -> Dict[str, Any]:
     """
     Retorna as estruturas exatamente no formato esperado por backend/prompts.py:
     - TAGS_SPECIAL_SITUATIONS: dict { tag: { descricao: str, exemplos: [str,...] } }
     - P1_ITENS, P2_ITENS, P3_ITENS: listas de strings (ordenadas)
+    Resultado em cache por 5 min; create/update/delete de tags e prioridades invalidam.
     """
+    now = time.time()
+    cached = _PROMPTS_COMPILADOS_CACHE.get("valor")
+    if cached is not None and (now - _PROMPTS_COMPILADOS_CACHE["ts"]) < _PROMPTS_COMPILADOS_CACHE_TTL:
+        return cached
+
     tags_rows = db.query(PromptTag).order_by(PromptTag.ordem.asc(), PromptTag.nome.asc()).all()
     tags_dict: Dict[str, Dict[str, Any]] = {}
     for r in tags_rows:
@@ -1695,12 +1836,14 @@ def get_prompts_compilados(db: Session) -> Dict[str, Any]:
         elif n in ('P3', 'P3_MONITORAMENTO', 'P3-MONITORAMENTO'):
             p3.append(r.texto)
 
-    return {
+    compilados = {
         'tags': tags_dict,
         'p1': p1,
         'p2': p2,
         'p3': p3,
     }
+    _PROMPTS_COMPILADOS_CACHE.update({"valor": compilados, "ts": now})
+    return compilados
 
 
 # ==============================================================================
@@ -1726,11 +1869,12 @@ def get_clusters_existentes_hoje(db: Session) -> List[ClusterEvento]:
     """
     Busca todos os clusters existentes criados hoje.
     """
-    hoje = datetime.utcnow().date()
+    inicio, fim = _day_range(datetime.utcnow().date())
     
     return db.query(ClusterEvento).filter(
         and_(
-            func.date(ClusterEvento.created_at) == hoje,
+            ClusterEvento.created_at >= inicio,
+            ClusterEvento.created_at < fim,
             ClusterEvento.status == 'ativo'
         )
     ).order_by(ClusterEvento.created_at.asc()).all()
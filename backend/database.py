@@ -162,6 +162,9 @@ class ClusterEvento(Base):
         Index('idx_clusters_tag_date', 'tag', 'created_at'),  # Índice composto para queries por tag e data
         Index('idx_clusters_prioridade_date', 'prioridade', 'created_at'),  # Índice composto para queries por prioridade e data
         Index('idx_clusters_notificado', 'ja_notificado', 'created_at'),  # Clusters pendentes de notificacao
+        # Índice parcial: apenas clusters exibíveis no feed (ativo e não IRRELEVANTE)
+        Index('idx_clusters_feed_visiveis', 'created_at',
+              postgresql_where=text("status = 'ativo' AND prioridade <> 'IRRELEVANTE' AND tag <> 'IRRELEVANTE'")),
     )
 
 
@@ -313,6 +316,8 @@ class FeedbackNoticia(Base):
         Index('idx_feedback_artigo_id', 'artigo_id'),
         Index('idx_feedback_processed', 'processed'),
         Index('idx_feedback_created_date', 'created_at'),
+        Index('idx_feedback_tipo_artigo', 'feedback', 'artigo_id'),  # Contagens like/dislike por artigo
+        Index('idx_feedback_tipo_created_artigo', 'feedback', text('created_at DESC'), 'artigo_id'),  # Covering: listagens por tipo já ordenadas
     )
 
 
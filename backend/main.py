@@ -48,6 +48,27 @@ if env_file.exists():
 else:
     print(f"⚠️ Arquivo .env não encontrado: {env_file}")
 
+
+def _configurar_logger_estagiario() -> None:
+    """Nível do logger "estagiario" (ESTAGIARIO_LOG_LEVEL) e handler de stdout se o root não tiver um."""
+    import logging
+    import sys
+
+    logger_estagiario = logging.getLogger("estagiario")
+    nivel = os.getenv("ESTAGIARIO_LOG_LEVEL", "INFO").strip().upper()
+    if not isinstance(logging.getLevelName(nivel), int):
+        print(f"⚠️ ESTAGIARIO_LOG_LEVEL inválido ({nivel!r}), usando INFO")
+        nivel = "INFO"
+    logger_estagiario.setLevel(nivel)
+    # Se a aplicação já configurou o root (logging.basicConfig/dictConfig), propaga para ele
+    if not logging.getLogger().handlers and not logger_estagiario.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("[Estagiario] %(message)s"))
+        logger_estagiario.addHandler(handler)
+
+
+_configurar_logger_estagiario()
+
 try:
     from .database import get_db, init_database, ArtigoBruto, ClusterEvento, SinteseExecutiva, SessionLocal
     from .models import (ProcessarArtigoRequest, StatusResponse, ArtigoBrutoCreate, ChatRequest, ChatResponse,
@@ -604,7 +625,7 @@ async def api_get_resumo_hoje(data: Optional[str] = None,
     """
     if data:
         try:
-            target = datetime.strptime(data, "%Y-%m-%d").date()
+            target = date.fromisoformat(data)
         except ValueError:
             target = get_date_brasil()
     else:
@@ -619,15 +640,16 @@ async def api_get_resumo_hoje(data: Optional[str] = None,
             resumo = get_resumo_default(db, target)
         except Exception:
             db.rollback()
+    target_iso = target.isoformat()
     if resumo:
         return {
-            "id": resumo.id, "data": resumo.data_referencia.isoformat() if resumo.data_referencia else target.isoformat(),
+            "id": resumo.id, "data": resumo.data_referencia.isoformat() if resumo.data_referencia else target_iso,
             "texto_gerado": resumo.texto_gerado, "texto_whatsapp": resumo.texto_whatsapp,
             "clusters_escolhidos_ids": resumo.clusters_escolhidos_ids or [],
             "prompt_version": resumo.prompt_version, "metadados": resumo.metadados or {},
             "created_at": resumo.created_at.isoformat() if resumo.created_at else None,
         }
-    return {"data": target.isoformat(), "texto_gerado": None, "message": f"Nenhum resumo gerado para {target.isoformat()}."}
+    return {"data": target_iso, "texto_gerado": None, "message": f"Nenhum resumo gerado para {target_iso}."}
 
 
 class GerarResumoPayload(BaseModel):
@@ -646,7 +668,7 @@ async def api_gerar_resumo(payload: GerarResumoPayload = GerarResumoPayload(),
     """
     if payload.data:
         try:
-            target = datetime.strptime(payload.data, "%Y-%m-%d").date()
+            target = date.fromisoformat(payload.data)
         except ValueError:
             target = get_date_brasil()
     else:
@@ -654,14 +676,15 @@ async def api_gerar_resumo(payload: GerarResumoPayload = GerarResumoPayload(),
 
     from backend.crud import get_preferencias_usuario, user_has_custom_prefs
     prefs = get_preferencias_usuario(db, current_user["id"])
+    target_iso = target.isoformat()
     if user_has_custom_prefs(prefs):
         background_tasks.add_task(_generate_user_summary, current_user["id"], target)
-        return {"status": "processing", "data": target.isoformat(),
-                "message": f"Resumo personalizado sendo gerado para {target.isoformat()}."}
+        return {"status": "processing", "data": target_iso,
+                "message": f"Resumo personalizado sendo gerado para {target_iso}."}
     else:
         background_tasks.add_task(_generate_default_summary, target)
-        return {"status": "processing", "data": target.isoformat(),
-                "message": f"Resumo default sendo gerado para {target.isoformat()}."}
+        return {"status": "processing", "data": target_iso,
+                "message": f"Resumo default sendo gerado para {target_iso}."}
 
 
 def _generate_user_summary(user_id: int, target_date):
@@ -931,7 +954,7 @@ async def get_feed(
         target_date = None
         if data:
             try:
-                target_date = datetime.strptime(data, "%Y-%m-%d").date()
+                target_date = date.fromisoformat(data)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD")
         else:
@@ -1002,7 +1025,7 @@ async def api_list_sourcers(
     try:
         if data:
             try:
-                target_date = datetime.strptime(data, "%Y-%m-%d").date()
+                target_date = date.fromisoformat(data)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD")
         else:
@@ -1040,7 +1063,7 @@ async def api_list_raw_by_source(
 
         if data:
             try:
-                target_date = datetime.strptime(data, "%Y-%m-%d").date()
+                target_date = date.fromisoformat(data)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD")
         else:
@@ -2447,7 +2470,7 @@ async def agrupar_noticias_incremental(db: Session) -> bool:
             get_artigos_by_cluster, associate_artigo_to_existing_cluster,
             create_cluster_for_artigo, create_log
         )
-        from backend.utils import get_gemini_model
+        from backend.utils import get_gemini_model, titulo_e_generico
         import json
         
         # Busca artigos processados hoje que não foram associados a clusters
@@ -2494,18 +2517,27 @@ async def agrupar_noticias_incremental(db: Session) -> bool:
         
                 # Prepara dados para o prompt (apenas títulos e IDs)
         print(f"🔍 DEBUG: Preparando dados para o prompt LLM...")
-        
-        novas_noticias = []
-        for artigo in artigos_novos:
-            noticia_data = {
-                "id": artigo.id,  # ID real do banco
-                "titulo": artigo.titulo_extraido or "Sem título"
-            }
-            novas_noticias.append(noticia_data)
+
+        def _chave_titulo(titulo: Optional[str]) -> Optional[str]:
+            if titulo_e_generico(titulo):
+                return None
+            return " ".join(titulo.lower().split())
+
+        # (tipo_fonte, título normalizado) -> cluster_id; None quando aparece em mais de um cluster (ambíguo).
+        # Nacional e Internacional NUNCA se misturam: o tipo_fonte faz parte da chave e só entram
+        # clusters cujos artigos são todos do mesmo tipo_fonte do cluster.
+        indice_titulos: Dict[tuple, Optional[int]] = {}
 
         clusters_existentes_data = []
         for cluster in clusters_existentes:
             artigos_cluster = get_artigos_by_cluster(db, cluster.id)
+            tipo_cluster = cluster.tipo_fonte or 'nacional'
+            if all((a.tipo_fonte or 'nacional') == tipo_cluster for a in artigos_cluster):
+                for titulo_interno in [cluster.titulo_cluster] + [a.titulo_extraido for a in artigos_cluster]:
+                    chave = _chave_titulo(titulo_interno)
+                    if chave:
+                        chave = (tipo_cluster, chave)
+                        indice_titulos[chave] = cluster.id if indice_titulos.get(chave, cluster.id) == cluster.id else None
             titulos = [
                 a.titulo_extraido or (a.texto_processado[:80] + "...") if (a.texto_processado or "") else "Sem título"
                 for a in artigos_cluster
@@ -2518,12 +2550,35 @@ async def agrupar_noticias_incremental(db: Session) -> bool:
                 "titulos_internos": titulos
             }
             clusters_existentes_data.append(cluster_data)
+
+        # Atalho determinístico: título idêntico a um único cluster existente do mesmo
+        # tipo_fonte é anexado direto, sem passar pelo LLM. Só o restante vai para o prompt.
+        anexacoes = 0
+        novas_noticias = []
+        for artigo in artigos_novos:
+            chave = _chave_titulo(artigo.titulo_extraido)
+            cluster_id_direto = indice_titulos.get((artigo.tipo_fonte or 'nacional', chave)) if chave else None
+            if cluster_id_direto and associate_artigo_to_existing_cluster(db, artigo.id, cluster_id_direto):
+                anexacoes += 1
+                create_log(db, "INFO", "incremental_clustering",
+                         f"Artigo {artigo.id} anexado ao cluster {cluster_id_direto} (título idêntico, sem LLM)")
+                continue
+            novas_noticias.append({
+                "id": artigo.id,  # ID real do banco
+                "titulo": artigo.titulo_extraido or "Sem título"
+            })
+
+        if not novas_noticias:
+            create_log(db, "INFO", "incremental_clustering",
+                      f"Agrupamento incremental concluído sem LLM: {anexacoes} anexações por título idêntico")
+            return True
         
         print(f"🔍 DEBUG: {len(novas_noticias)} notícias preparadas para o prompt")
         print(f"🔍 DEBUG: {len(clusters_existentes_data)} clusters preparados para o prompt")
         
         # Mapeamento de ID para artigo original
         mapa_id_para_artigo = {artigo.id: artigo for artigo in artigos_novos}
+        mapa_id_para_cluster = {cluster.id: cluster for cluster in clusters_existentes}
         
         # Monta o prompt completo
         print(f"🔍 DEBUG: Montando prompt completo para o LLM...")
@@ -2578,7 +2633,6 @@ async def agrupar_noticias_incremental(db: Session) -> bool:
             return False
         
         # Processa cada classificação
-        anexacoes = 0
         novos_clusters = 0
         
         for classificacao in classificacoes:
@@ -2595,7 +2649,7 @@ async def agrupar_noticias_incremental(db: Session) -> bool:
                     cluster_id_existente = classificacao.get("cluster_id_existente")
                     
                     # Verifica se o cluster existe
-                    cluster_existente = next((c for c in clusters_existentes if c.id == cluster_id_existente), None)
+                    cluster_existente = mapa_id_para_cluster.get(cluster_id_existente)
                     if cluster_existente:
                         if associate_artigo_to_existing_cluster(db, artigo.id, cluster_existente.id):
                             anexacoes += 1
@@ -3598,21 +3652,22 @@ async def send_chat_message(
             fontes_originais.append(fonte)
         
         # Formata fontes para o prompt
-        fontes_texto = ""
-        for i, fonte in enumerate(fontes_originais, 1):
-            fontes_texto += f"{i}. **{fonte['jornal']}**: {fonte['titulo']}\n"
-            fontes_texto += f"   {fonte['texto'][:300]}...\n\n"
+        fontes_texto = "".join(
+            f"{i}. **{fonte['jornal']}**: {fonte['titulo']}\n   {fonte['texto'][:300]}...\n\n"
+            for i, fonte in enumerate(fontes_originais, 1)
+        )
         
         # Obtém histórico de mensagens para contexto
         mensagens_anteriores = get_chat_messages_by_session(db, session.id)
         historico_conversa = ""
         
         if mensagens_anteriores:
-            historico_conversa = "**CONVERSA ANTERIOR:**\n"
+            partes_historico = ["**CONVERSA ANTERIOR:**\n"]
             for msg in mensagens_anteriores:
                 role = "Usuário" if msg.role == 'user' else "Assistente"
-                historico_conversa += f"{role}: {msg.content}\n"
-            historico_conversa += "\n"
+                partes_historico.append(f"{role}: {msg.content}\n")
+            partes_historico.append("\n")
+            historico_conversa = "".join(partes_historico)
         
         # Busca contexto do grafo + vetorial para enriquecer o chat
         contexto_relacionado = ""
@@ -4276,6 +4331,10 @@ async def api_get_doc(filename: str):
     return {"filename": filename, "content": doc_path.read_text(encoding="utf-8")}
 
 
+# Dump do histórico/resposta por requisição só quando explicitamente habilitado (lido uma vez)
+_ESTAGIARIO_DEBUG = os.getenv("ESTAGIARIO_DEBUG", "0") == "1"
+
+
 class EstagiarioStartRequest(BaseModel):
     data: str | None = None  # YYYY-MM-DD
 
@@ -4288,7 +4347,7 @@ async def estagiario_start(req: EstagiarioStartRequest, db: Session = Depends(ge
     try:
         if req.data:
             try:
-                target_date = datetime.strptime(req.data, "%Y-%m-%d").date()
+                target_date = date.fromisoformat(req.data)
             except ValueError:
                 target_date = get_date_brasil()
         else:
@@ -4306,17 +4365,20 @@ async def estagiario_send(req: EstagiarioSendRequest, db: Session = Depends(get_
         
         # busca histórico da conversa para manter contexto
         chat_history = list_estagiario_messages(db, req.session_id, limit=50)
-        print(f"[DEBUG] Histórico carregado: {len(chat_history)} mensagens")
-        for i, msg in enumerate(chat_history):
-            print(f"[DEBUG] Msg {i}: role={msg.get('role')}, content={msg.get('content', '')[:100]}...")
+        if _ESTAGIARIO_DEBUG:
+            print(f"[DEBUG] Histórico carregado: {len(chat_history)} mensagens")
+            print("\n".join(
+                f"[DEBUG] Msg {i}: role={msg.get('role')}, content={(msg.get('content') or '')[:100]}..."
+                for i, msg in enumerate(chat_history)
+            ))
         
         # chama agente com histórico
         try:
             from agents.estagiario.agent import EstagiarioAgent
             agent = EstagiarioAgent()
-            print(f"[DEBUG] Agente criado, chamando answer_with_context...")
             answer = agent.answer_with_context(req.message, chat_history)
-            print(f"[DEBUG] Resposta obtida: {len(answer.text)} caracteres")
+            if _ESTAGIARIO_DEBUG:
+                print(f"[DEBUG] Resposta obtida: {len(answer.text)} caracteres")
         except ImportError as e:
             print(f"Erro ao importar EstagiarioAgent: {e}")
             # Fallback para import absoluto
@@ -24,6 +24,17 @@ from typing import Literal
 TagType = Literal[tuple(TAGS_VALIDAS)]  # type: ignore
 PrioridadeType = Literal['P1_CRITICO', 'P2_ESTRATEGICO', 'P3_MONITORAMENTO', 'IRRELEVANTE', 'PENDING']
 
+# Apelidos de jornal (minúsculos) → nome canônico; um lower() + um lookup por notícia
+_JORNAL_CANONICO = {
+    'folha': 'Folha de S.Paulo',
+    'folha de s.paulo': 'Folha de S.Paulo',
+    'folhasp': 'Folha de S.Paulo',
+    'valor': 'Valor Econômico',
+    'valor economico': 'Valor Econômico',
+    'estadao': 'O Estado de S.Paulo',
+    'o estado de s.paulo': 'O Estado de S.Paulo',
+}
+
 class Noticia(BaseModel):
     """Modelo de validação para notícias extraídas dos PDFs."""
     titulo: str = Field(..., min_length=1, description="Título da notícia")
@@ -47,12 +58,9 @@ class Noticia(BaseModel):
         """Adiciona valores padrão para campos ausentes após a validação inicial."""
         # Normaliza o campo jornal
         if hasattr(self, 'jornal') and self.jornal:
-            if self.jornal.lower() in ['folha', 'folha de s.paulo', 'folhasp']:
-                self.jornal = 'Folha de S.Paulo'
-            elif self.jornal.lower() in ['valor', 'valor economico']:
-                self.jornal = 'Valor Econômico'
-            elif self.jornal.lower() in ['estadao', 'o estado de s.paulo']:
-                self.jornal = 'O Estado de S.Paulo'
+            canonico = _JORNAL_CANONICO.get(self.jornal.lower())
+            if canonico:
+                self.jornal = canonico
         
         # Aplica migração baseada na prioridade (igual ao silva.py)
         if self.relevance_score is None or self.relevance_reason is None:
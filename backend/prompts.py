@@ -269,13 +269,17 @@ EMPRESAS_PRIORITARIAS = [
 
 # Guia apenas de tags para injeção em prompts que não precisam repetir a parte de prioridade
 def gerar_guia_tags_formatado():
-    guia_tags = "--- GUIA DE TAGS TEMÁTICAS (QUAL A NATUREZA DA OPORTUNIDADE?) ---\n"
-    guia_tags += "Após definir a prioridade, classifique a notícia em UMA das 9 tags temáticas abaixo. A `tag` deve refletir o núcleo da tese de investimento.\n\n"
-    for i, (tag, data) in enumerate(TAGS_SPECIAL_SITUATIONS.items(), 1):
-        guia_tags += f"**{i}. TAG: '{tag}'**\n"
-        guia_tags += f"- **Definição:** {data['descricao']}\n"
-        guia_tags += f"- **O que classificar aqui (Exemplos):** {'; '.join(data['exemplos'])}\n\n"
-    return guia_tags
+    cabecalho = (
+        "--- GUIA DE TAGS TEMÁTICAS (QUAL A NATUREZA DA OPORTUNIDADE?) ---\n"
+        "Após definir a prioridade, classifique a notícia em UMA das 9 tags temáticas abaixo. A `tag` deve refletir o núcleo da tese de investimento.\n\n"
+    )
+    # Um único join no fim em vez de += por linha (catálogo vindo do banco pode ter centenas de exemplos)
+    return cabecalho + "".join(
+        f"**{i}. TAG: '{tag}'**\n"
+        f"- **Definição:** {data['descricao']}\n"
+        f"- **O que classificar aqui (Exemplos):** {'; '.join(data['exemplos'])}\n\n"
+        for i, (tag, data) in enumerate(TAGS_SPECIAL_SITUATIONS.items(), 1)
+    )
 
 
 # Tenta sobrescrever TAGS a partir do banco (se disponível) ANTES de gerar o guia
@@ -352,7 +356,7 @@ P3_ITENS = [
 ]
 
 def _render_bullets(itens):
-    return "\n".join([f"- {t}" for t in itens])
+    return "\n".join(f"- {t}" for t in itens)
 
 # Tenta sobrescrever listas P1/P2/P3 a partir do banco (se disponível) ANTES de gerar bullets
 try:
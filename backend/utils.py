@@ -7,11 +7,138 @@ import re
 import os
 import json
 import hashlib
+import logging
 import unicodedata
+from collections import namedtuple
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 import PyPDF2
 from datetime import datetime, timezone, timedelta
 
+try:
+    import ahocorasick  # type: ignore
+except Exception:
+    ahocorasick = None  # type: ignore
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def _compilar_matcher_ordenado(chaves):
+    """
+    Compila as chaves uma vez e retorna f(texto) -> índice da primeira chave (na ordem dada)
+    contida em texto, ou -1. Aho-Corasick quando disponível; senão, varredura linear.
+    """
+    chaves = tuple(chaves)
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for i, k in enumerate(chaves):
+            automaton.add_word(k, i)
+        automaton.make_automaton()
+
+        def _match(texto: str) -> int:
+            return min((i for _, i in automaton.iter(texto)), default=-1)
+    else:
+        def _match(texto: str) -> int:
+            return next((i for i, k in enumerate(chaves) if k in texto), -1)
+    return _match
+
+
+# Mapeamento de tags similares para as novas tags especializadas
+_MAPEAMENTO_TAGS = {
+    # Política Econômica (Brasil)
+    'governo e politica': 'Política Econômica (Brasil)',
+    'governo e política': 'Política Econômica (Brasil)', 
+    'política': 'Política Econômica (Brasil)',
+    'politica': 'Política Econômica (Brasil)',
+    'governo': 'Política Econômica (Brasil)',
+    'política econômica': 'Política Econômica (Brasil)',
+    'politica economica': 'Política Econômica (Brasil)',
+    'política pública': 'Política Econômica (Brasil)',
+    'política publica': 'Política Econômica (Brasil)',
+    
+    # Internacional (Economia e Política)
+    'economia e tecnologia': 'Internacional (Economia e Política)',
+    'economia': 'Internacional (Economia e Política)',
+    'tecnologia': 'Tecnologia e Setores Estratégicos',
+    'tech': 'Tecnologia e Setores Estratégicos',
+    'ia': 'Tecnologia e Setores Estratégicos',
+    'inteligência artificial': 'Tecnologia e Setores Estratégicos',
+    'inteligencia artificial': 'Tecnologia e Setores Estratégicos',
+    'cripto': 'Internacional (Economia e Política)',
+    'criptomoedas': 'Internacional (Economia e Política)',
+    'bitcoin': 'Internacional (Economia e Política)',
+    
+    # Jurídico, Falências e Regulatório
+    'judicionario': 'Jurídico, Falências e Regulatório',
+    'judiciário': 'Jurídico, Falências e Regulatório',
+    'judicial': 'Jurídico, Falências e Regulatório',
+    'justiça': 'Jurídico, Falências e Regulatório',
+    'justica': 'Jurídico, Falências e Regulatório',
+    'tribunal': 'Jurídico, Falências e Regulatório',
+    'stf': 'Jurídico, Falências e Regulatório',
+    'stj': 'Jurídico, Falências e Regulatório',
+    'supremo': 'Jurídico, Falências e Regulatório',
+    'superior tribunal': 'Jurídico, Falências e Regulatório',
+    'tj': 'Jurídico, Falências e Regulatório',
+    'trf': 'Jurídico, Falências e Regulatório',
+    'vara': 'Jurídico, Falências e Regulatório',
+    'recuperação judicial': 'Jurídico, Falências e Regulatório',
+    'recuperacao judicial': 'Jurídico, Falências e Regulatório',
+    'falência': 'Jurídico, Falências e Regulatório',
+    'falencia': 'Jurídico, Falências e Regulatório',
+    'legislativo': 'Jurídico, Falências e Regulatório',
+    'congresso': 'Jurídico, Falências e Regulatório',
+    'senado': 'Jurídico, Falências e Regulatório',
+    'câmara': 'Jurídico, Falências e Regulatório',
+    'camara': 'Jurídico, Falências e Regulatório',
+    
+    # Mercado de Capitais e Finanças Corporativas
+    'empresas privadas': 'Mercado de Capitais e Finanças Corporativas',
+    'empresas': 'Mercado de Capitais e Finanças Corporativas',
+    'corporativo': 'Mercado de Capitais e Finanças Corporativas',
+    'negócios': 'Mercado de Capitais e Finanças Corporativas',
+    'negocios': 'Mercado de Capitais e Finanças Corporativas',
+    'mercado': 'Mercado de Capitais e Finanças Corporativas',
+    'setor privado': 'Mercado de Capitais e Finanças Corporativas',
+    
+    # M&A e Transações Corporativas
+    'm&a': 'M&A e Transações Corporativas',
+    'fusão': 'M&A e Transações Corporativas',
+    'fusao': 'M&A e Transações Corporativas',
+    'aquisição': 'M&A e Transações Corporativas',
+    'aquisicao': 'M&A e Transações Corporativas',
+}
+
+
+_MAPEAMENTO_TAGS_VALORES = tuple(_MAPEAMENTO_TAGS.values())
+_match_mapeamento_tags = _compilar_matcher_ordenado(_MAPEAMENTO_TAGS)
+
+_CatalogoTags = namedtuple("_CatalogoTags", ["tags", "lower_index", "sorted_by_len", "match_contida"])
+
+
+@lru_cache(maxsize=1)
+def _catalogo_tags() -> _CatalogoTags:
+    """
+    Índice do catálogo TAGS_SPECIAL_SITUATIONS (carregado uma vez em prompts.py).
+    Import tardio: prompts importa crud, que importa utils.
+    """
+    try:
+        from .prompts import TAGS_SPECIAL_SITUATIONS
+    except ImportError:
+        from backend.prompts import TAGS_SPECIAL_SITUATIONS
+    tags = tuple(TAGS_SPECIAL_SITUATIONS.keys())
+    lower_index = {t.lower(): t for t in tags}
+    # Mais longas primeiro: evita que uma tag curta "roube" o match de uma mais específica
+    sorted_by_len = tuple(sorted(lower_index.items(), key=lambda kv: len(kv[0]), reverse=True))
+    # Matcher especializado para o catálogo carregado (uma varredura; menor índice = mais longa)
+    match_contida = _compilar_matcher_ordenado(k for k, _ in sorted_by_len)
+    return _CatalogoTags(tags, lower_index, sorted_by_len, match_contida)
+
 
 def corrigir_tag_invalida(tag_original: str) -> str:
     """
@@ -28,96 +155,69 @@ def corrigir_tag_invalida(tag_original: str) -> str:
     
     tag_limpa = tag_original.strip().lower()
     
-    # Mapeamento de tags similares para as novas tags especializadas
-    MAPEAMENTO_TAGS = {
-        # Política Econômica (Brasil)
-        'governo e politica': 'Política Econômica (Brasil)',
-        'governo e política': 'Política Econômica (Brasil)', 
-        'política': 'Política Econômica (Brasil)',
-        'politica': 'Política Econômica (Brasil)',
-        'governo': 'Política Econômica (Brasil)',
-        'política econômica': 'Política Econômica (Brasil)',
-        'politica economica': 'Política Econômica (Brasil)',
-        'política pública': 'Política Econômica (Brasil)',
-        'política publica': 'Política Econômica (Brasil)',
-        
-        # Internacional (Economia e Política)
-        'economia e tecnologia': 'Internacional (Economia e Política)',
-        'economia': 'Internacional (Economia e Política)',
-        'tecnologia': 'Tecnologia e Setores Estratégicos',
-        'tech': 'Tecnologia e Setores Estratégicos',
-        'ia': 'Tecnologia e Setores Estratégicos',
-        'inteligência artificial': 'Tecnologia e Setores Estratégicos',
-        'inteligencia artificial': 'Tecnologia e Setores Estratégicos',
-        'cripto': 'Internacional (Economia e Política)',
-        'criptomoedas': 'Internacional (Economia e Política)',
-        'bitcoin': 'Internacional (Economia e Política)',
-        
-        # Jurídico, Falências e Regulatório
-        'judicionario': 'Jurídico, Falências e Regulatório',
-        'judiciário': 'Jurídico, Falências e Regulatório',
-        'judicial': 'Jurídico, Falências e Regulatório',
-        'justiça': 'Jurídico, Falências e Regulatório',
-        'justica': 'Jurídico, Falências e Regulatório',
-        'tribunal': 'Jurídico, Falências e Regulatório',
-        'stf': 'Jurídico, Falências e Regulatório',
-        'stj': 'Jurídico, Falências e Regulatório',
-        'supremo': 'Jurídico, Falências e Regulatório',
-        'superior tribunal': 'Jurídico, Falências e Regulatório',
-        'tj': 'Jurídico, Falências e Regulatório',
-        'trf': 'Jurídico, Falências e Regulatório',
-        'vara': 'Jurídico, Falências e Regulatório',
-        'recuperação judicial': 'Jurídico, Falências e Regulatório',
-        'recuperacao judicial': 'Jurídico, Falências e Regulatório',
-        'falência': 'Jurídico, Falências e Regulatório',
-        'falencia': 'Jurídico, Falências e Regulatório',
-        'legislativo': 'Jurídico, Falências e Regulatório',
-        'congresso': 'Jurídico, Falências e Regulatório',
-        'senado': 'Jurídico, Falências e Regulatório',
-        'câmara': 'Jurídico, Falências e Regulatório',
-        'camara': 'Jurídico, Falências e Regulatório',
-        
-        # Mercado de Capitais e Finanças Corporativas
-        'empresas privadas': 'Mercado de Capitais e Finanças Corporativas',
-        'empresas': 'Mercado de Capitais e Finanças Corporativas',
-        'corporativo': 'Mercado de Capitais e Finanças Corporativas',
-        'negócios': 'Mercado de Capitais e Finanças Corporativas',
-        'negocios': 'Mercado de Capitais e Finanças Corporativas',
-        'mercado': 'Mercado de Capitais e Finanças Corporativas',
-        'setor privado': 'Mercado de Capitais e Finanças Corporativas',
-        
-        # M&A e Transações Corporativas
-        'm&a': 'M&A e Transações Corporativas',
-        'fusão': 'M&A e Transações Corporativas',
-        'fusao': 'M&A e Transações Corporativas',
-        'aquisição': 'M&A e Transações Corporativas',
-        'aquisicao': 'M&A e Transações Corporativas',
-    }
+    # Tag já válida do catálogo (case-insensitive, O(1)); depois, tag do catálogo contida no texto
+    try:
+        catalogo = _catalogo_tags()
+    except Exception:
+        catalogo = None
+    if catalogo is not None:
+        tag_valida = catalogo.lower_index.get(tag_limpa)
+        if tag_valida:
+            return tag_valida
+        idx = catalogo.match_contida(tag_limpa)
+        if idx >= 0:
+            return catalogo.sorted_by_len[idx][1]
     
-    # Busca correspondência exata primeiro
-    if tag_limpa in MAPEAMENTO_TAGS:
-        return MAPEAMENTO_TAGS[tag_limpa]
+    # Busca correspondência exata no mapa de sinônimos
+    if tag_limpa in _MAPEAMENTO_TAGS:
+        return _MAPEAMENTO_TAGS[tag_limpa]
     
-    # Se não encontrar correspondência exata, busca por palavras-chave
-    for palavra_chave, tag_correta in MAPEAMENTO_TAGS.items():
-        if palavra_chave in tag_limpa:
-            return tag_correta
+    # Se não encontrar correspondência exata, busca por palavras-chave (primeira na ordem do mapa)
+    idx = _match_mapeamento_tags(tag_limpa)
+    if idx >= 0:
+        return _MAPEAMENTO_TAGS_VALORES[idx]
     
     # Se nada corresponder, classifica como IRRELEVANTE
     return 'IRRELEVANTE'
 
 
+_PRIORIDADES_VALIDAS = frozenset({'P1_CRITICO', 'P2_ESTRATEGICO', 'P3_MONITORAMENTO'})
+
+
 def corrigir_prioridade_invalida(prioridade_original: Optional[str]) -> str:
     """
     Normaliza a prioridade. Se não for uma das válidas (P1_CRITICO, P2_ESTRATEGICO, P3_MONITORAMENTO),
     retorna 'IRRELEVANTE'.
     """
-    validas = {'P1_CRITICO', 'P2_ESTRATEGICO', 'P3_MONITORAMENTO'}
-    if isinstance(prioridade_original, str) and prioridade_original in validas:
+    if isinstance(prioridade_original, str) and prioridade_original in _PRIORIDADES_VALIDAS:
         return prioridade_original
     return 'IRRELEVANTE'
 
 
+# Palavras-chave comuns em anúncios
+_PALAVRAS_ANUNCIO = [
+    r"anúncio", r"anuncio", r"publicitário", r"publicitario", r"promoção", r"promocao",
+    r"oferta", r"imperdível", r"imperdivel", r"liquidação", r"liquidacao", r"cupom",
+    r"desconto", r"brinde", r"compre", r"ingressos", r"ingresso", r"cadastre-se",
+    r"cadastre se", r"inscreva-se", r"inscreva se", r"patrocinado", r"publi"
+]
+_RE_PALAVRAS_ANUNCIO = re.compile(r"\b(?:" + "|".join(_PALAVRAS_ANUNCIO) + r")\b")
+
+# Setores muito associados a varejo/mercado quando em tom promocional
+_RE_VAREJO = re.compile(
+    r"supermarket|supermercado|hipermercado|loja|shopping|farmácia|farmacia|eletro|móveis|moveis"
+)
+
+# Padrões de horário e local típico de evento/ação (cada um conta como um sinal)
+_RE_SINAIS_CONTATO_PRECO = [
+    re.compile(r"\b\d{1,2}h\s*(às|as)\s*\d{1,2}h\b"),
+    re.compile(r"\b(?:r\.|rua|av\.|avenida|praça|praca|centro|shopping)\b"),
+    re.compile(r"\bwhatsapp\b"),
+    re.compile(r"\b(?:\(\d{2}\)\s*\d{4,5}-\d{4})\b"),
+    re.compile(r"\br\$\s*\d+[\.\d]*\b"),
+]
+
+
 def eh_lixo_publicitario(titulo: Optional[str], texto: Optional[str]) -> bool:
     """
     Heurística simples para detectar conteúdo publicitário/anúncio e descartar cedo.
@@ -133,36 +233,13 @@ def eh_lixo_publicitario(titulo: Optional[str], texto: Optional[str]) -> bool:
     try:
         conteudo = f"{titulo or ''}\n{texto or ''}".lower()
 
-        # Palavras-chave comuns em anúncios
-        palavras = [
-            r"anúncio", r"anuncio", r"publicitário", r"publicitario", r"promoção", r"promocao",
-            r"oferta", r"imperdível", r"imperdivel", r"liquidação", r"liquidacao", r"cupom",
-            r"desconto", r"brinde", r"compre", r"ingressos", r"ingresso", r"cadastre-se",
-            r"cadastre se", r"inscreva-se", r"inscreva se", r"patrocinado", r"publi"
-        ]
-
-        # Setores muito associados a varejo/mercado quando em tom promocional
-        varejo = [
-            r"supermarket", r"supermercado", r"hipermercado", r"loja", r"shopping",
-            r"farmácia", r"farmacia", r"eletro", r"móveis", r"moveis"
-        ]
-
-        # Padrões de horário e local típico de evento/ação
-        padroes_regex = [
-            r"\b\d{1,2}h\s*(às|as)\s*\d{1,2}h\b",
-            r"\b(?:r\.|rua|av\.|avenida|praça|praca|centro|shopping)\b",
-            r"\bwhatsapp\b",
-            r"\b(?:\(\d{2}\)\s*\d{4,5}-\d{4})\b",
-            r"\br\$\s*\d+[\.\d]*\b"
-        ]
-
-        # Se encontrar palavras-chave fortes de anúncio
-        if any(re.search(rf"\b{p}\b", conteudo) for p in palavras):
+        # Palavras-chave fortes de anúncio: uma única alternação compilada (uma varredura)
+        if _RE_PALAVRAS_ANUNCIO.search(conteudo):
             return True
 
         # Se houver forte presença de varejo + preço/telefone/whatsapp
-        sinais_varejo = any(v in conteudo for v in varejo)
-        sinais_contato_preco = sum(1 for rgx in padroes_regex if re.search(rgx, conteudo))
+        sinais_varejo = _RE_VAREJO.search(conteudo) is not None
+        sinais_contato_preco = sum(1 for rgx in _RE_SINAIS_CONTATO_PRECO if rgx.search(conteudo))
         if sinais_varejo and sinais_contato_preco >= 1:
             return True
 
@@ -186,15 +263,55 @@ def limpar_nome_arquivo(nome: str) -> str:
     return nome[:150]
 
 
+_RE_JSON_RESUMO_EXPANDIDO = re.compile(r'\{[^{}]*"resumo_expandido"[^{}]*\}', re.DOTALL)
+_RE_BLOCO_JSON_MARKDOWN = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```', re.DOTALL)
+
+
+def _fatiar_objeto_json(texto: str, inicio: int) -> str:
+    """
+    Recorta o objeto JSON balanceado que começa em texto[inicio] ('{'), numa única
+    varredura linear que ignora chaves dentro de strings. Sem fechamento (resposta
+    truncada), devolve o restante do texto.
+    """
+    profundidade = 0
+    em_string = False
+    escape = False
+    for i in range(inicio, len(texto)):
+        ch = texto[i]
+        if em_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                em_string = False
+        elif ch == '"':
+            em_string = True
+        elif ch == '{':
+            profundidade += 1
+        elif ch == '}':
+            profundidade -= 1
+            if profundidade == 0:
+                return texto[inicio:i + 1]
+    return texto[inicio:]
+
+
+def _json_loads(json_str: str) -> Any:
+    """orjson quando disponível (parser em C, bem mais rápido); json da stdlib como fallback."""
+    if orjson is not None:
+        try:
+            return orjson.loads(json_str)
+        except Exception:
+            pass
+    return json.loads(json_str)
+
+
 def extrair_json_da_resposta(resposta: str) -> Any:
     """
     Tenta extrair e decodificar um objeto JSON de uma string de resposta do LLM,
     que pode estar envolto em markdown, texto solto ou ser truncado.
     Inclui depuração detalhada em caso de falha.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
     # ETAPA 0: Validação inicial da resposta
     if not isinstance(resposta, str) or not resposta.strip():
         logger.error("❌ Erro ao extrair JSON: A resposta recebida da API está vazia ou não é uma string.")
@@ -206,14 +323,13 @@ def extrair_json_da_resposta(resposta: str) -> Any:
 
     # ETAPA 1: Primeiro tenta encontrar JSON puro sem markdown
     # Procura por {"chave": "valor"} ou similares
-    json_pattern = r'\{[^{}]*"resumo_expandido"[^{}]*\}'
-    match = re.search(json_pattern, resposta, re.DOTALL)
+    match = _RE_JSON_RESUMO_EXPANDIDO.search(resposta)
     if match:
         json_str = match.group(0).strip()
         logger.debug("✅ Encontrou JSON puro na resposta")
     else:
         # ETAPA 2: Tenta encontrar um bloco de código JSON explícito (```json ... ```)
-        match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', resposta, re.DOTALL)
+        match = _RE_BLOCO_JSON_MARKDOWN.search(resposta)
         if match:
             json_str = match.group(1).strip()
             logger.debug("✅ Encontrou bloco JSON markdown na resposta")
@@ -221,8 +337,8 @@ def extrair_json_da_resposta(resposta: str) -> Any:
             # ETAPA 3 (Fallback): Se não houver bloco de código, busca o primeiro '{'
             start_brace = resposta.find('{')
             if start_brace != -1:
-                # Procura pelo fim do objeto JSON (conta chaves)
-                json_str = resposta[start_brace:].strip()
+                # Procura pelo fim do objeto JSON (conta chaves, ignorando as que estão em strings)
+                json_str = _fatiar_objeto_json(resposta, start_brace).strip()
                 logger.debug("✅ Usando fallback - procurando '{' na resposta")
             else:
                 logger.error("❌ Erro ao extrair JSON: Nenhum marcador de início ('{') foi encontrado.")
@@ -244,7 +360,7 @@ def extrair_json_da_resposta(resposta: str) -> Any:
 
     # ETAPA 5: Tenta decodificar o JSON extraído
     try:
-        parsed = json.loads(json_str)
+        parsed = _json_loads(json_str)
         logger.debug("✅ JSON decodificado com sucesso")
         return parsed
     except json.JSONDecodeError as e:
@@ -258,7 +374,7 @@ def extrair_json_da_resposta(resposta: str) -> Any:
         try:
             # Remove aspas simples incorretas e substitui por duplas
             corrected = json_str.replace("'", '"')
-            parsed = json.loads(corrected)
+            parsed = _json_loads(corrected)
             logger.warning("⚠️ JSON corrigido automaticamente (aspas simples -> duplas)")
             return parsed
         except:
@@ -397,6 +513,11 @@ def formatar_timestamp_relativo(timestamp_str: str) -> str:
         return "timestamp inválido"
 
 
+_RE_TAG_HTML = re.compile(r'<[^>]+>')
+_RE_URL = re.compile(r"https?://\S+")
+_RE_FIM_SENTENCA = re.compile(r"(?<=[\.!?])\s+")
+
+
 def sanitizar_html(texto: str) -> str:
     """
     Remove tags HTML e caracteres especiais do texto.
@@ -411,10 +532,10 @@ def sanitizar_html(texto: str) -> str:
         return ""
     
     # Remove tags HTML
-    texto_limpo = re.sub(r'<[^>]+>', '', texto)
+    texto_limpo = _RE_TAG_HTML.sub('', texto)
     
     # Remove caracteres especiais e múltiplos espaços
-    texto_limpo = re.sub(r'\s+', ' ', texto_limpo)
+    texto_limpo = _RE_ESPACOS.sub(' ', texto_limpo)
     
     return texto_limpo.strip()
 
@@ -433,10 +554,10 @@ def gerar_titulo_fallback_curto(texto: Optional[str], max_palavras: int = 10) ->
         if not conteudo:
             return "Sem título"
         # Remove URLs e excesso de espaços
-        conteudo = re.sub(r"https?://\S+", " ", conteudo)
-        conteudo = re.sub(r"\s+", " ", conteudo).strip()
+        conteudo = _RE_URL.sub(" ", conteudo)
+        conteudo = _RE_ESPACOS.sub(" ", conteudo).strip()
         # Tenta primeira sentença
-        sentencas = re.split(r"(?<=[\.!?])\s+", conteudo)
+        sentencas = _RE_FIM_SENTENCA.split(conteudo)
         primeira = next((s for s in sentencas if s and len(s.strip()) > 0), conteudo)
         # Se muito longa, reduz para N palavras
         palavras = primeira.split()
@@ -477,6 +598,32 @@ FONTES_FLASHES: List[str] = [
 ]
 
 
+_TABELA_ACENTOS = str.maketrans(
+    "áàâãäéèêëíìîïóòôõöúùûüçñÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑ",
+    "aaaaaeeeeiiiiooooouuuucnAAAAAEEEEIIIIOOOOOUUUUCN",
+)
+_RE_NAO_ALFANUM = re.compile(r"[^a-z0-9]+")
+_RE_ESPACOS = re.compile(r"\s+")
+
+# Aliases para chave canônica (evita "o estado de s. paulo" vs "estadao" diferentes)
+_ALIASES_JORNAL = {
+    "o estado de s paulo": "estadao",
+    "estado de s paulo": "estadao",
+    "estadao": "estadao",
+    "estadão": "estadao",
+    "valor economico": "valor economico",
+    "valor": "valor economico",
+    "valor pro": "valor economico",
+    "valor economico pro": "valor economico",
+    "brazil journal": "brazil journal",
+    "folha de s paulo": "folha",
+    "folha": "folha",
+    "exame": "exame",
+    "infomoney": "infomoney",
+    "investing": "investing",
+}
+
+
 def normalizar_jornal(nome: Optional[str]) -> str:
     """
     Normaliza o nome do jornal para chave canônica (lowercase, sem acentos, aliases mapeados).
@@ -487,30 +634,15 @@ def normalizar_jornal(nome: Optional[str]) -> str:
     s = nome.strip()
     if not s:
         return ""
-    # Remove acentos (NFKD + remove combining chars)
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+    # Remove acentos: tabela de tradução (C puro) para o latim usual; NFKD só para entradas exóticas
+    s = s.translate(_TABELA_ACENTOS)
+    if not s.isascii():
+        s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
     s = s.lower()
     # Normaliza separadores e espaços
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    # Aliases para chave canônica (evita "o estado de s. paulo" vs "estadao" diferentes)
-    ALIASES_JORNAL = {
-        "o estado de s paulo": "estadao",
-        "estado de s paulo": "estadao",
-        "estadao": "estadao",
-        "estadão": "estadao",
-        "valor economico": "valor economico",
-        "valor": "valor economico",
-        "valor pro": "valor economico",
-        "valor economico pro": "valor economico",
-        "brazil journal": "brazil journal",
-        "folha de s paulo": "folha",
-        "folha": "folha",
-        "exame": "exame",
-        "infomoney": "infomoney",
-        "investing": "investing",
-    }
-    return ALIASES_JORNAL.get(s, s)
+    s = _RE_NAO_ALFANUM.sub(" ", s)
+    s = _RE_ESPACOS.sub(" ", s).strip()
+    return _ALIASES_JORNAL.get(s, s)
 
 
 _FONTE_DISPLAY_MAP = {
@@ -546,6 +678,9 @@ _FONTE_DISPLAY_MAP = {
     "nyt": "The New York Times",
 }
 
+_FONTE_DISPLAY_VALORES = tuple(_FONTE_DISPLAY_MAP.values())
+_match_fonte_display = _compilar_matcher_ordenado(_FONTE_DISPLAY_MAP)
+
 _FONTE_LIXO_PATTERNS = re.compile(
     r"^[a-z0-9_]{2,20}$"   # parece username (ex: "ines249", "user_abc")
     r"|^json.?dump$"
@@ -580,9 +715,9 @@ def normalizar_fonte_display(nome: Optional[str]) -> str:
     if chave in _FONTE_DISPLAY_MAP:
         return _FONTE_DISPLAY_MAP[chave]
 
-    for keyword, display in _FONTE_DISPLAY_MAP.items():
-        if keyword in s.lower():
-            return display
+    idx = _match_fonte_display(s.lower())
+    if idx >= 0:
+        return _FONTE_DISPLAY_VALORES[idx]
 
     if len(s) < 3 or s.replace(" ", "").isdigit():
         return ""
@@ -590,6 +725,27 @@ def normalizar_fonte_display(nome: Optional[str]) -> str:
     return s.strip()
 
 
+_JORNAIS_INTERNACIONAIS = (
+    'financial times', 'ft ', ' ft', 'ft.com', 'ft weekend', 'ftweekend',
+    'bloomberg', 'reuters', 'associated press', 'ap ', 'ap news',
+    'wall street journal', 'wsj',
+    'new york times', 'nyt', 'washington post', 'wapo',
+    'the guardian', 'guardian', 'bbc', 'cnn', 'cnbc', 'the economist',
+    'forbes', 'marketwatch', 'barron', "barron's", 'the telegraph',
+    'the times', 'usa today', 'los angeles times', 'la times',
+    'chicago tribune', 'axios', 'politico', 'the hill',
+    'nikkei', 'japan times', 'south china morning post', 'scmp',
+    'al jazeera', 'sky news', 'the hindu', 'times of india',
+)
+
+# Matcher compilado uma vez no import (Aho-Corasick quando disponível)
+_match_internacional_idx = _compilar_matcher_ordenado(_JORNAIS_INTERNACIONAIS)
+
+
+def _match_internacional(s: str) -> bool:
+    return _match_internacional_idx(s) >= 0
+
+
 def inferir_tipo_fonte_por_jornal(nome_jornal: Optional[str]) -> str:
     """
     Inferência heurística de tipo de fonte ('nacional' ou 'internacional') a partir do nome do jornal.
@@ -601,26 +757,9 @@ def inferir_tipo_fonte_por_jornal(nome_jornal: Optional[str]) -> str:
             return 'nacional'
         s = nome_jornal.strip().lower()
         # Normaliza separadores incomuns (underscores, hífens, múltiplos espaços)
-        try:
-            import re as _re
-            s_norm = _re.sub(r"[^a-z0-9]+", " ", s)
-            s_norm = _re.sub(r"\s+", " ", s_norm).strip()
-        except Exception:
-            s_norm = s
-        internacionais = [
-            'financial times', 'ft ', ' ft', 'ft.com', 'ft weekend', 'ftweekend',
-            'bloomberg', 'reuters', 'associated press', 'ap ', 'ap news',
-            'wall street journal', 'wsj',
-            'new york times', 'nyt', 'washington post', 'wapo',
-            'the guardian', 'guardian', 'bbc', 'cnn', 'cnbc', 'the economist',
-            'forbes', 'marketwatch', 'barron', "barron's", 'the telegraph',
-            'the times', 'usa today', 'los angeles times', 'la times',
-            'chicago tribune', 'axios', 'politico', 'the hill',
-            'nikkei', 'japan times', 'south china morning post', 'scmp',
-            'al jazeera', 'sky news', 'the hindu', 'times of india',
-        ]
+        s_norm = _RE_ESPACOS.sub(" ", _RE_NAO_ALFANUM.sub(" ", s)).strip()
         # Checa contra ambas as versões (original e normalizada)
-        if any((k in s) or (k in s_norm) for k in internacionais):
+        if _match_internacional(s) or _match_internacional(s_norm):
             return 'internacional'
         return 'nacional'
     except Exception:
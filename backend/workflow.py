@@ -32,6 +32,8 @@ try:
         FeedState,
         gatekeeper_node,
         entity_extraction_node,
+        extract_entities_batch,
+        motivo_rejeicao_gatekeeper,
         entity_resolution_node,
         historian_node,
         writer_node,
@@ -45,6 +47,8 @@ except ImportError:
         FeedState,
         gatekeeper_node,
         entity_extraction_node,
+        extract_entities_batch,
+        motivo_rejeicao_gatekeeper,
         entity_resolution_node,
         historian_node,
         writer_node,
@@ -156,14 +160,68 @@ def _run_linear_fallback(state: FeedState) -> FeedState:
     return state
 
 
+def _run_pipeline(state: FeedState) -> FeedState:
+    """
+    Executa os nos (LangGraph ou fallback linear) com a sessao ja presente em
+    state["db_session"]. A sessao nao sai no estado final: quem abriu, fecha.
+    """
+    workflow = get_workflow()
+    
+    if workflow:
+        # Usa LangGraph
+        try:
+            final_state = workflow.invoke(state)
+        except Exception as e:
+            final_state = {
+                **state,
+                "error": f"Erro no workflow LangGraph: {str(e)}",
+                "processing_log": state.get("processing_log", []) + [f"[Workflow] ERRO: {e}"],
+            }
+    else:
+        # Fallback linear
+        final_state = _run_linear_fallback(state)
+    
+    db = final_state.pop("db_session", None)
+    if db is not None:
+        # Nao deixa transacao aberta (nem abortada) para o _save_workflow_results
+        db.rollback()
+    return final_state
+
+
 # ==============================================================================
 # API PRINCIPAL
 # ==============================================================================
 
+def _build_initial_state(artigo: ArtigoBruto) -> FeedState:
+    """Monta o estado inicial do workflow a partir de um ArtigoBruto."""
+    metadados = artigo.metadados or {}
+    return {
+        "artigo_id": artigo.id,
+        "texto_raw": artigo.texto_bruto or "",
+        "titulo": artigo.titulo_extraido or metadados.get("titulo", ""),
+        "jornal": artigo.jornal or metadados.get("jornal", ""),
+        "tipo_fonte": artigo.tipo_fonte or "nacional",
+        "metadados": metadados,
+        "is_relevant": True,
+        "classificacao": {},
+        "rejection_reason": "",
+        "entities_raw": [],
+        "entities_resolved": [],
+        "contexto_historico": "",
+        "resumo_final": "",
+        "resumo_metadata": {},
+        "cluster_id": 0,
+        "cluster_action": "none",
+        "error": "",
+        "processing_log": [],
+    }
+
+
 def run_article_through_workflow(
     artigo_id: int,
     shadow_mode: bool = True,
     verbose: bool = False,
+    entities_raw: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     Processa um artigo pelo pipeline agentico (v2.0).
@@ -173,6 +231,8 @@ def run_article_through_workflow(
         shadow_mode: Se True, apenas loga sem salvar resultados no banco
                      (modo seguro para comparacao com pipeline v1)
         verbose: Se True, imprime logs detalhados
+        entities_raw: Entidades ja extraidas em lote (extract_entities_batch), mesmo que [];
+                      se None, o entity_extraction_node chama o LLM normalmente
     
     Returns:
         Dict com resultado do processamento:
@@ -186,7 +246,8 @@ def run_article_through_workflow(
             "shadow_mode": bool,
         }
     """
-    # Busca artigo do banco
+    # Uma unica sessao para o run inteiro: busca do artigo, nos do pipeline
+    # (via state["db_session"]) e gravacao dos resultados
     db = SessionLocal()
     try:
         artigo = db.query(ArtigoBruto).filter(ArtigoBruto.id == artigo_id).first()
@@ -198,47 +259,25 @@ def run_article_through_workflow(
             }
         
         # Monta estado inicial
-        metadados = artigo.metadados or {}
-        initial_state: FeedState = {
-            "artigo_id": artigo.id,
-            "texto_raw": artigo.texto_bruto or "",
-            "titulo": artigo.titulo_extraido or metadados.get("titulo", ""),
-            "jornal": artigo.jornal or metadados.get("jornal", ""),
-            "tipo_fonte": artigo.tipo_fonte or "nacional",
-            "metadados": metadados,
-            "is_relevant": True,
-            "classificacao": {},
-            "rejection_reason": "",
-            "entities_raw": [],
-            "entities_resolved": [],
-            "contexto_historico": "",
-            "resumo_final": "",
-            "resumo_metadata": {},
-            "cluster_id": 0,
-            "cluster_action": "none",
-            "error": "",
-            "processing_log": [],
-        }
+        initial_state = _build_initial_state(artigo)
+        if entities_raw is not None:
+            initial_state["entities_raw"] = list(entities_raw)
+            initial_state["entities_pre_extraidas"] = True
+        # Encerra a transacao da leitura: a conexao volta ao pool durante as chamadas LLM
+        # (gatekeeper/NER); cada no so a reabre em volta do proprio SQL
+        db.commit()
+        initial_state["db_session"] = db
+        
+        final_state = _run_pipeline(initial_state)
+        
+        # SEMPRE salva metadados v2 (independente de shadow mode)
+        # Em shadow mode: grava metadados + resumo v2 sem sobrescrever v1
+        # Em producao: mesma coisa (pode ser usado para comparar)
+        if final_state.get("is_relevant"):
+            _save_workflow_results(artigo_id, final_state, shadow_mode=shadow_mode, db=db)
     finally:
         db.close()
     
-    # Executa o workflow
-    workflow = get_workflow()
-    
-    if workflow:
-        # Usa LangGraph
-        try:
-            final_state = workflow.invoke(initial_state)
-        except Exception as e:
-            final_state = {
-                **initial_state,
-                "error": f"Erro no workflow LangGraph: {str(e)}",
-                "processing_log": initial_state.get("processing_log", []) + [f"[Workflow] ERRO: {e}"],
-            }
-    else:
-        # Fallback linear
-        final_state = _run_linear_fallback(initial_state)
-    
     # Log verboso
     if verbose:
         print(f"\n{'='*60}")
@@ -255,12 +294,6 @@ def run_article_through_workflow(
         print(f"  Modo: {'SOMBRA (sem salvar)' if shadow_mode else 'PRODUCAO'}")
         print(f"{'='*60}\n")
     
-    # SEMPRE salva metadados v2 (independente de shadow mode)
-    # Em shadow mode: grava metadados + resumo v2 sem sobrescrever v1
-    # Em producao: mesma coisa (pode ser usado para comparar)
-    if final_state.get("is_relevant"):
-        _save_workflow_results(artigo_id, final_state, shadow_mode=shadow_mode)
-    
     # Retorna resultado limpo
     return {
         "artigo_id": artigo_id,
@@ -278,7 +311,7 @@ def run_article_through_workflow(
     }
 
 
-def _save_workflow_results(artigo_id: int, state: FeedState, shadow_mode: bool = True):
+def _save_workflow_results(artigo_id: int, state: FeedState, shadow_mode: bool = True, db=None):
     """
     Salva resultados do workflow v2.0 no banco.
     
@@ -287,8 +320,12 @@ def _save_workflow_results(artigo_id: int, state: FeedState, shadow_mode: bool =
       - resumo v2 (campo separado, nao sobrescreve v1)
       - entidades e arestas ja foram salvas pelo entity_resolution_node
       - embedding_v2 ja foi salvo pelo historian_node
+    
+    Se `db` for passado (sessao do run), reutiliza e nao fecha.
     """
-    db = SessionLocal()
+    propria = db is None
+    if propria:
+        db = SessionLocal()
     try:
         artigo = db.query(ArtigoBruto).filter(ArtigoBruto.id == artigo_id).first()
         if not artigo:
@@ -324,13 +361,45 @@ def _save_workflow_results(artigo_id: int, state: FeedState, shadow_mode: bool =
         db.rollback()
         print(f"[Workflow] Erro ao salvar resultados: {e}")
     finally:
-        db.close()
+        if propria:
+            db.close()
 
 
 # ==============================================================================
 # BATCH PROCESSING (Processar multiplos artigos)
 # ==============================================================================
 
+# Artigos por chamada de NER em lote (prompt ~2.5k chars por artigo)
+NER_BATCH_SIZE = 8
+
+
+def _pre_extract_entities(artigo_ids: List[int], verbose: bool = False) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Extrai entidades dos artigos em lotes de NER_BATCH_SIZE (uma chamada LLM por lote).
+    Artigos barrados pelos filtros baratos do gatekeeper (regex/tamanho) ficam de fora.
+    """
+    db = SessionLocal()
+    try:
+        artigos = db.query(ArtigoBruto).filter(ArtigoBruto.id.in_(artigo_ids)).all()
+        states = [_build_initial_state(a) for a in artigos]
+    finally:
+        db.close()
+    
+    candidatos = [
+        st for st in states
+        if not motivo_rejeicao_gatekeeper(st.get("titulo", ""), st.get("texto_raw", ""))
+    ]
+    
+    entidades: Dict[int, List[Dict[str, Any]]] = {}
+    for i in range(0, len(candidatos), NER_BATCH_SIZE):
+        lote = candidatos[i:i + NER_BATCH_SIZE]
+        entidades.update(extract_entities_batch(lote))
+    
+    if verbose:
+        print(f"[Workflow] NER em lote: {len(entidades)}/{len(candidatos)} artigos pre-extraidos")
+    return entidades
+
+
 def run_batch_workflow(
     artigo_ids: List[int],
     shadow_mode: bool = True,
@@ -350,6 +419,9 @@ def run_batch_workflow(
     results = []
     total = len(artigo_ids)
     
+    # NER em lote: uma chamada Gemini por NER_BATCH_SIZE artigos em vez de uma por artigo
+    entidades_por_artigo = _pre_extract_entities(artigo_ids, verbose=verbose) if total > 1 else {}
+    
     for i, artigo_id in enumerate(artigo_ids, 1):
         if verbose:
             print(f"\n[{i}/{total}] Processando artigo {artigo_id}...")
@@ -358,6 +430,7 @@ def run_batch_workflow(
             artigo_id=artigo_id,
             shadow_mode=shadow_mode,
             verbose=verbose,
+            entities_raw=entidades_por_artigo.get(artigo_id),
         )
         results.append(result)
     
@@ -61,6 +61,7 @@ try:
         TemplateResumoUsuario,
         ResumoUsuario,
     )
+    from .backend.agents.graph_crud import save_embedding_vec
 except Exception:
     # Execução direta
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -89,6 +90,7 @@ except Exception:
         TemplateResumoUsuario,
         ResumoUsuario,
     )
+    from backend.agents.graph_crud import save_embedding_vec  # type: ignore
 
 
 # ==============================================================================
@@ -347,6 +349,8 @@ def migrate_artigos(db_src: Session, db_dst: Session, since: datetime, cluster_i
     )
 
     for batch in chunked(q.yield_per(500), 500):
+        # (artigo no destino, embedding_v2) para espelhar em embedding_vec (pgvector) apos o flush
+        embeddings_novos: List[Tuple[ArtigoBruto, bytes]] = []
         batch_hashes = [a.hash_unico for a in batch if a.hash_unico]
         existing_map: Dict[str, ArtigoBruto] = {}
         if batch_hashes:
@@ -368,6 +372,7 @@ def migrate_artigos(db_src: Session, db_dst: Session, since: datetime, cluster_i
                     exists.tipo_fonte = artigo.tipo_fonte
                 if artigo.embedding_v2 and not exists.embedding_v2:
                     exists.embedding_v2 = artigo.embedding_v2
+                    embeddings_novos.append((exists, artigo.embedding_v2))
                 continue
 
             clone = ArtigoBruto(
@@ -396,7 +401,13 @@ def migrate_artigos(db_src: Session, db_dst: Session, since: datetime, cluster_i
                 tipo_fonte=artigo.tipo_fonte or 'nacional',
             )
             db_dst.add(clone)
+            if artigo.embedding_v2:
+                embeddings_novos.append((clone, artigo.embedding_v2))
             total += 1
+        if embeddings_novos:
+            db_dst.flush()
+            for destino, emb in embeddings_novos:
+                save_embedding_vec(db_dst, destino.id, emb)
         db_dst.commit()
     print(f"✅ Artigos inseridos: {total}")
     return total
@@ -69,6 +69,7 @@ from backend.agents.graph_crud import (
     link_artigo_to_entities,
     get_context_for_cluster,
     get_similar_articles_by_embedding,
+    save_embedding_vec,
 )
 from backend.agents.nodes import PROMPT_ENTITY_EXTRACTION
 
@@ -2446,6 +2447,7 @@ def enriquecer_artigo_v2(db: Session, id_artigo: int, noticia_data: dict, client
             artigo = db.query(ArtigoBruto).filter(ArtigoBruto.id == id_artigo).first()
             if artigo and not artigo.embedding_v2:
                 artigo.embedding_v2 = embedding_bytes
+                save_embedding_vec(db, id_artigo, embedding_bytes)
                 db.commit()
                 stats["embedding_ok"] = True
     except Exception as e:
@@ -40,6 +40,7 @@ from backend.agents.graph_crud import (
     create_edge,
     link_artigo_to_entities,
     get_entity_stats,
+    save_embedding_vec,
 )
 from backend.utils import extrair_json_da_resposta, get_gemini_model
 from backend.processing import gerar_embedding_v2
@@ -334,6 +335,7 @@ def run_backfill(days: int = 90, limit: int = 5000, batch_size: int = 20, dry_ru
                         aid, emb = future.result()
                         if emb and aid in artigo_map:
                             artigo_map[aid].embedding_v2 = emb
+                            save_embedding_vec(db, aid, emb)
                             total_embeddings += 1
                     except Exception:
                         pass
@@ -174,6 +174,22 @@ def run_migration():
                 print(f"  AVISO - Indice trigram: {e}")
                 conn.rollback()
 
+            # Indices trigram para buscas ILIKE '%termo%' por titulo (painel de settings)
+            for idx_name, tabela, coluna in [
+                ("idx_clusters_titulo_trgm", "clusters_eventos", "titulo_cluster"),
+                ("idx_artigos_titulo_trgm", "artigos_brutos", "titulo_extraido"),
+            ]:
+                try:
+                    conn.execute(text(f"""
+                        CREATE INDEX IF NOT EXISTS {idx_name}
+                        ON {tabela} USING gin ({coluna} gin_trgm_ops)
+                    """))
+                    conn.commit()
+                    print(f"  OK - Indice trigram {idx_name}")
+                except Exception as e:
+                    print(f"  AVISO - Indice trigram {idx_name}: {e}")
+                    conn.rollback()
+
             # Coluna embedding_v2 na artigos_brutos
             try:
                 result = conn.execute(text("""
@@ -200,6 +216,52 @@ def run_migration():
                 print(f"  AVISO - embedding_v2: {e}")
                 conn.rollback()
 
+            # Coluna pgvector espelhada (embedding_vec) + indice HNSW para busca ANN.
+            # embedding_v2 continua BYTEA (compativel com o ORM); so roda se pgvector existir.
+            try:
+                has_vector = conn.execute(text(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'vector'"
+                )).fetchone()
+                if has_vector:
+                    conn.execute(text(
+                        "ALTER TABLE artigos_brutos ADD COLUMN IF NOT EXISTS embedding_vec vector(768)"
+                    ))
+                    conn.execute(text("""
+                        CREATE INDEX IF NOT EXISTS idx_artigos_embedding_vec_hnsw
+                        ON artigos_brutos USING hnsw (embedding_vec vector_cosine_ops)
+                        WITH (m = 16, ef_construction = 64)
+                    """))
+                    conn.commit()
+                    print("  OK - Coluna embedding_vec (pgvector 768d + HNSW)")
+
+                    # Backfill a partir de embedding_v2 (BYTEA float32) em lotes
+                    import numpy as np
+                    total_vec = 0
+                    while True:
+                        rows = conn.execute(text("""
+                            SELECT id, embedding_v2 FROM artigos_brutos
+                            WHERE embedding_vec IS NULL AND embedding_v2 IS NOT NULL
+                              AND octet_length(embedding_v2) = 3072
+                            LIMIT 500
+                        """)).fetchall()
+                        if not rows:
+                            break
+                        conn.execute(
+                            text("UPDATE artigos_brutos SET embedding_vec = CAST(:q AS vector) WHERE id = :id"),
+                            [
+                                {"id": r[0], "q": "[" + ",".join(f"{x:.7g}" for x in np.frombuffer(bytes(r[1]), dtype=np.float32).tolist()) + "]"}
+                                for r in rows
+                            ],
+                        )
+                        conn.commit()
+                        total_vec += len(rows)
+                    print(f"  OK - embedding_vec backfill: {total_vec} artigos")
+                else:
+                    print("  AVISO - pgvector indisponivel: busca vetorial segue em Python")
+            except Exception as e:
+                print(f"  AVISO - embedding_vec: {e}")
+                conn.rollback()
+
             # Procedure de arquivamento
             try:
                 conn.execute(text("""
@@ -273,6 +335,35 @@ def run_migration():
                 print(f"  AVISO - Indice notificado: {e}")
                 conn.rollback()
 
+            # Indice parcial para clusters exibiveis no feed (exclui IRRELEVANTE)
+            try:
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS idx_clusters_feed_visiveis
+                    ON clusters_eventos(created_at)
+                    WHERE status = 'ativo' AND prioridade <> 'IRRELEVANTE' AND tag <> 'IRRELEVANTE'
+                """))
+                conn.commit()
+                print("  OK - Indice parcial idx_clusters_feed_visiveis")
+            except Exception as e:
+                print(f"  AVISO - Indice feed visiveis: {e}")
+                conn.rollback()
+
+            # Indice para contagens de feedback (like/dislike) por artigo
+            try:
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS idx_feedback_tipo_artigo
+                    ON feedback_noticias(feedback, artigo_id)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS idx_feedback_tipo_created_artigo
+                    ON feedback_noticias(feedback, created_at DESC, artigo_id)
+                """))
+                conn.commit()
+                print("  OK - Indices idx_feedback_tipo_artigo / idx_feedback_tipo_created_artigo")
+            except Exception as e:
+                print(f"  AVISO - Indice feedback: {e}")
+                conn.rollback()
+
             # Tabela prompt_configs (Feedback Learning System)
             try:
                 conn.execute(text("""
@@ -8,15 +8,6 @@ except Exception:
     from btg_alphafeed.backend.database import SessionLocal, ArtigoBruto, SemanticEmbedding  # type: ignore
 
 
-def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    if a.shape != b.shape:
-        return -1.0
-    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
-    if denom == 0.0:
-        return -1.0
-    return float(np.dot(a, b) / denom)
-
-
 def semantic_search(query_vector: np.ndarray, model: str, top_k: int = 5) -> List[Dict[str, Any]]:
     """
     Busca semântica simples em memória usando os embeddings salvos.
@@ -25,14 +16,24 @@ def semantic_search(query_vector: np.ndarray, model: str, top_k: int = 5) -> Lis
     db = SessionLocal()
     try:
         rows = db.query(SemanticEmbedding).filter(SemanticEmbedding.model == model).all()
-        candidates = []
+        # SoA: ids e vetores em arrays paralelos; score e ordenação em NumPy
+        ids: List[int] = []
+        vecs: List[np.ndarray] = []
         for r in rows:
             vec = np.frombuffer(r.vector_bytes, dtype="float32")
-            sim = _cosine_similarity(query_vector, vec)
-            if sim >= 0:
-                candidates.append((sim, r.artigo_id))
-        candidates.sort(reverse=True, key=lambda x: x[0])
-        top = candidates[: max(1, top_k)]
+            if vec.shape != query_vector.shape:
+                continue
+            ids.append(r.artigo_id)
+            vecs.append(vec)
+        if not vecs:
+            return []
+        mat = np.vstack(vecs)
+        denom = np.linalg.norm(mat, axis=1) * float(np.linalg.norm(query_vector))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims = np.where(denom > 0, (mat @ query_vector) / denom, -1.0)
+        keep = np.flatnonzero(sims >= 0)
+        order = keep[np.argsort(-sims[keep], kind="stable")][: max(1, top_k)]
+        top = [(float(sims[i]), ids[i]) for i in order]
         if not top:
             return []
         artigo_ids = [aid for _, aid in top]